@@ -4,10 +4,21 @@
 # AI2 Programming II (by: Mitsuo Yamamoto)
 # Modified for unlimited play + auto-fire + fullscreen
 
+import os
 import sys
 import pygame
 from pygame.locals import *
 
+import game_host
+from dirty_render import DirtyRenderer
+from frame_profiler import FrameProfiler
+from game_loop import GameLoop, Scene
+from input_replay import InputSource, state_checksum
+from input_latency import LatencyProbe
+from entities import EntityStore, EntitySprite, solid_image, PLAYER, ALIEN, BULLET
+from particles import ParticleSystem
+import scores
+
 # color definition
 WHITE = (225, 225, 255)
 BLACK = (0, 1, 0)
@@ -15,60 +26,70 @@ RED = (255, 0, 1)
 GREEN = (0, 255, 0)
 DARK_GREEN = (0, 80, 0)
 
+# the game always runs at this size and is scaled up to the monitor,
+# so it plays the same (and costs the same to draw) on every display
+LOGICAL_WIDTH = 1200
+LOGICAL_HEIGHT = 675
+
+# set DIRTY_RECTS=1 to only redraw what moved, RENDER_STATS=1 to print pixels pushed
+DIRTY_RECTS = os.environ.get("DIRTY_RECTS") == "1"
+RENDER_STATS = os.environ.get("RENDER_STATS") == "1"
+
+# F3 shows per-phase frame times (see frame_profiler.py)
+profiler = FrameProfiler("invaders01")
+
+AUTO_FIRE_MS = 300  # fire every 300ms
+
+# RECORD_INPUT / REPLAY_INPUT (see input_replay.py)
+inputs = InputSource.from_env(
+    "invaders01", (pygame.K_LEFT, pygame.K_RIGHT),
+    [(pygame.KEYDOWN, pygame.K_ESCAPE), (pygame.KEYDOWN, pygame.K_r)])
+
+# INPUT_LATENCY / LATE_INPUT (see input_latency.py)
+latency = LatencyProbe("invaders01", (pygame.K_LEFT, pygame.K_RIGHT))
+
+# high scores are kept in scores.db (see scores.py); replays don't add to them
+KEEP_SCORES = not inputs.replaying
+
 
 # player class
-class Player(pygame.sprite.Sprite):
-    def __init__(self, screen_width, screen_height):
-        super().__init__()
-        self.image = pygame.Surface((30, 30))
-        self.image.fill(GREEN)
-        self.rect = self.image.get_rect()
-        self.rect.center = (screen_width // 2, screen_height - 50)
+class Player(EntitySprite):
+    def __init__(self, store, screen_width, screen_height):
+        rect = pygame.Rect(0, 0, 30, 30)
+        rect.center = (screen_width // 2, screen_height - 50)
+        super().__init__(store, PLAYER, solid_image((30, 30), GREEN), rect)
         self.speed = 5
         self.screen_width = screen_width
 
-    def update(self):
-        keys = pygame.key.get_pressed()
+    def update(self, keys):
         if keys[pygame.K_LEFT] and self.rect.left > 0:
-            self.rect.x -= self.speed
+            self.store.x[self.index] -= self.speed
         if keys[pygame.K_RIGHT] and self.rect.right < self.screen_width:
-            self.rect.x += self.speed
+            self.store.x[self.index] += self.speed
 
 
 # alien class
-class Alien(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((30, 30))
-        self.image.fill(RED)
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (x, y)
-        self.speed = 2
-
-    def update(self):
-        self.rect.x += self.speed
-        if self.rect.right >= 1200 or self.rect.left <= 0:  # adjust for large screen
-            self.speed = -self.speed
-            self.rect.y += 60
+class Alien(EntitySprite):
+    def __init__(self, store, x, y):
+        super().__init__(store, ALIEN, solid_image((30, 30), RED), (x, y, 30, 30), vx=2)
 
 
 # bullet class
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((2, 10))
-        self.image.fill(WHITE)
-        self.rect = self.image.get_rect()
-        self.rect.midbottom = (x, y)
-        self.speed = -30
-
-    def update(self):
-        self.rect.y += self.speed
-        if self.rect.bottom < 0:
-            self.kill()
-
-
-def create_aliens(all_sprites, aliens, screen_width):
+class Bullet(EntitySprite):
+    def __init__(self, store, x, y):
+        rect = pygame.Rect(0, 0, 2, 10)
+        rect.midbottom = (x, y)
+        super().__init__(store, BULLET, solid_image((2, 10), WHITE), rect, vy=-30)
+
+
+def update_entities(store, screen_width, screen_height):
+    """Move, bounce and cull every alien and bullet in one batched pass"""
+    store.move()
+    store.bounce_x(ALIEN, 0, screen_width, 60)
+    store.cull(BULLET, 0, screen_height)
+
+
+def create_aliens(all_sprites, store, screen_width):
     """Spawn a new wave of aliens"""
     cols = 12
     rows = 3
@@ -81,95 +102,125 @@ def create_aliens(all_sprites, aliens, screen_width):
         for j in range(rows):
             x = start_x + i * spacing_x
             y = start_y + j * spacing_y
-            alien = Alien(x, y)
-            all_sprites.add(alien)
-            aliens.add(alien)
-
-
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)  # fullscreen
-    screen_width, screen_height = screen.get_size()
-    pygame.display.set_caption("Space Invaders - Auto Fire")
-
-    font = pygame.font.SysFont(None, 55)
-
-    all_sprites = pygame.sprite.Group()
-    aliens = pygame.sprite.Group()
-    bullets = pygame.sprite.Group()
-
-    player = Player(screen_width, screen_height)
-    all_sprites.add(player)
-
-    create_aliens(all_sprites, aliens, screen_width)
-
-    score = 0
-    running = True
-    game_over = False
-    game_started = True  # auto start
-    clock = pygame.time.Clock()
-
-    # Auto fire timer
-    AUTO_FIRE_EVENT = pygame.USEREVENT + 1
-    pygame.time.set_timer(AUTO_FIRE_EVENT, 300)  # fire every 300ms
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:  # press ESC to quit
-                    running = False
-                if event.key == pygame.K_r and game_over:
-                    main()
-                    return
-            elif event.type == AUTO_FIRE_EVENT and not game_over:
-                bullet = Bullet(player.rect.centerx, player.rect.top)
-                all_sprites.add(bullet)
-                bullets.add(bullet)
-
-        if not game_over and game_started:
-            all_sprites.update()
-
-            # bullet-alien collisions
-            hits = pygame.sprite.groupcollide(bullets, aliens, True, True)
-            if hits:
-                score += 10 * len(hits)
-
-            # respawn wave
-            if not aliens:
-                create_aliens(all_sprites, aliens, screen_width)
-
-            # game over check
-            for alien in aliens:
-                if alien.rect.bottom >= player.rect.top:
-                    game_over = True
-
-        # drawing
-        screen.fill(DARK_GREEN)
-        all_sprites.draw(screen)
-
-        # Score
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
+            all_sprites.add(Alien(store, x, y))
+
+
+class GameScene(Scene):
+    """One run of the game; R after game over starts a fresh one."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.width, self.height = screen.get_size()
+        self.font = game_host.font(55)
+        self.small_font = game_host.font(24)
+        self.renderer = DirtyRenderer(screen, DARK_GREEN, dirty=DIRTY_RECTS)
+        self.particles = ParticleSystem((self.width, self.height), DARK_GREEN, gravity=0.0004, drag=0.002)
+
+        self.store = EntityStore(seed=inputs.new_seed())
+        self.all_sprites = pygame.sprite.Group()
+        self.player = Player(self.store, self.width, self.height)
+        self.all_sprites.add(self.player)
+        create_aliens(self.all_sprites, self.store, self.width)
+
+        self.score = 0
+        self.game_over = False
+        self.scores = scores.shared() if KEEP_SCORES else None
+        self.best = None
+        self.loading_best = self.scores.best("invaders01") if self.scores else None  # Future, from the writer thread
+        self.rank = None
+        self.placed = None  # Future for the rank, filled in by the scores writer thread
+
+    def enter(self):
+        # auto fire runs on game time, so it replays exactly
+        self.loop.every(AUTO_FIRE_MS, self.fire)
+
+    def fire(self):
+        if not self.game_over:
+            self.all_sprites.add(Bullet(self.store, self.player.rect.centerx, self.player.rect.top))
+
+    def event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:  # press ESC to quit
+                self.loop.stop()
+            if event.key == pygame.K_r and self.game_over:
+                self.loop.switch(GameScene(self.screen))
+
+    def update(self, dt_ms):
+        self.particles.update(dt_ms)
+        if self.game_over:
+            return
+        store = self.store
+        x = self.player.rect.x
+        self.player.update(self.loop.keys)
+        if self.player.rect.x != x:
+            latency.moved()
+        update_entities(store, self.width, self.height)
+        profiler.mark("update")
+
+        # bullet-alien collisions
+        hits, dead = store.collide(BULLET, ALIEN)
+        if len(hits):
+            self.score += 10 * len(hits)
+            self.particles.burst(store.x[dead] + store.w[dead] / 2, store.y[dead] + store.h[dead] / 2, 16, RED)
+
+        # respawn wave
+        if not store.count(ALIEN):
+            create_aliens(self.all_sprites, store, self.width)
+
+        # game over check
+        lowest = store.max_bottom(ALIEN)
+        if lowest is not None and lowest >= self.player.rect.top:
+            self.game_over = True
+            self.particles.burst(*self.player.rect.center, 300, GREEN, speed=(0.05, 0.5), life=(600, 1500))
+            if self.scores:
+                self.placed = self.scores.add_score("invaders01", self.score)
+        profiler.mark("collision")
+
+    def draw(self, alpha):
+        renderer = self.renderer
+        renderer.set_text("score", self.font, f"Score: {self.score}", WHITE, (10, 10))
+        if self.loading_best is not None and self.loading_best.done():
+            self.best = self.loading_best.result() or 0
+            self.loading_best = None
+        if self.best is not None:
+            renderer.set_text("best", self.small_font, f"High score: {max(self.best, self.score)}", WHITE,
+                              (self.width - 10, 10), align="topright")
 
         # Game over
-        if game_over:
-            game_over_text = font.render("GAME OVER", True, WHITE)
-            screen.blit(game_over_text, (screen_width // 2 - 150, screen_height // 2 - 50))
-            restart_text = font.render("Press 'R' to Restart", True, WHITE)
-            screen.blit(restart_text, (screen_width // 2 - 200, screen_height // 2))
-
-            all_sprites.empty()
-            aliens.empty()
-            bullets.empty()
+        if self.game_over:
+            renderer.set_text("game_over", self.font, "GAME OVER", WHITE,
+                              (self.width // 2 - 150, self.height // 2 - 50))
+            renderer.set_text("restart", self.font, "Press 'R' to Restart", WHITE,
+                              (self.width // 2 - 200, self.height // 2))
+            if self.rank is None and self.placed is not None and self.placed.done():
+                self.rank = self.placed.result()
+            if self.rank is not None:
+                new_best = self.rank == 1 and self.score > (self.best or 0)
+                text = "New high score!" if new_best else f"#{self.rank} on the high score list"
+                renderer.set_text("rank", self.small_font, text, WHITE,
+                                  (self.width // 2, self.height // 2 + 60), align="midtop")
+
+        profiler.show_on(renderer, self.small_font, WHITE)
+        return renderer.render(self.all_sprites, self.particles)
+
+    def present(self, rects):
+        self.renderer.present(rects)
+        if self.game_over:
+            self.store.clear()
 
-        pygame.display.flip()
-        clock.tick(60)
 
-    pygame.quit()
-    sys.exit()
+def main():
+    # fullscreen at the logical size, upscaled by SDL (GPU) with vsync if possible
+    screen = game_host.open_window((LOGICAL_WIDTH, LOGICAL_HEIGHT), "Space Invaders - Auto Fire",
+                                   pygame.FULLSCREEN | pygame.SCALED, vsync=1)
+    loop = GameLoop(profiler, fps=60, latency=latency, inputs=inputs)
+    scene = loop.run(GameScene(screen))
 
+    inputs.close(state_checksum(scene.store, scene.score))
+    if RENDER_STATS:
+        print(scene.renderer.report())
 
 if __name__ == "__main__":
     main()
+    pygame.quit()
+    sys.exit()
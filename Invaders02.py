@@ -1,10 +1,30 @@
 # Write your code here :-)# -*- coding: utf-8 -*-
 
+import os
+
 import pygame
 
 import sys
 
-import random
+import numpy as np
+
+import game_host
+
+from dirty_render import DirtyRenderer
+
+from frame_profiler import FrameProfiler
+
+from game_loop import GameLoop, Scene
+
+from input_replay import InputSource, state_checksum
+
+from input_latency import LatencyProbe
+
+from entities import EntityStore, EntitySprite, solid_image, PLAYER, ALIEN, BULLET, ALIEN_BULLET
+
+from particles import ParticleSystem
+
+import scores
 
 # 色の定義
 
@@ -18,270 +38,450 @@ GREEN = (0, 255, 0)
 
 DARK_GREEN = (0, 40, 0)
 
-# プレイヤークラス
+# DIRTY_RECTS=1 で差分描画、RENDER_STATS=1 で転送ピクセル数を表示
 
-class Player(pygame.sprite.Sprite):
+DIRTY_RECTS = os.environ.get("DIRTY_RECTS") == "1"
 
-    def __init__(self):
+RENDER_STATS = os.environ.get("RENDER_STATS") == "1"
 
-        super().__init__()
+# F3 でフレーム時間の内訳を表示 (frame_profiler.py)
 
-        self.image = pygame.Surface((30, 30))
+profiler = FrameProfiler("invaders02")
 
-        self.image.fill(GREEN)
+# RECORD_INPUT / REPLAY_INPUT で入力を記録・再生 (input_replay.py)
 
-        self.rect = self.image.get_rect()
+inputs = InputSource.from_env(
 
-        self.rect.center = (400, 550)
+    "invaders02", (pygame.K_LEFT, pygame.K_RIGHT),
 
-        self.speed = 5
+    [(pygame.KEYDOWN, pygame.K_SPACE), (pygame.KEYDOWN, pygame.K_s), (pygame.KEYDOWN, pygame.K_r)])
+
+# INPUT_LATENCY / LATE_INPUT で入力から表示までの遅延を計測 (input_latency.py)
+
+latency = LatencyProbe("invaders02", (pygame.K_LEFT, pygame.K_RIGHT))
+
+# ハイスコアは scores.db に保存 (scores.py)。再生中は記録しない
 
-    def update(self):
+KEEP_SCORES = not inputs.replaying
 
-        keys = pygame.key.get_pressed()
+# プレイヤークラス
+
+class Player(EntitySprite):
+
+    def __init__(self, store):
+
+        rect = pygame.Rect(0, 0, 30, 30)
+
+        rect.center = (400, 550)
+
+        super().__init__(store, PLAYER, solid_image((30, 30), GREEN), rect)
+
+        self.speed = 5
+
+    def update(self, keys):
 
         if keys[pygame.K_LEFT] and self.rect.left > 0:
 
-            self.rect.x -= self.speed
+            self.store.x[self.index] -= self.speed
 
         if keys[pygame.K_RIGHT] and self.rect.right < 800:
 
-            self.rect.x += self.speed
+            self.store.x[self.index] += self.speed
 
 # エイリアンクラス
 
-class Alien(pygame.sprite.Sprite):
+class Alien(EntitySprite):
 
-    def __init__(self, x, y, all_sprites, alien_bullets):
+    def __init__(self, store, x, y):
 
-        super().__init__()
+        super().__init__(store, ALIEN, solid_image((30, 30), RED), (x, y, 30, 30), vx=2)
 
-        self.image = pygame.Surface((30, 30))
+# プレイヤーの弾クラス
 
-        self.image.fill(RED)
+class Bullet(EntitySprite):
 
-        self.rect = self.image.get_rect()
+    def __init__(self, store, x, y):
 
-        self.rect.topleft = (x, y)
+        rect = pygame.Rect(0, 0, 5, 10)
 
-        self.speed = 2
+        rect.center = (x, y)
 
-        self.all_sprites = all_sprites
+        super().__init__(store, BULLET, solid_image((5, 10), WHITE), rect, vy=-10)
 
-        self.alien_bullets = alien_bullets
+# エイリアンの弾クラス
 
-    def update(self):
+class AlienBullet(EntitySprite):
 
-        self.rect.x += self.speed
+    def __init__(self, store, x, y):
 
-        if self.rect.right >= 800 or self.rect.left <= 0:
+        rect = pygame.Rect(0, 0, 5, 10)
 
-            self.speed = -self.speed
+        rect.center = (x, y)
 
-            self.rect.y += 40
+        super().__init__(store, ALIEN_BULLET, solid_image((5, 10), RED), rect, vy=5)
 
-        if random.randint(1, 300) == 1:  # 1/300の確率で弾を発射
+# トーチカ (弾で少しずつ削れる)
 
-            bullet = AlienBullet(self.rect.centerx, self.rect.bottom)
+BUNKER_SIZE = (66, 48)
 
-            self.all_sprites.add(bullet)
+BUNKER_Y = 450
 
-            self.alien_bullets.add(bullet)
+BULLET_MASK = pygame.mask.Mask((5, 10), fill=True)
 
-# プレイヤーの弾クラス
+ALIEN_MASK = pygame.mask.Mask((30, 30), fill=True)
 
-class Bullet(pygame.sprite.Sprite):
+def make_crater(radius):
 
-    def __init__(self, x, y):
+    surf = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
 
-        super().__init__()
+    pygame.draw.circle(surf, WHITE, (radius, radius), radius)
 
-        self.image = pygame.Surface((5, 10))
+    return pygame.mask.from_surface(surf)
 
-        self.image.fill(WHITE)
+CRATER = make_crater(5)
 
-        self.rect = self.image.get_rect()
+class Bunker:
 
-        self.rect.center = (x, y)
+    """
 
-        self.speed = -10
+    ピクセルはレンダラーの背景に直接描き、当たり判定はマスクで行う。
 
-    def update(self):
+    被弾したときは当たった周辺だけマスクと背景を書き換える。
 
-        self.rect.y += self.speed
+    """
 
-        if self.rect.bottom < 0:
+    def __init__(self, centerx, background):
 
-            self.kill()
+        self.rect = pygame.Rect((0, 0), BUNKER_SIZE)
 
-# エイリアンの弾クラス
+        self.rect.midtop = (centerx, BUNKER_Y)
 
-class AlienBullet(pygame.sprite.Sprite):
+        w, h = BUNKER_SIZE
 
-    def __init__(self, x, y):
+        image = pygame.Surface(BUNKER_SIZE, pygame.SRCALPHA)
 
-        super().__init__()
+        # 上の角を落とし、下にアーチをあけた形
 
-        self.image = pygame.Surface((5, 10))
+        pygame.draw.polygon(image, GREEN, [(0, 12), (12, 0), (w - 12, 0), (w, 12), (w, h), (w - 18, h),
 
-        self.image.fill(RED)
+                                           (w - 22, h - 14), (22, h - 14), (18, h), (0, h)])
 
-        self.rect = self.image.get_rect()
+        self.mask = pygame.mask.from_surface(image)
 
-        self.rect.center = (x, y)
+        self.background = background
 
-        self.speed = 5
+        background.blit(image, self.rect)
 
-    def update(self):
+    def hit_test(self, mask, x, y):
 
-        self.rect.y += self.speed
+        """mask を (x, y) に置いたときの最初の接触点 (画面座標)、なければ None"""
 
-        if self.rect.top > 600:
+        point = self.mask.overlap(mask, (x - self.rect.x, y - self.rect.y))
 
-            self.kill()
+        if point is None:
 
-# メインループ
+            return None
 
-def main():
+        return self.rect.x + point[0], self.rect.y + point[1]
 
-    pygame.init()
+    def erase(self, mask, x, y):
 
-    screen = pygame.display.set_mode((800, 600))
+        """(x, y) に置いた mask の部分を削る。書き換えた範囲 (画面座標) を返す"""
 
-    pygame.display.set_caption("Space Invaders")
+        self.mask.erase(mask, (x - self.rect.x, y - self.rect.y))
 
-    font = pygame.font.SysFont(None, 55)
+        mask.to_surface(self.background, setcolor=DARK_GREEN, unsetcolor=None, dest=(x, y))
 
-    all_sprites = pygame.sprite.Group()
+        return pygame.Rect((x, y), mask.get_size())
 
-    aliens = pygame.sprite.Group()
+def bunker_hits(store, bunkers, renderer, particles):
 
-    bullets = pygame.sprite.Group()
+    """弾とトーチカの当たり判定。矩形で絞り込んでからマスクで調べる"""
 
-    alien_bullets = pygame.sprite.Group()
+    bullets = np.flatnonzero(store.alive & ((store.kind == BULLET) | (store.kind == ALIEN_BULLET)))
 
-    player = Player()
+    aliens = store.of_kind(ALIEN)
 
-    all_sprites.add(player)
+    dead = []
 
-    # スコアの初期化
+    r = CRATER.get_size()[0] // 2
 
-    score = 0
+    for bunker in bunkers:
 
-    game_over = False
+        box = bunker.rect
 
-    game_clear = False
+        for i in bullets[(store.x[bullets] < box.right) & (store.x[bullets] + store.w[bullets] > box.left) &
 
-    game_started = False
+                         (store.y[bullets] < box.bottom) & (store.y[bullets] + store.h[bullets] > box.top)]:
 
-    # エイリアンを配置
+            point = bunker.hit_test(BULLET_MASK, int(store.x[i]), int(store.y[i]))
 
-    for i in range(10):
+            if point is None:
 
-        for j in range(3):
+                continue
 
-            alien = Alien(50 + i * 50, 70 + j * 80, all_sprites, alien_bullets)
+            dead.append(i)
 
-            all_sprites.add(alien)
+            renderer.update_background(bunker.erase(CRATER, point[0] - r, point[1] - r))
 
-            aliens.add(alien)
+            particles.burst(*point, 6, GREEN, speed=(0.02, 0.12), life=(150, 400))
 
-    running = True
+        # 降りてきたエイリアンはトーチカを削りながら進む
 
-    while running:
+        for i in aliens[(store.x[aliens] < box.right) & (store.x[aliens] + store.w[aliens] > box.left) &
 
-        for event in pygame.event.get():
+                        (store.y[aliens] < box.bottom) & (store.y[aliens] + store.h[aliens] > box.top)]:
 
-            if event.type == pygame.QUIT:
+            renderer.update_background(bunker.erase(ALIEN_MASK, int(store.x[i]), int(store.y[i])))
 
-                running = False
+    store.kill(dead)
 
-            elif event.type == pygame.KEYDOWN:
+# エイリアンと弾をまとめて一括更新
 
-                if event.key == pygame.K_SPACE and not game_over and game_started:
+def update_entities(store, all_sprites):
 
-                    bullet = Bullet(player.rect.centerx, player.rect.top)
+    store.move()
 
-                    all_sprites.add(bullet)
+    store.bounce_x(ALIEN, 0, 800, 40)
 
-                    bullets.add(bullet)
+    # 1/300の確率で弾を発射
 
-                if event.key == pygame.K_s:
+    shooters = store.of_kind(ALIEN)
 
-                    game_started = True
+    shooters = shooters[store.rng.random(len(shooters)) < 1 / 300]
 
-                if game_over and event.key == pygame.K_r:
+    for i in shooters:
 
-                    main()  # リスタート
+        x = int(store.x[i] + store.w[i] // 2)
 
-                    return
+        y = int(store.y[i] + store.h[i])
 
-        if not game_over and game_started:
+        all_sprites.add(AlienBullet(store, x, y))
 
-            all_sprites.update()
+    store.cull(BULLET, 0, 600)
 
-            # 弾とエイリアンの衝突
+    store.cull(ALIEN_BULLET, 0, 600)
 
-            hits = pygame.sprite.groupcollide(bullets, aliens, True, True)
+# ゲーム本体のシーン (R でリスタートすると新しいシーンに切り替わる)
 
-            if hits:
+class GameScene(Scene):
 
-                score += 10
+    def __init__(self, screen):
 
-            # プレイヤーと敵弾の衝突
+        self.screen = screen
 
-            player_hits = pygame.sprite.spritecollide(player, alien_bullets, True)
+        self.font = game_host.font(55)
 
-            if player_hits:
+        self.small_font = game_host.font(24)
 
-                game_over = True
+        self.renderer = DirtyRenderer(screen, DARK_GREEN, dirty=DIRTY_RECTS)
 
-            # エイリアンが下に到達
+        # 爆発のパーティクル (particles.py)
 
-            for alien in aliens:
+        self.particles = ParticleSystem(screen.get_size(), DARK_GREEN, gravity=0.0004, drag=0.002)
 
-                if alien.rect.bottom >= player.rect.top:
+        self.bunkers = [Bunker(x, self.renderer.background) for x in (160, 320, 480, 640)]
 
-                    game_over = True
+        self.store = EntityStore(seed=inputs.new_seed())
 
-            # 全部倒したらクリア
+        self.all_sprites = pygame.sprite.Group()
 
-            if not aliens:
+        self.player = Player(self.store)
 
-                game_clear = True
+        self.all_sprites.add(self.player)
 
-        # 描画
+        # スコアの初期化
 
-        screen.fill(DARK_GREEN)
+        self.score = 0
 
-        all_sprites.draw(screen)
+        self.game_over = False
 
-        score_text = font.render(f"Score: {score}", True, WHITE)
+        self.game_clear = False
 
-        screen.blit(score_text, (10, 10))
+        self.game_started = False
 
-        if game_over:
+        self.scores = scores.shared() if KEEP_SCORES else None
 
-            game_over_text = font.render("GAME OVER - Press R to Restart", True, WHITE)
+        self.best = None
 
-            screen.blit(game_over_text, (100, 250))
+        self.loading_best = self.scores.best("invaders02") if self.scores else None  # ハイスコアも書き込みスレッドから (Future)
 
-        if game_clear:
+        self.rank = None
 
-            game_clear_text = font.render("GAME CLEAR", True, WHITE)
+        self.placed = None  # 書き込みスレッドが順位を返す (Future)
 
-            screen.blit(game_clear_text, (300, 250))
+        # エイリアンを配置
 
-        pygame.display.flip()
+        for i in range(10):
 
-        pygame.time.Clock().tick(60)
+            for j in range(3):
 
-    pygame.quit()
+                self.all_sprites.add(Alien(self.store, 50 + i * 50, 70 + j * 80))
 
-    sys.exit()
+    def event(self, event):
+
+        if event.type == pygame.KEYDOWN:
+
+            if event.key == pygame.K_SPACE and not self.game_over and self.game_started:
+
+                self.all_sprites.add(Bullet(self.store, self.player.rect.centerx, self.player.rect.top))
+
+            if event.key == pygame.K_s:
+
+                self.game_started = True
+
+            if self.game_over and event.key == pygame.K_r:
+
+                self.loop.switch(GameScene(self.screen))  # リスタート
+
+    def update(self, dt_ms):
+
+        self.particles.update(dt_ms)
+
+        if self.game_over or not self.game_started:
+
+            return
+
+        store = self.store
+
+        player = self.player
+
+        x = player.rect.x
+
+        player.update(self.loop.keys)
+
+        if player.rect.x != x:
+
+            latency.moved()
+
+        update_entities(store, self.all_sprites)
+
+        profiler.mark("update")
+
+        # 弾とトーチカの衝突
+
+        bunker_hits(store, self.bunkers, self.renderer, self.particles)
+
+        # 弾とエイリアンの衝突
+
+        hits, dead = store.collide(BULLET, ALIEN)
+
+        if len(hits):
+
+            self.score += 10
+
+            self.particles.burst(store.x[dead] + store.w[dead] / 2, store.y[dead] + store.h[dead] / 2, 16, RED)
+
+        # プレイヤーと敵弾の衝突
+
+        player_hits = store.collide_one(player.index, ALIEN_BULLET)
+
+        if len(player_hits):
+
+            self.game_over = True
+
+            self.particles.burst(*player.rect.center, 300, GREEN, speed=(0.05, 0.5), life=(600, 1500))
+
+        # エイリアンが下に到達
+
+        lowest = store.max_bottom(ALIEN)
+
+        if lowest is not None and lowest >= player.rect.top:
+
+            self.game_over = True
+
+            self.particles.burst(*player.rect.center, 300, GREEN, speed=(0.05, 0.5), life=(600, 1500))
+
+        # 全部倒したらクリア
+
+        if not store.count(ALIEN):
+
+            self.game_clear = True
+
+        if self.game_over or self.game_clear:
+
+            self.save_score()
+
+        profiler.mark("collision")
+
+    # ゲーム終了時にスコアを保存 (書き込みは別スレッド)
+
+    def save_score(self):
+
+        if self.scores and self.placed is None:
+
+            self.placed = self.scores.add_score("invaders02", self.score, cleared=self.game_clear)
+
+    # 描画
+
+    def draw(self, alpha):
+
+        renderer = self.renderer
+
+        renderer.set_text("score", self.font, f"Score: {self.score}", WHITE, (10, 10))
+
+        if self.loading_best is not None and self.loading_best.done():
+
+            self.best = self.loading_best.result() or 0
+
+            self.loading_best = None
+
+        if self.best is not None:
+
+            renderer.set_text("best", self.small_font, f"High score: {max(self.best, self.score)}", WHITE,
+
+                              (790, 10), align="topright")
+
+        if self.rank is None and self.placed is not None and self.placed.done():
+
+            self.rank = self.placed.result()
+
+        if self.rank is not None:
+
+            new_best = self.rank == 1 and self.score > (self.best or 0)
+
+            text = "New high score!" if new_best else f"#{self.rank} on the high score list"
+
+            renderer.set_text("rank", self.small_font, text, WHITE, (400, 320), align="midtop")
+
+        if self.game_over:
+
+            renderer.set_text("game_over", self.font, "GAME OVER - Press R to Restart", WHITE, (100, 250))
+
+        if self.game_clear:
+
+            renderer.set_text("game_clear", self.font, "GAME CLEAR", WHITE, (300, 250))
+
+        profiler.show_on(renderer, self.small_font, WHITE)
+
+        return renderer.render(self.all_sprites, self.particles)
+
+    def present(self, rects):
+
+        self.renderer.present(rects)
+
+# メインループ
+
+def main():
+
+    screen = game_host.open_window((800, 600), "Space Invaders")
+
+    loop = GameLoop(profiler, fps=60, latency=latency, inputs=inputs)
+
+    scene = loop.run(GameScene(screen))
+
+    inputs.close(state_checksum(scene.store, scene.score))
+
+    if RENDER_STATS:
+
+        print(scene.renderer.report())
 
 if __name__ == "__main__":
 
     main()
+
+    pygame.quit()
+
+    sys.exit()
  # ここにコードを書いてね :-)
 
@@ -3,6 +3,12 @@ import pygame
 
 import sys
 
+import game_host
+
+from frame_profiler import FrameProfiler
+
+from game_loop import GameLoop, Scene
+
 # Constants
 
 BLACK = (0, 0, 0)
@@ -19,17 +25,21 @@ BOARD_SIZE = 6
 
 GRID_SIZE = SIZE // BOARD_SIZE
 
-# Initialize Pygame
+# F3 toggles the frame time overlay (see frame_profiler.py)
+
+profiler = FrameProfiler("othello")
 
-pygame.init()
+RESULT_MS = 10000  # how long the result stays up
 
-screen = pygame.display.set_mode((SIZE, SIZE))
+class Othello(Scene):
 
-pygame.display.set_caption("オセロゲーム")
+    def __init__(self, screen):
 
-class Othello:
+        self.screen = screen
 
-    def __init__(self):
+        self.result = None
+
+        self.dirty = True
 
         self.board = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
 
@@ -47,7 +57,7 @@ class Othello:
 
     def draw_board(self):
 
-        screen.fill(GREEN)
+        self.screen.fill(GREEN)
 
         for x in range(BOARD_SIZE):
 
@@ -55,7 +65,7 @@ class Othello:
 
                 rect = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
 
-                pygame.draw.rect(screen, BLACK, rect, 1)
+                pygame.draw.rect(self.screen, BLACK, rect, 1)
 
                 if self.board[x][y] is not None:
 
@@ -65,7 +75,7 @@ class Othello:
 
         pygame.draw.circle(
 
-            screen,
+            self.screen,
 
             color,
 
@@ -209,55 +219,65 @@ class Othello:
 
     def display_result(self, result):
 
-        font = pygame.font.Font(None, 74)
+        self.result = result
 
-        text = font.render(result, True, YELLOW)
+        self.loop.after(RESULT_MS, self.loop.stop)
 
-        text_rect = text.get_rect(center=(SIZE // 2, SIZE // 2))
+    # the board only changes on a click: sleep between them unless something is counting down
 
-        screen.blit(text, text_rect)
+    @property
 
-        pygame.display.flip()
+    def idle(self):
 
-        pygame.time.wait(10000)
+        return self.result is None and not profiler.show
 
-        pygame.quit()
+    def event(self, event):
 
-        sys.exit()
+        if event.type == pygame.MOUSEBUTTONDOWN and self.result is None:
 
-def main():
+            x, y = event.pos
 
-    game = Othello()
+            self.next_move(x // GRID_SIZE, y // GRID_SIZE)
 
-    running = True
+            self.dirty = True
 
-    while running:
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
 
-        for event in pygame.event.get():
+            self.dirty = True
 
-            if event.type == pygame.QUIT:
+    def draw(self, alpha):
 
-                running = False
+        if not (self.dirty or profiler.show):
 
-            elif event.type == pygame.MOUSEBUTTONDOWN:
+            return []
 
-                x, y = event.pos
+        self.dirty = False
 
-                x //= GRID_SIZE
+        self.draw_board()
 
-                y //= GRID_SIZE
+        if self.result:
 
-                game.next_move(x, y)
+            font = game_host.font(74)
 
-        game.draw_board()
+            text = font.render(self.result, True, YELLOW)
 
-        pygame.display.flip()
+            self.screen.blit(text, text.get_rect(center=(SIZE // 2, SIZE // 2)))
 
-    pygame.quit()
+        profiler.draw(self.screen, game_host.font(24), YELLOW)
 
-    sys.exit()
+        return None
+
+def main():
+
+    screen = game_host.open_window((SIZE, SIZE), "オセロゲーム")
+
+    GameLoop(profiler).run(Othello(screen))
 
 if __name__ == "__main__":
 
     main()
+
+    pygame.quit()
+
+    sys.exit()
  # ここにコードを書いてね :-)
@@ -1,9 +1,20 @@
-  # polished_pong.py
+# polished_pong.py
 import pygame
 import sys
 import random
 import math
 
+import os
+
+import game_host
+from dirty_render import DirtyRenderer
+from particles import ParticleSystem
+import scores
+from frame_profiler import FrameProfiler
+from game_loop import GameLoop, Scene
+from telemetry import TelemetryWriter
+from input_latency import LatencyProbe
+
 # -------- CONFIG --------
 SCREEN_WIDTH = 900
 SCREEN_HEIGHT = 600
@@ -24,6 +35,20 @@ BALL_SPEEDUP = 1.06
 BALL_MAX_SPEED = 14.0
 PADDLE_MAX_SPEED = 14
 
+# AI presets: paddle speed, reaction time (ms), prediction strength
+# (from pong_tuning.py: about 25% / 50% / 75% of points won against its scripted player)
+AI_PRESETS = {
+    'easy': (14, 220, 0.75),
+    'normal': (14, 160, 0.75),
+    'hard': (14, 80, 0.75),
+}
+
+# AI aim error (px, std dev) at prediction_strength 0; shrinks linearly to 0 at 1.0
+AI_MAX_AIM_ERROR = PADDLE_HEIGHT * 1.5
+
+# Ball movement is swept, this many bounces can be resolved in one frame
+BALL_MAX_BOUNCES = 4
+
 WIN_SCORE = 7
 SERVE_DELAY_MS = 900  # milliseconds before serve after a score
 
@@ -34,483 +59,22 @@ CYAN = (0, 200, 220)
 MAGENTA = (255, 80, 180)
 GRAY = (90, 90, 90)
 
-# ------------------------
-
-class Paddle(pygame.sprite.Sprite):
-    def __init__(self, x, y, color, speed=PADDLE_SPEED):
-        super().__init__()
-        self.image = pygame.Surface((PADDLE_WIDTH, PADDLE_HEIGHT))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.speed = speed
-
-    def move_up(self):
-        self.rect.y -= self.speed
-        if self.rect.top < 0:
-            self.rect.top = 0
-
-    def move_down(self):
-        self.rect.y += self.speed
-        if self.rect.bottom > SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
-
-    def update_speed(self, new_speed):
-        self.speed = max(1, min(PADDLE_MAX_SPEED, new_speed))
-
-class Ball(pygame.sprite.Sprite):
-    def __init__(self, color):
-        super().__init__()
-        self.image = pygame.Surface((BALL_SIZE, BALL_SIZE), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, color, (BALL_SIZE // 2, BALL_SIZE // 2), BALL_SIZE // 2)
-        self.rect = self.image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-
-        self.speed = BALL_SPEED
-        angle = random.uniform(-0.25 * math.pi, 0.25 * math.pi)
-        self.vx = self.speed * math.copysign(math.cos(angle), random.choice([-1, 1]))
-        self.vy = self.speed * math.sin(angle)
-
-    def reset(self, direction=1, speed=None):
-        """Reset to center. direction: +1 ball to right, -1 to left, 0 random"""
-        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.speed = speed if speed is not None else BALL_SPEED
-        angle = random.uniform(-0.25 * math.pi, 0.25 * math.pi)
-        if direction == 0:
-            sign = random.choice([-1, 1])
-        else:
-            sign = 1 if direction > 0 else -1
-        self.vx = sign * self.speed * math.cos(angle)
-        self.vy = self.speed * math.sin(angle)
-
-    def update(self):
-        self.rect.x += int(self.vx)
-        self.rect.y += int(self.vy)
-
-        # Bounce off top/bottom
-        if self.rect.top <= 0:
-            self.rect.top = 0
-            self.vy = -self.vy
-        elif self.rect.bottom >= SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
-            self.vy = -self.vy
-
-    def apply_speed(self, new_speed):
-        """Scale vx, vy to match new_speed while preserving direction."""
-        angle = math.atan2(self.vy, self.vx)
-        self.vx = new_speed * math.cos(angle)
-        self.vy = new_speed * math.sin(angle)
-        self.speed = new_speed
+# DIRTY_RECTS=1 only sends the parts of the screen that changed to the display
+DIRTY_RECTS = os.environ.get("DIRTY_RECTS") == "1"
 
-# Helpers
-def clamp(n, a, b):
-    return max(a, min(b, n))
+# F3 toggles the per-phase frame time overlay (see frame_profiler.py)
+profiler = FrameProfiler("pingpong")
 
-def paddle_hit_ball(ball, paddle):
-    """
-    Adjust ball velocity depending where on the paddle it hit.
-    Returns True if handled (i.e., collision).
-    """
-    if not ball.rect.colliderect(paddle.rect):
-        return False
+# INPUT_LATENCY=1 reports key press -> screen times, LATE_INPUT=1 reads input later (see input_latency.py)
+latency = LatencyProbe("pingpong", (pygame.K_w, pygame.K_s, pygame.K_UP, pygame.K_DOWN))
 
-    # Determine collision side: left paddle or right paddle
-    # Move ball out slightly to avoid repeated collisions
-    if ball.vx < 0:  # ball moving left => probably hit left paddle
-        ball.rect.left = paddle.rect.right
-    else:
-        ball.rect.right = paddle.rect.left
+# PONG_RECORD=match.pongr records each match frame by frame (see pong_replay.py)
+RECORD_PATH = os.environ.get("PONG_RECORD")
 
-    # Relative hit position: -1 (top) ... 0 (middle) ... +1 (bottom)
-    rel_y = (ball.rect.centery - paddle.rect.centery) / (paddle.rect.height / 2)
-    rel_y = clamp(rel_y, -1, 1)
-
-    # Max bounce angle (radians)
-    max_angle = 3 * math.pi / 8  # ~67.5 degrees
-    angle = rel_y * max_angle
-
-    # New speed increases slightly
-    new_speed = clamp(ball.speed * BALL_SPEEDUP, 3.0, BALL_MAX_SPEED)
-
-    # Horizontal direction flips
-    dir_sign = -1 if ball.vx < 0 else 1
-    # We want ball to go opposite direction relative to incoming (flip)
-    dir_sign *= -1
-
-    ball.vx = dir_sign * new_speed * math.cos(angle)
-    ball.vy = new_speed * math.sin(angle)
-    ball.speed = new_speed
-
-    return True
-
-# AI logic
-class SimpleAI:
-    def __init__(self, paddle, difficulty='normal'):
-        self.paddle = paddle
-        self.set_difficulty(difficulty)
-        self.reaction_timer = 0
-
-    def set_difficulty(self, difficulty):
-        diff = difficulty.lower()
-        if diff == 'easy':
-            self.paddle.update_speed(6)
-            self.react_ms = 200
-            self.prediction_strength = 0.45
-        elif diff == 'hard':
-            self.paddle.update_speed(12)
-            self.react_ms = 40
-            self.prediction_strength = 0.98
-        else:  # normal
-            self.paddle.update_speed(8)
-            self.react_ms = 110
-            self.prediction_strength = 0.75
-
-    def update(self, ball, dt_ms):
-        # reaction: only move after a small delay to simulate imperfection
-        self.reaction_timer += dt_ms
-        if self.reaction_timer < self.react_ms:
-            return
-        self.reaction_timer = 0
-
-        # Predict ball vertical position roughly
-        predicted_y = ball.rect.centery + (ball.vy * (abs(ball.rect.centerx - self.paddle.rect.centerx) / max(1, abs(ball.vx))))
-        target = ball.rect.centery * (1 - self.prediction_strength) + predicted_y * self.prediction_strength
-        if target < self.paddle.rect.centery - 6:
-            self.paddle.move_up()
-        elif target > self.paddle.rect.centery + 6:
-            self.paddle.move_down()
-
-# UI / Game states
-def draw_centered_text(screen, text, font, color, y):
-    surf = font.render(text, True, color)
-    rect = surf.get_rect(center=(SCREEN_WIDTH // 2, y))
-    screen.blit(surf, rect)
-
-def main():
-    pygame.init()
-    try:
-        pygame.mixer.init()
-    except Exception:
-        pass
-
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Polished Pong")
-    clock = pygame.time.Clock()
-
-    # Fonts
-    title_font = pygame.font.Font(None, 72)
-    menu_font = pygame.font.Font(None, 36)
-    hud_font = pygame.font.Font(None, 28)
-    big_font = pygame.font.Font(None, 56)
-
-    # Load sounds if available
-    bounce_sound = "pinpong.wav"
-    score_sound = "pinpong.wav"
-    try:
-        bounce_sound = pygame.mixer.Sound("pinpong.wav")
-        score_sound = pygame.mixer.Sound("pinpong.wav")
-    except Exception:
-        # No problem; sound optional
-        bounce_sound = None
-        score_sound = None
-
-    # Game variables
-    running = True
-    in_menu = True
-
-    # Menu selections
-    selected_mode = 1  # 1: 1-player, 2: 2-player
-    difficulty = 'Normal'
-    win_score = WIN_SCORE
-
-    while running:
-        # ---------- MENU ----------
-        while in_menu:
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                    elif ev.key == pygame.K_1:
-                        selected_mode = 1
-                    elif ev.key == pygame.K_2:
-                        selected_mode = 2
-                    elif ev.key == pygame.K_UP:
-                        # toggle difficulty up
-                        if difficulty == 'Easy':
-                            difficulty = 'Normal'
-                        elif difficulty == 'Normal':
-                            difficulty = 'Hard'
-                    elif ev.key == pygame.K_DOWN:
-                        if difficulty == 'Hard':
-                            difficulty = 'Normal'
-                        elif difficulty == 'Normal':
-                            difficulty = 'Easy'
-                    elif ev.key == pygame.K_LEFT:
-                        win_score = max(1, win_score - 1)
-                    elif ev.key == pygame.K_RIGHT:
-                        win_score = min(15, win_score + 1)
-                    elif ev.key == pygame.K_SPACE:
-                        in_menu = False
-                    elif ev.key == pygame.K_RETURN:
-                        in_menu = False
-
-            screen.fill(BLACK)
-            draw_centered_text(screen, "POLISHED PONG", title_font, WHITE, SCREEN_HEIGHT * 0.18)
-            draw_centered_text(screen, "Press 1 for Single Player  •  2 for Two Player", menu_font, GRAY, SCREEN_HEIGHT * 0.34)
-            draw_centered_text(screen, f"Mode: {'1-Player (AI)' if selected_mode == 1 else '2-Player'}", menu_font, CYAN, SCREEN_HEIGHT * 0.44)
-            draw_centered_text(screen, f"Difficulty (UP/DOWN): {difficulty}", menu_font, MAGENTA, SCREEN_HEIGHT * 0.52)
-            draw_centered_text(screen, f"Win Score (LEFT/RIGHT): {win_score}", menu_font, WHITE, SCREEN_HEIGHT * 0.60)
-            draw_centered_text(screen, "P: Pause during game • R: Restart • ESC: Quit", hud_font, GRAY, SCREEN_HEIGHT * 0.72)
-            draw_centered_text(screen, "Press SPACE or Enter to Start", menu_font, WHITE, SCREEN_HEIGHT * 0.85)
-
-            # small legend on controls
-            left_ctrl = menu_font.render("Player 1: W / S", True, CYAN)
-            right_ctrl = menu_font.render("Player 2: Up / Down", True, MAGENTA)
-            screen.blit(left_ctrl, (40, SCREEN_HEIGHT - 60))
-            screen.blit(right_ctrl, (SCREEN_WIDTH - right_ctrl.get_width() - 40, SCREEN_HEIGHT - 60))
-
-            pygame.display.flip()
-            clock.tick(FPS)
-
-        # ---------- SETUP GAME ----------
-        # paddles
-        paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
-        paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
-
-        # AI (if 1-player)
-        ai = None
-        if selected_mode == 1:
-            ai = SimpleAI(paddle2, difficulty=difficulty)
-
-        # ball & groups
-        ball = Ball(WHITE)
-        all_sprites = pygame.sprite.Group(paddle1, paddle2, ball)
-
-        score1 = 0
-        score2 = 0
-        paused = False
-        winner = None
-
-        # Serve control
-        next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-        pending_serve_dir = random.choice([-1, 1])  # who the ball goes to on serve
-
-        # main game loop
-        last_time = pygame.time.get_ticks()
-        while True:
-            dt_ms = clock.tick(FPS)
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                    if ev.key == pygame.K_p:
-                        paused = not paused
-                    if ev.key == pygame.K_r:
-                        # restart to menu
-                        in_menu = True
-                        break
-
-            if in_menu:
-                break  # exit to main menu loop to restart
-
-            if paused:
-                # Draw pause overlay
-                screen.fill(BLACK)
-                all_sprites.draw(screen)
-                score1_text = big_font.render(str(score1), True, CYAN)
-                score2_text = big_font.render(str(score2), True, MAGENTA)
-                screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 20))
-                screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 20))
-                draw_centered_text(screen, "PAUSED - Press P to resume", menu_font, WHITE, SCREEN_HEIGHT // 2)
-                pygame.display.flip()
-                continue
-
-            # Controls
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_w]:
-                paddle1.move_up()
-            if keys[pygame.K_s]:
-                paddle1.move_down()
-            if selected_mode == 2:
-                if keys[pygame.K_UP]:
-                    paddle2.move_up()
-                if keys[pygame.K_DOWN]:
-                    paddle2.move_down()
-
-            # AI update
-            if ai and not paused:
-                ai.update(ball, dt_ms)
-
-            # Serve logic: only move ball after serve delay
-            now = pygame.time.get_ticks()
-            if now < next_serve_time:
-                # show a "Get Ready" small overlay and don't move ball
-                # center ball and show countdown
-                ball.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-                screen.fill(BLACK)
-                # draw paddles and center line
-                pygame.draw.line(screen, GRAY, (SCREEN_WIDTH // 2, 0), (SCREEN_WIDTH // 2, SCREEN_HEIGHT), 2)
-                all_sprites.draw(screen)
-                # countdown
-                remain = max(0, (next_serve_time - now) // 1000 + 1)
-                draw_centered_text(screen, f"Serve in {remain}", menu_font, WHITE, SCREEN_HEIGHT * 0.45)
-                score1_text = big_font.render(str(score1), True, CYAN)
-                score2_text = big_font.render(str(score2), True, MAGENTA)
-                screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 20))
-                screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 20))
-                pygame.display.flip()
-                continue  # skip physics until serve time
-
-            # If serve time passed and ball not moving (vx ~ 0), ensure ball is launched
-            if abs(ball.vx) < 0.001 and abs(ball.vy) < 0.001:
-                ball.reset(direction=pending_serve_dir)
-
-            # Update sprites
-            all_sprites.update()
-
-            # Collisions: paddles
-            if paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2):
-                if bounce_sound:
-                    try:
-                        bounce_sound.play()
-                    except Exception:
-                        pass
-
-            # Score check
-            scored = False
-            if ball.rect.left <= 0:
-                score2 += 1
-                scored = True
-                pending_serve_dir = -1  # send to left (loser side)
-            elif ball.rect.right >= SCREEN_WIDTH:
-                score1 += 1
-                scored = True
-                pending_serve_dir = 1
-
-            if scored:
-                if score_sound:
-                    try:
-                        score_sound.play()
-                    except Exception:
-                        pass
-                # check win
-                if score1 >= win_score:
-                    winner = "PLAYER 1" if selected_mode == 2 or selected_mode == 1 else "PLAYER 1"
-                elif score2 >= win_score:
-                    winner = "PLAYER 2" if selected_mode == 2 else "COMPUTER"
-                # reset ball & pause before serve
-                ball.vx = 0
-                ball.vy = 0
-                ball.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-                next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-                # small randomize direction next serve
-                pending_serve_dir = random.choice([-1, 1])
-                if winner:
-                    # show game over screen
-                    screen.fill(BLACK)
-                    draw_centered_text(screen, f"{winner} WINS!", title_font, WHITE, SCREEN_HEIGHT * 0.35)
-                    draw_centered_text(screen, f"Final Score: {score1} - {score2}", menu_font, GRAY, SCREEN_HEIGHT * 0.50)
-                    draw_centered_text(screen, "Press R to return to menu or SPACE to play again", hud_font, WHITE, SCREEN_HEIGHT * 0.68)
-                    pygame.display.flip()
-
-                    # Wait for user decision
-                    waiting = True
-                    while waiting:
-                        for ev in pygame.event.get():
-                            if ev.type == pygame.QUIT:
-                                pygame.quit()
-                                sys.exit()
-                            if ev.type == pygame.KEYDOWN:
-                                if ev.key == pygame.K_r:
-                                    in_menu = True
-                                    waiting = False
-                                    break
-                                if ev.key == pygame.K_SPACE:
-                                    # reset everything for new match but keep mode/difficulty
-                                    score1 = 0
-                                    score2 = 0
-                                    paddle1.rect.centery = SCREEN_HEIGHT // 2
-                                    paddle2.rect.centery = SCREEN_HEIGHT // 2
-                                    ball.reset(direction=random.choice([-1, 1]), speed=BALL_SPEED)
-                                    winner = None
-                                    next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-                                    waiting = False
-                                    break
-                                if ev.key == pygame.K_ESCAPE:
-                                    pygame.quit()
-                                    sys.exit()
-                        clock.tick(FPS)
-                    if in_menu:
-                        break  # go back to menu
-                    else:
-                        continue  # continue playing new match
-
-            # Draw
-            screen.fill(BLACK)
-            # center dashed line
-            for y in range(0, SCREEN_HEIGHT, 22):
-                pygame.draw.rect(screen, GRAY, (SCREEN_WIDTH // 2 - 1, y + 6, 2, 12))
-            all_sprites.draw(screen)
-
-            # Scores
-            score1_text = big_font.render(str(score1), True, CYAN)
-            score2_text = big_font.render(str(score2), True, MAGENTA)
-            screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 18))
-            screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 18))
-
-            # Small HUD
-            mode_text = "1P (AI)" if selected_mode == 1 else "2P"
-            hud = hud_font.render(f"Mode: {mode_text} • Difficulty: {difficulty} • First to {win_score}", True, WHITE)
-            screen.blit(hud, (20, SCREEN_HEIGHT - 34))
-
-            pygame.display.flip()
-
-    pygame.quit()
-    sys.exit()
-
-if __name__ == "__main__":
-    main()
-# polished_pong.py
-import pygame
-import sys
-import random
-import math
-
-# -------- CONFIG --------
-SCREEN_WIDTH = 900
-SCREEN_HEIGHT = 600
-FPS = 60
-
-PADDLE_WIDTH = 12
-PADDLE_HEIGHT = 110
-PADDLE_MARGIN = 30
-
-BALL_SIZE = 16
-
-# Base speeds
-PADDLE_SPEED = 8
-BALL_SPEED = 5.0
-
-# Speed increase factors
-BALL_SPEEDUP = 1.06
-BALL_MAX_SPEED = 14.0
-PADDLE_MAX_SPEED = 14
-
-WIN_SCORE = 7
-SERVE_DELAY_MS = 900  # milliseconds before serve after a score
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (12, 12, 12)
-CYAN = (0, 200, 220)
-MAGENTA = (255, 80, 180)
-GRAY = (90, 90, 90)
+# PONG_TELEMETRY=rallies.jsonl (or .db for SQLite) logs stats for every rally
+TELEMETRY_PATH = os.environ.get("PONG_TELEMETRY")
+FRAME_SPIKE_MS = 25  # frames slower than this count as spikes in the rally stats
+telemetry = TelemetryWriter(TELEMETRY_PATH) if TELEMETRY_PATH else None
 
 # ------------------------
 
@@ -536,40 +100,94 @@ class Paddle(pygame.sprite.Sprite):
         self.speed = max(1, min(PADDLE_MAX_SPEED, new_speed))
 
 class Ball(pygame.sprite.Sprite):
-    def __init__(self, color):
+    def __init__(self, color, rng=None):
         super().__init__()
+        # its own generator (shared with the AI in a match), so replays can seed it alone
+        self.rng = rng or random.Random()
         self.image = pygame.Surface((BALL_SIZE, BALL_SIZE), pygame.SRCALPHA)
         pygame.draw.circle(self.image, color, (BALL_SIZE // 2, BALL_SIZE // 2), BALL_SIZE // 2)
         self.rect = self.image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
 
         self.speed = BALL_SPEED
-        angle = random.uniform(-0.25 * math.pi, 0.25 * math.pi)
-        self.vx = self.speed * math.copysign(math.cos(angle), random.choice([-1, 1]))
+        angle = self.rng.uniform(-0.25 * math.pi, 0.25 * math.pi)
+        self.vx = self.speed * math.copysign(math.cos(angle), self.rng.choice([-1, 1]))
         self.vy = self.speed * math.sin(angle)
 
+        # float center, the rect is only the rounded copy used for drawing
+        self.fx, self.fy = self.rect.center
+        self.paddles = ()
+        self.hits = []
+        self.last_rel_y = 0.0
+
+    def recenter(self):
+        """Put the ball back on the center spot (float position included)"""
+        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.fx, self.fy = self.rect.center
+
     def reset(self, direction=1, speed=None):
         """Reset to center. direction: +1 ball to right, -1 to left, 0 random"""
-        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.recenter()
         self.speed = speed if speed is not None else BALL_SPEED
-        angle = random.uniform(-0.25 * math.pi, 0.25 * math.pi)
+        angle = self.rng.uniform(-0.25 * math.pi, 0.25 * math.pi)
         if direction == 0:
-            sign = random.choice([-1, 1])
+            sign = self.rng.choice([-1, 1])
         else:
             sign = 1 if direction > 0 else -1
         self.vx = sign * self.speed * math.cos(angle)
         self.vy = self.speed * math.sin(angle)
 
-    def update(self):
-        self.rect.x += int(self.vx)
-        self.rect.y += int(self.vy)
+    def position(self):
+        """Float center, or the rect's if the ball was placed directly (push-out) since the last update"""
+        if self.rect.center != (round(self.fx), round(self.fy)):
+            return self.rect.center
+        return self.fx, self.fy
 
-        # Bounce off top/bottom
-        if self.rect.top <= 0:
-            self.rect.top = 0
-            self.vy = -self.vy
-        elif self.rect.bottom >= SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
-            self.vy = -self.vy
+    def update(self):
+        """
+        Move one frame. The path is swept against the walls and self.paddles,
+        so a fast ball can't skip through a paddle. Paddles hit this frame
+        are left in self.hits.
+        """
+        self.fx, self.fy = self.position()
+        self.hits = []
+        half = BALL_SIZE / 2
+        t_left = 1.0
+
+        for _ in range(BALL_MAX_BOUNCES):
+            vx, vy = self.vx, self.vy
+            t_hit = t_left
+            hit = None
+
+            # Top/bottom walls
+            if vy < 0:
+                t = max(0.0, (half - self.fy) / vy)
+                if t < t_hit:
+                    t_hit, hit = t, 'wall'
+            elif vy > 0:
+                t = max(0.0, (SCREEN_HEIGHT - half - self.fy) / vy)
+                if t < t_hit:
+                    t_hit, hit = t, 'wall'
+
+            # Paddles
+            for paddle in self.paddles:
+                t = sweep_paddle(self.fx, self.fy, vx, vy, paddle)
+                if t is not None and t < t_hit:
+                    t_hit, hit = t, paddle
+
+            self.fx += vx * t_hit
+            self.fy += vy * t_hit
+            t_left -= t_hit
+            if hit is None:
+                break
+            if hit == 'wall':
+                self.fy = clamp(self.fy, half, SCREEN_HEIGHT - half)
+                self.vy = -vy
+            else:
+                self.rect.center = (round(self.fx), round(self.fy))
+                bounce_off_paddle(self, hit)
+                self.hits.append(hit)
+
+        self.rect.center = (round(self.fx), round(self.fy))
 
     def apply_speed(self, new_speed):
         """Scale vx, vy to match new_speed while preserving direction."""
@@ -582,10 +200,37 @@ class Ball(pygame.sprite.Sprite):
 def clamp(n, a, b):
     return max(a, min(b, n))
 
+def sweep_paddle(x, y, vx, vy, paddle):
+    """
+    Time of impact (0..1 of this frame's move) of a ball centered at x, y
+    against the face of the paddle it is moving toward, or None.
+    """
+    half = BALL_SIZE / 2
+    r = paddle.rect
+    if vx < 0:
+        face = r.right + half
+        if x < face:
+            return None
+    elif vx > 0:
+        face = r.left - half
+        if x > face:
+            return None
+    else:
+        return None
+    t = (face - x) / vx
+    if t > 1.0:
+        return None
+    hit_y = y + vy * t
+    if r.top - half <= hit_y <= r.bottom + half:
+        return t
+    return None
+
 def paddle_hit_ball(ball, paddle):
     """
     Adjust ball velocity depending where on the paddle it hit.
     Returns True if handled (i.e., collision).
+    Overlap check for when a paddle moves into the ball; Ball.update
+    already handles the ball running into a paddle.
     """
     if not ball.rect.colliderect(paddle.rect):
         return False
@@ -597,9 +242,15 @@ def paddle_hit_ball(ball, paddle):
     else:
         ball.rect.right = paddle.rect.left
 
+    bounce_off_paddle(ball, paddle)
+    return True
+
+def bounce_off_paddle(ball, paddle):
+    """New ball velocity from where on the paddle it hit."""
     # Relative hit position: -1 (top) ... 0 (middle) ... +1 (bottom)
     rel_y = (ball.rect.centery - paddle.rect.centery) / (paddle.rect.height / 2)
     rel_y = clamp(rel_y, -1, 1)
+    ball.last_rel_y = rel_y
 
     # Max bounce angle (radians)
     max_angle = 3 * math.pi / 8  # ~67.5 degrees
@@ -617,29 +268,40 @@ def paddle_hit_ball(ball, paddle):
     ball.vy = new_speed * math.sin(angle)
     ball.speed = new_speed
 
-    return True
+def predict_intercept(x, y, vx, vy, target_x):
+    """
+    Ball center y when it reaches target_x, with every top/bottom bounce on the
+    way folded in (closed form, no stepping). None if it is moving away.
+    """
+    if vx == 0 or (target_x - x) / vx < 0:
+        return None
+    half = BALL_SIZE / 2
+    span = SCREEN_HEIGHT - 2 * half
+    t = (target_x - x) / vx
+    # unfold the walls into a straight line, then fold the result back
+    m = (y - half + vy * t) % (2 * span)
+    if m > span:
+        m = 2 * span - m
+    return m + half
 
 # AI logic
 class SimpleAI:
-    def __init__(self, paddle, difficulty='normal'):
+    def __init__(self, paddle, difficulty='normal', rng=None):
         self.paddle = paddle
+        self.rng = rng or random.Random()
         self.set_difficulty(difficulty)
         self.reaction_timer = 0
+        # prediction is only redone when the ball's velocity changes
+        self._leg = None
+        self._target = SCREEN_HEIGHT / 2
 
     def set_difficulty(self, difficulty):
-        diff = difficulty.lower()
-        if diff == 'easy':
-            self.paddle.update_speed(6)
-            self.react_ms = 200
-            self.prediction_strength = 0.45
-        elif diff == 'hard':
-            self.paddle.update_speed(12)
-            self.react_ms = 40
-            self.prediction_strength = 0.98
-        else:  # normal
-            self.paddle.update_speed(8)
-            self.react_ms = 110
-            self.prediction_strength = 0.75
+        self.set_params(*AI_PRESETS.get(difficulty.lower(), AI_PRESETS['normal']))
+
+    def set_params(self, speed, react_ms, prediction_strength):
+        self.paddle.update_speed(speed)
+        self.react_ms = react_ms
+        self.prediction_strength = prediction_strength
 
     def update(self, ball, dt_ms):
         # reaction: only move after a small delay to simulate imperfection
@@ -648,310 +310,477 @@ class SimpleAI:
             return
         self.reaction_timer = 0
 
-        # Predict ball vertical position roughly
-        predicted_y = ball.rect.centery + (ball.vy * (abs(ball.rect.centerx - self.paddle.rect.centerx) / max(1, abs(ball.vx))))
-        target = ball.rect.centery * (1 - self.prediction_strength) + predicted_y * self.prediction_strength
+        target = self.target(ball)
         if target < self.paddle.rect.centery - 6:
             self.paddle.move_up()
         elif target > self.paddle.rect.centery + 6:
             self.paddle.move_down()
 
+    def target(self, ball):
+        """Where the paddle wants to be: exact intercept plus this leg's aim error."""
+        leg = (ball.vx, ball.vy)
+        if leg != self._leg:
+            self._leg = leg
+            half = BALL_SIZE / 2
+            if self.paddle.rect.centerx > SCREEN_WIDTH // 2:
+                face = self.paddle.rect.left - half
+            else:
+                face = self.paddle.rect.right + half
+            y = predict_intercept(*ball.position(), ball.vx, ball.vy, face)
+            if y is None:
+                # ball going away (or waiting to serve): drift back to the middle
+                self._target = SCREEN_HEIGHT / 2
+            else:
+                error = AI_MAX_AIM_ERROR * (1 - self.prediction_strength)
+                self._target = y + self.rng.gauss(0, error)
+        return self._target
+
+class RallyStats:
+    """Numbers for one rally, from serve to point, for the telemetry log."""
+
+    def __init__(self, ball):
+        self.serve_dir = 1 if ball.vx > 0 else -1
+        self.steps = 0     # fixed game steps: how long the rally was
+        self.frames = 0    # frames drawn meanwhile: what the frame time stats count
+        self.hit_rel_y = []
+        self.max_speed = ball.speed
+        self.max_frame_ms = 0
+        self.spikes = 0
+
+    def step(self):
+        self.steps += 1
+
+    def frame(self, dt_ms):
+        """Once per drawn frame (a slow frame catching up runs several steps)."""
+        self.frames += 1
+        self.max_frame_ms = max(self.max_frame_ms, dt_ms)
+        if dt_ms > FRAME_SPIKE_MS:
+            self.spikes += 1
+
+    def hit(self, ball):
+        self.hit_rel_y.append(round(ball.last_rel_y, 3))
+        self.max_speed = max(self.max_speed, ball.speed)
+
+    def finish(self, winner, score1, score2):
+        return dict(winner=winner, score=[score1, score2], steps=self.steps, frames=self.frames,
+                    hits=len(self.hit_rel_y),
+                    hit_rel_y=self.hit_rel_y, max_speed=round(self.max_speed, 2), serve_dir=self.serve_dir,
+                    max_frame_ms=self.max_frame_ms, spikes=self.spikes)
+
 # UI / Game states
 def draw_centered_text(screen, text, font, color, y):
     surf = font.render(text, True, color)
     rect = surf.get_rect(center=(SCREEN_WIDTH // 2, y))
     screen.blit(surf, rect)
 
-def main():
-    pygame.init()
-    try:
-        pygame.mixer.init()
-    except Exception:
-        pass
-
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Polished Pong")
-    clock = pygame.time.Clock()
-
-    # Fonts
-    title_font = pygame.font.Font(None, 72)
-    menu_font = pygame.font.Font(None, 36)
-    hud_font = pygame.font.Font(None, 28)
-    big_font = pygame.font.Font(None, 56)
-
-    # Load sounds if available
-    bounce_sound = "sounds/pinpong.wav"
-    score_sound = "sounds/pinpong.wav"
-    try:
-        bounce_sound = pygame.mixer.Sound("pinpong.wav")
-        score_sound = pygame.mixer.Sound("pinpong.wav")
-    except Exception:
-        # No problem; sound optional
-        bounce_sound = None
-        score_sound = None
-
-    # Game variables
-    running = True
-    in_menu = True
-
-    # Menu selections
-    selected_mode = 1  # 1: 1-player, 2: 2-player
-    difficulty = 'Normal'
-    win_score = WIN_SCORE
-
-    while running:
-        # ---------- MENU ----------
-        while in_menu:
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                    elif ev.key == pygame.K_1:
-                        selected_mode = 1
-                    elif ev.key == pygame.K_2:
-                        selected_mode = 2
-                    elif ev.key == pygame.K_UP:
-                        # toggle difficulty up
-                        if difficulty == 'Easy':
-                            difficulty = 'Normal'
-                        elif difficulty == 'Normal':
-                            difficulty = 'Hard'
-                    elif ev.key == pygame.K_DOWN:
-                        if difficulty == 'Hard':
-                            difficulty = 'Normal'
-                        elif difficulty == 'Normal':
-                            difficulty = 'Easy'
-                    elif ev.key == pygame.K_LEFT:
-                        win_score = max(1, win_score - 1)
-                    elif ev.key == pygame.K_RIGHT:
-                        win_score = min(15, win_score + 1)
-                    elif ev.key == pygame.K_SPACE:
-                        in_menu = False
-                    elif ev.key == pygame.K_RETURN:
-                        in_menu = False
+def bake_court():
+    """Background and dashed center line, drawn once instead of every frame."""
+    court = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    court.fill(BLACK)
+    for y in range(0, SCREEN_HEIGHT, 22):
+        pygame.draw.rect(court, GRAY, (SCREEN_WIDTH // 2 - 1, y + 6, 2, 12))
+    return court
+
+def draw_menu(screen, selected_mode, difficulty, win_score):
+    title_font = game_host.font(72)
+    menu_font = game_host.font(36)
+    hud_font = game_host.font(28)
+
+    screen.fill(BLACK)
+    draw_centered_text(screen, "POLISHED PONG", title_font, WHITE, SCREEN_HEIGHT * 0.18)
+    draw_centered_text(screen, "Press 1 for Single Player  •  2 for Two Player", menu_font, GRAY, SCREEN_HEIGHT * 0.34)
+    draw_centered_text(screen, f"Mode: {'1-Player (AI)' if selected_mode == 1 else '2-Player'}", menu_font, CYAN, SCREEN_HEIGHT * 0.44)
+    draw_centered_text(screen, f"Difficulty (UP/DOWN): {difficulty}", menu_font, MAGENTA, SCREEN_HEIGHT * 0.52)
+    draw_centered_text(screen, f"Win Score (LEFT/RIGHT): {win_score}", menu_font, WHITE, SCREEN_HEIGHT * 0.60)
+    draw_centered_text(screen, "P: Pause during game • R: Restart • ESC: Quit", hud_font, GRAY, SCREEN_HEIGHT * 0.72)
+    draw_centered_text(screen, "Press SPACE or Enter to Start", menu_font, WHITE, SCREEN_HEIGHT * 0.85)
+
+    # small legend on controls
+    left_ctrl = menu_font.render("Player 1: W / S", True, CYAN)
+    right_ctrl = menu_font.render("Player 2: Up / Down", True, MAGENTA)
+    screen.blit(left_ctrl, (40, SCREEN_HEIGHT - 60))
+    screen.blit(right_ctrl, (SCREEN_WIDTH - right_ctrl.get_width() - 40, SCREEN_HEIGHT - 60))
+
+class BallView(pygame.sprite.Sprite):
+    """Where the ball is drawn: between its last two steps, so motion stays smooth at any frame rate."""
+
+    def __init__(self, ball):
+        super().__init__()
+        self.ball = ball
+        self.image = ball.image
+        self.rect = ball.rect.copy()
+        self.prev = ball.rect.center
+
+    def step(self):
+        # call before each physics step
+        self.prev = self.ball.rect.center
+
+    def place(self, alpha):
+        (x0, y0), (x1, y1) = self.prev, self.ball.rect.center
+        if abs(x1 - x0) > BALL_MAX_SPEED * 2 or abs(y1 - y0) > BALL_MAX_SPEED * 2:
+            alpha = 1.0  # served or reset: jump, don't slide across the court
+        self.rect.center = (round(x0 + (x1 - x0) * alpha), round(y0 + (y1 - y0) * alpha))
+
+class MenuScene(Scene):
+    idle = True  # nothing animates in the menu: sleep until the next event
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.selected_mode = 1  # 1: 1-player, 2: 2-player
+        self.difficulty = 'Normal'
+        self.win_score = WIN_SCORE
+        self.changed = True
+        self.recorder = None
+        self.matches = 0
+
+    def enter(self):
+        self.changed = True
+
+    def event(self, ev):
+        if ev.type == pygame.WINDOWEXPOSED:
+            self.changed = True
+        if ev.type != pygame.KEYDOWN:
+            return
+        self.changed = True
+        if ev.key == pygame.K_ESCAPE:
+            self.loop.stop()
+        elif ev.key == pygame.K_1:
+            self.selected_mode = 1
+        elif ev.key == pygame.K_2:
+            self.selected_mode = 2
+        elif ev.key == pygame.K_UP:
+            # toggle difficulty up
+            if self.difficulty == 'Easy':
+                self.difficulty = 'Normal'
+            elif self.difficulty == 'Normal':
+                self.difficulty = 'Hard'
+        elif ev.key == pygame.K_DOWN:
+            if self.difficulty == 'Hard':
+                self.difficulty = 'Normal'
+            elif self.difficulty == 'Normal':
+                self.difficulty = 'Easy'
+        elif ev.key == pygame.K_LEFT:
+            self.win_score = max(1, self.win_score - 1)
+        elif ev.key == pygame.K_RIGHT:
+            self.win_score = min(15, self.win_score + 1)
+        elif ev.key in (pygame.K_SPACE, pygame.K_RETURN):
+            self.loop.switch(MatchScene(self))
+
+    def new_recorder(self, ai):
+        if self.recorder:
+            self.recorder.close()
+        self.recorder = None
+        if RECORD_PATH:
+            from pong_replay import PongRecorder
+            path = RECORD_PATH
+            if self.matches:
+                root, ext = os.path.splitext(RECORD_PATH)
+                path = f"{root}-{self.matches + 1}{ext}"
+            self.recorder = PongRecorder(path, self.selected_mode, self.win_score, ai)
+            self.matches += 1
+        return self.recorder
+
+    def draw(self, alpha):
+        if not self.changed:
+            return []
+        self.changed = False
+        draw_menu(self.screen, self.selected_mode, self.difficulty, self.win_score)
+        return None
+
+class MatchScene(Scene):
+    def __init__(self, menu):
+        self.menu = menu
+        self.screen = menu.screen
+        self.mode = menu.selected_mode
+        self.difficulty = menu.difficulty
+        self.win_score = menu.win_score
+
+        # Fonts
+        self.title_font = game_host.font(72)
+        self.menu_font = game_host.font(36)
+        self.hud_font = game_host.font(28)
+        self.big_font = game_host.font(56)
+
+        # Load sounds if available
+        self.bounce_sound = game_host.sound("pinpong.wav")
+        self.score_sound = game_host.sound("pinpong.wav")
 
-            screen.fill(BLACK)
-            draw_centered_text(screen, "POLISHED PONG", title_font, WHITE, SCREEN_HEIGHT * 0.18)
-            draw_centered_text(screen, "Press 1 for Single Player  •  2 for Two Player", menu_font, GRAY, SCREEN_HEIGHT * 0.34)
-            draw_centered_text(screen, f"Mode: {'1-Player (AI)' if selected_mode == 1 else '2-Player'}", menu_font, CYAN, SCREEN_HEIGHT * 0.44)
-            draw_centered_text(screen, f"Difficulty (UP/DOWN): {difficulty}", menu_font, MAGENTA, SCREEN_HEIGHT * 0.52)
-            draw_centered_text(screen, f"Win Score (LEFT/RIGHT): {win_score}", menu_font, WHITE, SCREEN_HEIGHT * 0.60)
-            draw_centered_text(screen, "P: Pause during game • R: Restart • ESC: Quit", hud_font, GRAY, SCREEN_HEIGHT * 0.72)
-            draw_centered_text(screen, "Press SPACE or Enter to Start", menu_font, WHITE, SCREEN_HEIGHT * 0.85)
-
-            # small legend on controls
-            left_ctrl = menu_font.render("Player 1: W / S", True, CYAN)
-            right_ctrl = menu_font.render("Player 2: Up / Down", True, MAGENTA)
-            screen.blit(left_ctrl, (40, SCREEN_HEIGHT - 60))
-            screen.blit(right_ctrl, (SCREEN_WIDTH - right_ctrl.get_width() - 40, SCREEN_HEIGHT - 60))
-
-            pygame.display.flip()
-            clock.tick(FPS)
-
-        # ---------- SETUP GAME ----------
         # paddles
-        paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
-        paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+        self.paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+        self.paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+
+        # one generator for everything random in the match, so a recording can reseed it
+        self.rng = random.Random()
 
         # AI (if 1-player)
-        ai = None
-        if selected_mode == 1:
-            ai = SimpleAI(paddle2, difficulty=difficulty)
+        self.ai = None
+        if self.mode == 1:
+            self.ai = SimpleAI(self.paddle2, difficulty=self.difficulty, rng=self.rng)
 
         # ball & groups
-        ball = Ball(WHITE)
-        all_sprites = pygame.sprite.Group(paddle1, paddle2, ball)
-
-        score1 = 0
-        score2 = 0
-        paused = False
-        winner = None
-
-        # Serve control
-        next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-        pending_serve_dir = random.choice([-1, 1])  # who the ball goes to on serve
-
-        # main game loop
-        last_time = pygame.time.get_ticks()
-        while True:
-            dt_ms = clock.tick(FPS)
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                    if ev.key == pygame.K_p:
-                        paused = not paused
-                    if ev.key == pygame.K_r:
-                        # restart to menu
-                        in_menu = True
-                        break
-
-            if in_menu:
-                break  # exit to main menu loop to restart
-
-            if paused:
-                # Draw pause overlay
-                screen.fill(BLACK)
-                all_sprites.draw(screen)
-                score1_text = big_font.render(str(score1), True, CYAN)
-                score2_text = big_font.render(str(score2), True, MAGENTA)
-                screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 20))
-                screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 20))
-                draw_centered_text(screen, "PAUSED - Press P to resume", menu_font, WHITE, SCREEN_HEIGHT // 2)
-                pygame.display.flip()
-                continue
-
-            # Controls
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_w]:
-                paddle1.move_up()
-            if keys[pygame.K_s]:
-                paddle1.move_down()
-            if selected_mode == 2:
-                if keys[pygame.K_UP]:
-                    paddle2.move_up()
-                if keys[pygame.K_DOWN]:
-                    paddle2.move_down()
-
-            # AI update
-            if ai and not paused:
-                ai.update(ball, dt_ms)
-
-            # Serve logic: only move ball after serve delay
-            now = pygame.time.get_ticks()
-            if now < next_serve_time:
-                # show a "Get Ready" small overlay and don't move ball
-                # center ball and show countdown
-                ball.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-                screen.fill(BLACK)
-                # draw paddles and center line
-                pygame.draw.line(screen, GRAY, (SCREEN_WIDTH // 2, 0), (SCREEN_WIDTH // 2, SCREEN_HEIGHT), 2)
-                all_sprites.draw(screen)
-                # countdown
-                remain = max(0, (next_serve_time - now) // 1000 + 1)
-                draw_centered_text(screen, f"Serve in {remain}", menu_font, WHITE, SCREEN_HEIGHT * 0.45)
-                score1_text = big_font.render(str(score1), True, CYAN)
-                score2_text = big_font.render(str(score2), True, MAGENTA)
-                screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 20))
-                screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 20))
-                pygame.display.flip()
-                continue  # skip physics until serve time
-
-            # If serve time passed and ball not moving (vx ~ 0), ensure ball is launched
-            if abs(ball.vx) < 0.001 and abs(ball.vy) < 0.001:
-                ball.reset(direction=pending_serve_dir)
-
-            # Update sprites
-            all_sprites.update()
-
-            # Collisions: paddles
-            if paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2):
-                if bounce_sound:
-                    try:
-                        bounce_sound.play()
-                    except Exception:
-                        pass
-
-            # Score check
-            scored = False
-            if ball.rect.left <= 0:
-                score2 += 1
-                scored = True
-                pending_serve_dir = -1  # send to left (loser side)
-            elif ball.rect.right >= SCREEN_WIDTH:
-                score1 += 1
-                scored = True
-                pending_serve_dir = 1
-
-            if scored:
-                if score_sound:
-                    try:
-                        score_sound.play()
-                    except Exception:
-                        pass
-                # check win
-                if score1 >= win_score:
-                    winner = "PLAYER 1" if selected_mode == 2 or selected_mode == 1 else "PLAYER 1"
-                elif score2 >= win_score:
-                    winner = "PLAYER 2" if selected_mode == 2 else "COMPUTER"
-                # reset ball & pause before serve
-                ball.vx = 0
-                ball.vy = 0
-                ball.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-                next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-                # small randomize direction next serve
-                pending_serve_dir = random.choice([-1, 1])
-                if winner:
-                    # show game over screen
-                    screen.fill(BLACK)
-                    draw_centered_text(screen, f"{winner} WINS!", title_font, WHITE, SCREEN_HEIGHT * 0.35)
-                    draw_centered_text(screen, f"Final Score: {score1} - {score2}", menu_font, GRAY, SCREEN_HEIGHT * 0.50)
-                    draw_centered_text(screen, "Press R to return to menu or SPACE to play again", hud_font, WHITE, SCREEN_HEIGHT * 0.68)
-                    pygame.display.flip()
-
-                    # Wait for user decision
-                    waiting = True
-                    while waiting:
-                        for ev in pygame.event.get():
-                            if ev.type == pygame.QUIT:
-                                pygame.quit()
-                                sys.exit()
-                            if ev.type == pygame.KEYDOWN:
-                                if ev.key == pygame.K_r:
-                                    in_menu = True
-                                    waiting = False
-                                    break
-                                if ev.key == pygame.K_SPACE:
-                                    # reset everything for new match but keep mode/difficulty
-                                    score1 = 0
-                                    score2 = 0
-                                    paddle1.rect.centery = SCREEN_HEIGHT // 2
-                                    paddle2.rect.centery = SCREEN_HEIGHT // 2
-                                    ball.reset(direction=random.choice([-1, 1]), speed=BALL_SPEED)
-                                    winner = None
-                                    next_serve_time = pygame.time.get_ticks() + SERVE_DELAY_MS
-                                    waiting = False
-                                    break
-                                if ev.key == pygame.K_ESCAPE:
-                                    pygame.quit()
-                                    sys.exit()
-                        clock.tick(FPS)
-                    if in_menu:
-                        break  # go back to menu
-                    else:
-                        continue  # continue playing new match
-
-            # Draw
+        self.ball = Ball(WHITE, self.rng)
+        self.ball.paddles = (self.paddle1, self.paddle2)
+        self.ball_view = BallView(self.ball)
+        self.all_sprites = pygame.sprite.Group(self.paddle1, self.paddle2, self.ball_view)
+
+        # court is baked once, scores/HUD are only re-rendered when they change
+        self.renderer = DirtyRenderer(self.screen, BLACK, dirty=DIRTY_RECTS, background=bake_court())
+        self.particles = ParticleSystem((SCREEN_WIDTH, SCREEN_HEIGHT), BLACK, drag=0.003)
+        mode_text = "1P (AI)" if self.mode == 1 else "2P"
+        self.renderer.set_text("hud", self.hud_font,
+                               f"Mode: {mode_text} • Difficulty: {self.difficulty} • First to {self.win_score}",
+                               WHITE, (20, SCREEN_HEIGHT - 34))
+
+        self.recorder = menu.new_recorder(self.ai)
+        self.score1 = 0
+        self.score2 = 0
+        self.rally = None
+        self.paused = False
+        self.pause_drawn = False
+        self.winner = None
+        self.over_drawn = False
+        # leaderboard: the record and the rank both come back from the scores writer thread
+        self.scores = scores.shared()
+        self.record = None
+        self.loading_record = self.scores.best("pingpong", self.board_mode()) if self.scores else None
+        self.margin = None
+        self.placed = None
+        self.rank = None
+
+        # Serve control (game time, so a pause doesn't eat the countdown)
+        self.serve_ms = SERVE_DELAY_MS
+        self.pending_serve_dir = self.rng.choice([-1, 1])  # who the ball goes to on serve
+
+    @property
+    def idle(self):
+        # paused or game over: nothing moves until a key is pressed (once the rank is in)
+        waiting = self.placed is not None and not self.placed.done()
+        return self.paused or (self.winner is not None and not waiting)
+
+    def event(self, ev):
+        if ev.type == pygame.WINDOWEXPOSED:
+            self.renderer.invalidate()
+            self.pause_drawn = self.over_drawn = False
+        if ev.type != pygame.KEYDOWN:
+            return
+        if ev.key == pygame.K_ESCAPE:
+            self.loop.stop()
+        elif ev.key == pygame.K_r:
+            # restart to menu
+            self.loop.switch(self.menu)
+        elif self.winner is not None:
+            if ev.key == pygame.K_SPACE:
+                self.rematch()
+        elif ev.key == pygame.K_p:
+            self.paused = not self.paused
+            self.pause_drawn = False
+            if not self.paused:
+                self.renderer.remove_text("overlay")
+
+    def rematch(self):
+        """Reset everything for a new match but keep mode/difficulty"""
+        self.score1 = 0
+        self.score2 = 0
+        self.paddle1.rect.centery = SCREEN_HEIGHT // 2
+        self.paddle2.rect.centery = SCREEN_HEIGHT // 2
+        self.ball.reset(direction=self.rng.choice([-1, 1]), speed=BALL_SPEED)
+        self.winner = None
+        self.over_drawn = False
+        # asked again: it is answered after the match just saved
+        self.record = None
+        self.loading_record = self.scores.best("pingpong", self.board_mode()) if self.scores else None
+        self.placed = None
+        self.rank = None
+        if self.recorder:
+            self.recorder.restart()
+        self.serve_ms = SERVE_DELAY_MS
+        self.particles.clear()
+        self.renderer.invalidate()
+
+    def update(self, dt_ms):
+        if self.paused or self.winner is not None:
+            return
+        ball, paddle1, paddle2, ai = self.ball, self.paddle1, self.paddle2, self.ai
+        self.particles.update(dt_ms)
+        recorder = self.recorder
+        self.ball_view.step()
+        if recorder:
+            recorder.begin_frame(ball, paddle1, paddle2, ai, self.score1, self.score2, self.pending_serve_dir)
+
+        # Controls
+        keys = self.loop.keys
+        paddle_ys = (paddle1.rect.y, paddle2.rect.y)
+        if keys[pygame.K_w]:
+            paddle1.move_up()
+        if keys[pygame.K_s]:
+            paddle1.move_down()
+        if self.mode == 2:
+            if keys[pygame.K_UP]:
+                paddle2.move_up()
+            if keys[pygame.K_DOWN]:
+                paddle2.move_down()
+
+        if (paddle1.rect.y, paddle2.rect.y) != paddle_ys:
+            latency.moved()
+
+        # AI update
+        if ai:
+            ai.update(ball, dt_ms)
+
+        # Serve logic: only move ball after serve delay
+        if self.serve_ms > 0:
+            # center ball and show countdown
+            ball.recenter()
+            remain = self.serve_ms // 1000 + 1
+            self.serve_ms -= dt_ms
+            self.renderer.set_text("overlay", self.menu_font, f"Serve in {remain}", WHITE,
+                                   (SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.45), align="center")
+            if recorder:
+                recorder.end_frame(ball, paddle1, paddle2, self.score1, self.score2, keys, dt_ms, serving=True)
+            return  # skip physics until serve time
+        self.renderer.remove_text("overlay")
+
+        # If serve time passed and ball not moving (vx ~ 0), ensure ball is launched
+        if abs(ball.vx) < 0.001 and abs(ball.vy) < 0.001:
+            ball.reset(direction=self.pending_serve_dir)
+        if telemetry and self.rally is None:
+            self.rally = RallyStats(ball)
+
+        # Update sprites (the trail is left where the ball was, so it doesn't cover it)
+        self.particles.trail(*ball.rect.center, GRAY)
+        ball.update()
+        profiler.mark("update")
+
+        # Collisions: paddles
+        hit = ball.hits or paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2)
+        if self.rally:
+            self.rally.step()
+            if hit:
+                self.rally.hit(ball)
+        if hit:
+            play_sound(self.bounce_sound)
+            # sparks fly back the way the ball goes, in the paddle's color
+            color, angle = (CYAN, 0.0) if ball.vx > 0 else (MAGENTA, math.pi)
+            self.particles.burst(*ball.rect.center, 24, color, angle=angle, spread=math.pi / 2)
+        profiler.mark("collision")
+
+        # Score check
+        scored = False
+        if ball.rect.left <= 0:
+            self.score2 += 1
+            scored = True
+        elif ball.rect.right >= SCREEN_WIDTH:
+            self.score1 += 1
+            scored = True
+
+        if recorder:
+            recorder.end_frame(ball, paddle1, paddle2, self.score1, self.score2, keys, dt_ms,
+                               hit=hit, scored=scored)
+        if scored:
+            self.point_scored()
+
+    def point_scored(self):
+        ball = self.ball
+        out_left = ball.rect.left <= 0
+        self.particles.burst(*ball.rect.center, 120, MAGENTA if out_left else CYAN, speed=(0.05, 0.6),
+                             life=(400, 1200), angle=0.0 if out_left else math.pi, spread=math.pi)
+        if self.rally:
+            point = 1 if ball.rect.right >= SCREEN_WIDTH else 2
+            telemetry.log("rally", mode=self.mode, difficulty=self.difficulty,
+                          **self.rally.finish(point, self.score1, self.score2))
+            self.rally = None
+        play_sound(self.score_sound)
+        # check win
+        if self.score1 >= self.win_score:
+            self.winner = "PLAYER 1"
+        elif self.score2 >= self.win_score:
+            self.winner = "PLAYER 2" if self.mode == 2 else "COMPUTER"
+        if self.winner is not None:
+            self.save_result()
+        # reset ball & pause before serve
+        ball.vx = 0
+        ball.vy = 0
+        ball.recenter()
+        self.serve_ms = SERVE_DELAY_MS
+        # small randomize direction next serve
+        self.pending_serve_dir = self.rng.choice([-1, 1])
+
+    def board_mode(self):
+        if self.mode == 1:
+            return f"1P {self.difficulty} to {self.win_score}"
+        return f"2P to {self.win_score}"
+
+    def save_result(self):
+        """Queue the match for the leaderboard (scores.py); ranked by the winning margin."""
+        if self.scores is None:
+            return
+        # against the AI the board is the player's margin, which can be negative
+        self.margin = self.score1 - self.score2 if self.mode == 1 else abs(self.score1 - self.score2)
+        self.placed = self.scores.add_score("pingpong", self.margin, self.board_mode(), player=self.winner,
+                                            score1=self.score1, score2=self.score2)
+
+    def draw(self, alpha):
+        screen = self.screen
+        renderer = self.renderer
+        rally = self.rally
+        if rally:
+            # real frame time, once per frame however many steps it ran
+            rally.frame(self.loop.clock.get_time())
+        if self.winner is not None:
+            if self.loading_record is not None and self.loading_record.done():
+                self.record = self.loading_record.result()
+                self.loading_record = None
+            if self.rank is None and self.placed is not None and self.placed.done():
+                self.rank = self.placed.result()
+                if self.rank is not None:
+                    self.over_drawn = False
+            # game over screen, drawn once (the screen doesn't change)
+            if self.over_drawn:
+                return []
+            self.over_drawn = True
             screen.fill(BLACK)
-            # center dashed line
-            for y in range(0, SCREEN_HEIGHT, 22):
-                pygame.draw.rect(screen, GRAY, (SCREEN_WIDTH // 2 - 1, y + 6, 2, 12))
-            all_sprites.draw(screen)
-
-            # Scores
-            score1_text = big_font.render(str(score1), True, CYAN)
-            score2_text = big_font.render(str(score2), True, MAGENTA)
-            screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 18))
-            screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 18))
-
-            # Small HUD
-            mode_text = "1P (AI)" if selected_mode == 1 else "2P"
-            hud = hud_font.render(f"Mode: {mode_text} • Difficulty: {difficulty} • First to {win_score}", True, WHITE)
-            screen.blit(hud, (20, SCREEN_HEIGHT - 34))
+            draw_centered_text(screen, f"{self.winner} WINS!", self.title_font, WHITE, SCREEN_HEIGHT * 0.35)
+            draw_centered_text(screen, f"Final Score: {self.score1} - {self.score2}", self.menu_font, GRAY,
+                               SCREEN_HEIGHT * 0.50)
+            if self.rank is not None:
+                record = "" if self.record is None else f", record {max(self.record, self.margin):+d}"
+                draw_centered_text(screen, f"Margin {self.margin:+d}: #{self.rank} for {self.board_mode()}{record}",
+                                   self.hud_font, GRAY, SCREEN_HEIGHT * 0.58)
+            draw_centered_text(screen, "Press R to return to menu or SPACE to play again", self.hud_font, WHITE,
+                               SCREEN_HEIGHT * 0.68)
+            return None
+
+        if self.paused:
+            # Draw pause overlay once, then just wait for P
+            if self.pause_drawn:
+                return []
+            self.pause_drawn = True
+            renderer.set_text("overlay", self.menu_font, "PAUSED - Press P to resume", WHITE,
+                              (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2), align="center")
+
+        # Scores
+        renderer.set_text("score1", self.big_font, str(self.score1), CYAN, (SCREEN_WIDTH // 4, 18), align="midtop")
+        renderer.set_text("score2", self.big_font, str(self.score2), MAGENTA, (SCREEN_WIDTH * 3 // 4, 18),
+                          align="midtop")
+        self.ball_view.place(alpha)
+        profiler.show_on(renderer, self.hud_font, WHITE)
+        return renderer.render(self.all_sprites, self.particles)
+
+    def present(self, rects):
+        self.renderer.present(rects)
+
+def play_sound(sound):
+    if sound:
+        try:
+            sound.play()
+        except Exception:
+            pass
 
-            pygame.display.flip()
-
-    pygame.quit()
-    sys.exit()
+def main():
+    screen = game_host.open_window((SCREEN_WIDTH, SCREEN_HEIGHT), "Polished Pong")
+    GameLoop(profiler, fps=FPS, latency=latency).run(MenuScene(screen))
 
 if __name__ == "__main__":
     main()
-# Write your code here :-)
+    pygame.quit()
+    sys.exit()
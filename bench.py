@@ -0,0 +1,227 @@
+# bench.py
+# Headless benchmarks of every game's hot path, checked against a baseline.
+#
+#   python bench.py                 run, compare with this machine's baseline
+#   python bench.py --save          run and (re)write the baseline
+#   python bench.py -k invaders     only benchmarks whose name contains "invaders"
+#
+# Baselines are per machine (bench_baselines/<host>.json) since timings
+# from different hardware can't be compared; they stay out of git.
+#
+# The exit status is 1 when any benchmark got slower than the baseline by
+# more than --threshold, so this can gate a change.
+#
+# Each number is the best of several repeats with the garbage collector
+# off, in microseconds per operation.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from entities import EntityStore, ALIEN, BULLET
+from particles import ParticleSystem
+import Invaders01
+import Othello
+from PingPong import (Ball, Paddle, SimpleAI, paddle_hit_ball, BALL_SPEED, PADDLE_MARGIN, SCREEN_WIDTH,
+                      SCREEN_HEIGHT, WHITE, CYAN, MAGENTA)
+
+BASELINE_DIR = "bench_baselines"
+WAVE_SIZES = (36, 300, 1000, 5000)
+REPEAT = 5
+TARGET_SECONDS = 0.05  # per repeat; the number of calls is calibrated to this
+
+
+def measure(fn, repeat=REPEAT):
+    """Best time per call of fn(), in microseconds."""
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            fn()
+        took = perf_counter() - start
+        if took >= TARGET_SECONDS / 5 or number >= 1 << 20:
+            break
+        number *= 4
+    number = max(1, int(number * TARGET_SECONDS / max(took, 1e-9)))
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, perf_counter() - start)
+    finally:
+        gc.enable()
+    return best / number * 1e6
+
+
+# ---- Othello ----
+def othello_midgame(moves=12, seed=1):
+    """An Othello position `moves` legal random moves into a game."""
+    rng = random.Random(seed)
+    game = Othello.Othello(None)
+    for _ in range(moves):
+        legal = [(x, y) for x in range(Othello.BOARD_SIZE) for y in range(Othello.BOARD_SIZE)
+                 if game.is_valid_move(x, y)]
+        if not legal:
+            break
+        x, y = rng.choice(legal)
+        game.board[x][y] = game.turn
+        game.flip_stones(x, y)
+        game.turn = Othello.WHITE if game.turn == Othello.BLACK else Othello.BLACK
+    return game
+
+
+def bench_othello():
+    game = othello_midgame()
+    cells = [(x, y) for x in range(Othello.BOARD_SIZE) for y in range(Othello.BOARD_SIZE)]
+    legal = [c for c in cells if game.is_valid_move(*c)]
+    saved = [row[:] for row in game.board]
+    x, y = legal[0]
+
+    def all_moves():
+        for c in cells:
+            game.is_valid_move(*c)
+
+    def flip():
+        # the board is copied back each time, that copy is part of the number
+        game.board = [row[:] for row in saved]
+        game.board[x][y] = game.turn
+        game.flip_stones(x, y)
+
+    yield "othello.is_valid_move (whole board)", all_moves
+    yield "othello.has_valid_move", game.has_valid_move
+    yield "othello.flip_stones", flip
+
+
+# ---- Invaders ----
+def invaders_wave(count, bullets=64):
+    """`count` aliens in a block plus bullets just under it (no hits, so collide does the full test)."""
+    store = EntityStore(capacity=count + bullets, seed=count)
+    cols = max(1, int((count * 2) ** 0.5))
+    spacing = max(1, (Invaders01.LOGICAL_WIDTH - 100) // cols)
+    for n in range(count):
+        Invaders01.Alien(store, 50 + (n % cols) * spacing, 70 + (n // cols) * 4)
+    bottom = store.max_bottom(ALIEN)
+    for n in range(bullets):
+        Invaders01.Bullet(store, 20 + n * 17, bottom + 40)
+    # bullets hold still so the wave stays the same from call to call
+    store.vy[store.of_kind(BULLET)] = 0
+    return store
+
+
+def bench_invaders():
+    for count in WAVE_SIZES:
+        # separate waves: update_entities walks the aliens down into the bullets
+        store = invaders_wave(count)
+        w, h = Invaders01.LOGICAL_WIDTH, Invaders01.LOGICAL_HEIGHT
+        yield f"invaders.update_entities ({count} aliens)", lambda s=store: Invaders01.update_entities(s, w, h)
+        store = invaders_wave(count)
+        yield f"invaders.collide ({count} aliens)", lambda s=store: s.collide(BULLET, ALIEN)
+
+
+# ---- PingPong ----
+def bench_pingpong(frames=1000):
+    rng = random.Random(7)
+    paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+    paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+    ball = Ball(WHITE, rng)
+    ball.paddles = (paddle1, paddle2)
+    ai1 = SimpleAI(paddle1, 'hard', rng)
+    ai2 = SimpleAI(paddle2, 'hard', rng)
+
+    def rally():
+        # two AIs keep the ball in play, so this is mostly long rallies
+        for _ in range(frames):
+            ai1.update(ball, 17)
+            ai2.update(ball, 17)
+            ball.update()
+            if not ball.hits:
+                paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2)
+            if ball.rect.left <= 0 or ball.rect.right >= SCREEN_WIDTH:
+                ball.reset(direction=0, speed=BALL_SPEED)
+
+    yield f"pingpong.rally ({frames} frames)", rally
+
+
+# ---- particles ----
+def bench_particles(count=10000):
+    screen = pygame.Surface((Invaders01.LOGICAL_WIDTH, Invaders01.LOGICAL_HEIGHT))
+    particles = ParticleSystem(screen.get_size(), (0, 80, 0), capacity=count, seed=1)
+
+    def frame():
+        # keep the system full: whatever burned out is replaced
+        particles.burst(600, 330, count - len(particles), (255, 0, 1), life=(1e9, 2e9), speed=(0.0, 0.02))
+        particles.update(16)
+        particles.draw(screen)
+
+    yield f"particles.update+draw ({count} live)", frame
+
+
+BENCHES = (bench_othello, bench_invaders, bench_pingpong, bench_particles)
+
+
+def baseline_path():
+    return os.path.join(BASELINE_DIR, f"{platform.node() or 'unknown'}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the games' hot paths")
+    parser.add_argument("--save", action="store_true", help="write the results as this machine's baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fail when slower than the baseline by more than this fraction (default 0.15)")
+    parser.add_argument("-k", dest="filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--baseline", default=None, help="baseline file (default bench_baselines/<host>.json)")
+    args = parser.parse_args(argv)
+
+    path = args.baseline or baseline_path()
+    baseline = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<44} {'us/op':>11} {'baseline':>11} {'change':>8}")
+    for bench in BENCHES:
+        for name, fn in bench():
+            if args.filter not in name:
+                continue
+            us = results[name] = measure(fn)
+            line = f"{name:<44} {us:>11.2f}"
+            if name in baseline:
+                change = us / baseline[name] - 1
+                flag = ""
+                if change > args.threshold:
+                    regressions.append(name)
+                    flag = "  REGRESSION"
+                line += f" {baseline[name]:>11.2f} {change:>+7.1%}{flag}"
+            print(line, flush=True)
+
+    if args.save or not baseline:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        merged = dict(baseline, **results)
+        with open(path, "w") as f:
+            json.dump({"machine": platform.node(), "platform": platform.platform(),
+                       "python": platform.python_version(), "pygame": pygame.version.ver,
+                       "results": merged}, f, indent=2, sort_keys=True)
+        print(f"baseline written to {path}")
+    if regressions and not args.save:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
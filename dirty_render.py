@@ -0,0 +1,150 @@
+# dirty_render.py
+# Dirty-rectangle renderer for the Invaders games.
+#
+# Keeps a cached background and HUD layer, clears only where sprites were
+# last frame and sends only the changed rects to pygame.display.update().
+# With dirty=False it falls back to the usual fill / draw / flip so both
+# paths can be compared with the same pixel counter.
+
+import pygame
+
+import game_host
+
+
+class DirtyRenderer:
+    def __init__(self, screen, bg_color, dirty=True, background=None):
+        self.screen = screen
+        self.dirty = dirty
+        if background is None:
+            background = pygame.Surface(screen.get_size())
+            background.fill(bg_color)
+        self.background = background.convert()
+        self.screen_rect = screen.get_rect()
+
+        # HUD layer: key -> [text, surface, rect]
+        self.hud = {}
+        self.hud_dirty = []
+
+        self.last_rects = []
+        self.need_full = True
+
+        # stats
+        self.frames = 0
+        self.pixels_pushed = 0
+        self.total_pixels = 0
+
+    def set_text(self, key, font, text, color, pos, align="topleft"):
+        """
+        Put a line of text on the HUD layer. Only re-rendered when it changes.
+        align is the rect attribute pos refers to ("topleft", "center", "midtop"...).
+        """
+        item = self.hud.get(key)
+        if item and item[0] == text:
+            return
+        surf = font.render(text, True, color)
+        rect = surf.get_rect(**{align: pos})
+        if item:
+            self.hud_dirty.append(item[2])
+        self.hud[key] = [text, surf, rect]
+        self.hud_dirty.append(rect)
+
+    def remove_text(self, key):
+        item = self.hud.pop(key, None)
+        if item:
+            self.hud_dirty.append(item[2])
+
+    def clear_text(self):
+        for key in list(self.hud):
+            self.remove_text(key)
+
+    def invalidate(self):
+        """Force a full redraw on the next frame."""
+        self.need_full = True
+
+    def update_background(self, rect):
+        """The background changed inside rect (drawn into self.background); redraw just that."""
+        self.hud_dirty.append(pygame.Rect(rect))
+
+    def draw(self, sprites, particles=None):
+        """Draw one frame and present it. Returns the number of pixels pushed."""
+        return self.present(self.render(sprites, particles))
+
+    def render(self, sprites, particles=None):
+        """
+        Draw into the screen surface. Returns the rects to present (None = whole screen).
+        particles: optional ParticleSystem drawn over the sprites, cleared like them.
+        """
+        screen = self.screen
+        if not self.dirty or self.need_full:
+            screen.blit(self.background, (0, 0))
+            drawn = [screen.blit(s.image, s.rect) for s in sprites]
+            if particles is not None:
+                drawn += particles.draw(screen)
+            for _, surf, rect in self.hud.values():
+                screen.blit(surf, rect)
+            self.last_rects = drawn
+            self.hud_dirty = []
+            self.need_full = False
+            return None
+
+        # clear old sprite positions (and changed HUD areas) from the background
+        bg = self.background
+        cleared = self.last_rects + self.hud_dirty
+        for r in cleared:
+            r = r.clip(self.screen_rect)
+            screen.blit(bg, r, r)
+
+        drawn = [screen.blit(s.image, s.rect) for s in sprites]
+        if particles is not None:
+            drawn += particles.draw(screen)
+
+        # HUD goes on top; only redraw items that were touched this frame
+        changed = cleared + drawn
+        for _, surf, rect in self.hud.values():
+            if rect.collidelist(changed) != -1:
+                screen.blit(surf, rect)
+
+        self.last_rects = drawn
+        self.hud_dirty = []
+        return _merge(changed, self.screen_rect)
+
+    def present(self, rects):
+        """Send the rendered frame to the display. Returns the number of pixels pushed."""
+        if rects == []:
+            # nothing changed, don't wake the display at all
+            return self._count(rects)
+        game_host.present(rects)
+        if rects is None:
+            return self._count([self.screen_rect])
+        return self._count(rects)
+
+    def _count(self, rects):
+        pixels = 0
+        for r in rects:
+            pixels += r.w * r.h
+        self.frames += 1
+        self.pixels_pushed = pixels
+        self.total_pixels += pixels
+        return pixels
+
+    def report(self):
+        full = self.screen_rect.w * self.screen_rect.h
+        avg = self.total_pixels / max(1, self.frames)
+        mode = "dirty" if self.dirty else "full"
+        return (f"[render] mode={mode} frames={self.frames} "
+                f"avg_pixels/frame={avg:.0f} ({100.0 * avg / full:.1f}% of {full})")
+
+
+def _merge(rects, bounds):
+    """Clip rects to the screen and merge overlapping ones so no pixel is sent twice."""
+    out = []
+    for r in rects:
+        r = r.clip(bounds)
+        if not r.w or not r.h:
+            continue
+        i = r.collidelist(out)
+        while i != -1:
+            r.union_ip(out.pop(i))
+            i = r.collidelist(out)
+        out.append(r)
+    return out
@@ -0,0 +1,185 @@
+# entities.py
+# Struct-of-arrays entity store for the Invaders games.
+#
+# Positions, velocities, sizes, kinds and alive flags live in parallel
+# numpy arrays. Movement, culling and collision each run as one batched
+# step per frame; the pygame Sprite classes are thin views over a slot
+# so Group.draw() and the renderers keep working unchanged.
+
+import numpy as np
+import pygame
+
+# entity kinds
+PLAYER = 0
+ALIEN = 1
+BULLET = 2
+ALIEN_BULLET = 3
+
+_images = {}
+
+
+def solid_image(size, color):
+    """One shared surface per (size, color) instead of one per entity."""
+    key = (size, color)
+    img = _images.get(key)
+    if img is None:
+        img = pygame.Surface(size)
+        img.fill(color)
+        _images[key] = img
+    return img
+
+
+class EntityStore:
+    def __init__(self, capacity=256, seed=None):
+        self.capacity = 0
+        self.x = np.zeros(0, np.int32)
+        self.y = np.zeros(0, np.int32)
+        self.vx = np.zeros(0, np.int32)
+        self.vy = np.zeros(0, np.int32)
+        self.w = np.zeros(0, np.int32)
+        self.h = np.zeros(0, np.int32)
+        self.kind = np.zeros(0, np.int8)
+        self.alive = np.zeros(0, bool)
+        self.views = []
+        self.free = []
+        self.rng = np.random.default_rng(seed)
+        self._grow(capacity)
+
+    def _grow(self, extra):
+        old = self.capacity
+        self.capacity = old + extra
+        for name in ("x", "y", "vx", "vy", "w", "h"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra, np.int32)]))
+        self.kind = np.concatenate([self.kind, np.full(extra, -1, np.int8)])
+        self.alive = np.concatenate([self.alive, np.zeros(extra, bool)])
+        self.views.extend([None] * extra)
+        # pop() hands out the lowest free slot first
+        self.free.extend(range(self.capacity - 1, old - 1, -1))
+
+    def spawn(self, kind, rect, vx=0, vy=0, view=None):
+        if not self.free:
+            self._grow(self.capacity)
+        i = self.free.pop()
+        self.x[i] = rect.x
+        self.y[i] = rect.y
+        self.w[i] = rect.w
+        self.h[i] = rect.h
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.kind[i] = kind
+        self.alive[i] = True
+        self.views[i] = view
+        return i
+
+    def release(self, i):
+        """Free a slot. Use kill() to also remove the sprite view from its groups."""
+        if self.alive[i]:
+            self.alive[i] = False
+            self.kind[i] = -1
+            self.views[i] = None
+            self.free.append(i)
+
+    def kill(self, indices):
+        for i in indices:
+            view = self.views[i]
+            if view is not None:
+                view.kill()
+            else:
+                self.release(i)
+
+    def clear(self):
+        self.kill(np.flatnonzero(self.alive))
+
+    def of_kind(self, kind):
+        return np.flatnonzero(self.alive & (self.kind == kind))
+
+    def count(self, kind):
+        return int(np.count_nonzero(self.alive & (self.kind == kind)))
+
+    # ---- systems ----
+
+    def move(self):
+        """Integrate every live entity by its velocity."""
+        a = self.alive
+        self.x += self.vx * a
+        self.y += self.vy * a
+
+    def bounce_x(self, kind, left, right, drop):
+        """Reverse and drop every entity of `kind` touching the side walls."""
+        m = self.alive & (self.kind == kind)
+        m &= (self.x + self.w >= right) | (self.x <= left)
+        self.vx[m] = -self.vx[m]
+        self.y[m] += drop
+
+    def cull(self, kind, top, bottom):
+        """Kill entities of `kind` that left the screen vertically. Returns the killed indices."""
+        m = self.alive & (self.kind == kind)
+        m &= (self.y + self.h < top) | (self.y > bottom)
+        dead = np.flatnonzero(m)
+        self.kill(dead)
+        return dead
+
+    def collide(self, kind_a, kind_b):
+        """
+        Batched equivalent of groupcollide(a, b, True, True).
+        Every b is claimed by the first a that overlaps it; both are killed.
+        Returns (a_indices, b_indices) of the killed entities.
+        """
+        ia = self.of_kind(kind_a)
+        ib = self.of_kind(kind_b)
+        if not len(ia) or not len(ib):
+            return ia[:0], ib[:0]
+        ax = self.x[ia, None]
+        ay = self.y[ia, None]
+        bx = self.x[ib]
+        by = self.y[ib]
+        hit = ((ax < bx + self.w[ib]) & (bx < ax + self.w[ia, None]) &
+               (ay < by + self.h[ib]) & (by < ay + self.h[ia, None]))
+        b_hit = hit.any(axis=0)
+        first_a = hit.argmax(axis=0)[b_hit]
+        dead_a = ia[np.unique(first_a)]
+        dead_b = ib[b_hit]
+        self.kill(dead_a)
+        self.kill(dead_b)
+        return dead_a, dead_b
+
+    def collide_one(self, i, kind):
+        """Batched spritecollide(sprite, group, True). Returns the killed indices."""
+        ib = self.of_kind(kind)
+        x, y, w, h = self.x[i], self.y[i], self.w[i], self.h[i]
+        hit = ((x < self.x[ib] + self.w[ib]) & (self.x[ib] < x + w) &
+               (y < self.y[ib] + self.h[ib]) & (self.y[ib] < y + h))
+        dead = ib[hit]
+        self.kill(dead)
+        return dead
+
+    def max_bottom(self, kind):
+        idx = self.of_kind(kind)
+        if not len(idx):
+            return None
+        return int((self.y[idx] + self.h[idx]).max())
+
+
+class EntitySprite(pygame.sprite.Sprite):
+    """Thin Sprite view over one slot of an EntityStore."""
+
+    def __init__(self, store, kind, image, rect, vx=0, vy=0):
+        super().__init__()
+        self.store = store
+        self.image = image
+        self._rect = pygame.Rect(rect)
+        self.index = store.spawn(kind, self._rect, vx, vy, self)
+
+    @property
+    def rect(self):
+        i = self.index
+        if i >= 0:
+            self._rect.x = int(self.store.x[i])
+            self._rect.y = int(self.store.y[i])
+        return self._rect
+
+    def kill(self):
+        if self.index >= 0:
+            self.store.release(self.index)
+            self.index = -1
+        super().kill()
@@ -0,0 +1,167 @@
+# frame_capture.py
+# Record every presented frame to an image sequence without slowing the game.
+#
+#   CAPTURE=qa_run python Invaders02.py                  qa_run/000000.png, 000001.png, ...
+#   CAPTURE=qa_run CAPTURE_FORMAT=raw python PingPong.py  raw pixels, much cheaper to write
+#   CAPTURE_WORKERS=4 CAPTURE_BUFFERS=16 ...              more encoder threads / frames in flight
+#
+# game_host.present() hands each frame to FrameCapture.frame(), which only
+# blits the screen into a free surface from a fixed pool and queues it. A
+# pool of encoder threads saves the queued frames and gives the surfaces
+# back. If every buffer is still waiting to be encoded the frame is dropped
+# (and counted) instead of making the game wait. frames.csv lists the
+# frame numbers with the time each was shown, since idle games skip
+# presenting unchanged frames. Throughput and drops are printed on exit.
+#
+# PNGs are written by write_png() below rather than pygame.image.save(),
+# which holds the GIL while it compresses and so stalls the game thread;
+# zlib lets go of it. Raw frames are the surface's pixel rows as they are
+# in memory; their size, pitch and channel masks go to raw_format.txt.
+
+import atexit
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+_STOP = None
+PNG_LEVEL = 3  # zlib level: higher is smaller but slower to encode
+FORMATS = ("png", "raw")
+
+
+def _chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def write_png(surface, path, level=PNG_LEVEL):
+    """Save surface as an 8-bit RGB PNG."""
+    w, h = surface.get_size()
+    rgb = np.frombuffer(pygame.image.tobytes(surface, "RGB"), np.uint8).reshape(h, w * 3)
+    rows = np.zeros((h, w * 3 + 1), np.uint8)  # each row starts with filter type 0
+    rows[:, 1:] = rgb
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(rows.tobytes(), level)))
+        f.write(_chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    def __init__(self, directory, fmt="png", workers=2, buffers=8):
+        if fmt not in FORMATS:
+            print(f"[capture] unknown format {fmt!r} (use {' or '.join(FORMATS)}), writing png", file=sys.stderr)
+            fmt = "png"
+        self.directory = directory
+        self.fmt = fmt
+        self.buffers = buffers
+        os.makedirs(directory, exist_ok=True)
+        self.free = queue.SimpleQueue()   # surfaces ready to be filled
+        self.jobs = queue.SimpleQueue()   # (frame number, surface) waiting to be encoded
+        self.size = None
+        self.index = open(os.path.join(directory, "frames.csv"), "w")
+        self.index.write("frame,time_ms\n")
+
+        self.offered = 0
+        self.captured = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.bytes_written = 0
+        self.copy_time = 0.0
+        self.started = None
+        self._lock = threading.Lock()
+
+        self._threads = [threading.Thread(target=self._encode, name=f"capture-{n}", daemon=True)
+                         for n in range(workers)]
+        for t in self._threads:
+            t.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        """A FrameCapture if CAPTURE is set, else None."""
+        directory = os.environ.get("CAPTURE")
+        if not directory:
+            return None
+        return cls(directory, os.environ.get("CAPTURE_FORMAT", "png"),
+                   int(os.environ.get("CAPTURE_WORKERS") or 2), int(os.environ.get("CAPTURE_BUFFERS") or 8))
+
+    def _pool(self, screen):
+        """(Re)fill the pool with surfaces matching the screen; buffers still out get dropped on return."""
+        self.size = screen.get_size()
+        self.free = queue.SimpleQueue()
+        for _ in range(self.buffers):
+            self.free.put(screen.copy())
+        if self.fmt == "raw":
+            with open(os.path.join(self.directory, "raw_format.txt"), "a") as f:
+                f.write(f"from frame {self.offered}: size {self.size[0]}x{self.size[1]} "
+                        f"pitch {screen.get_pitch()} bytes/pixel {screen.get_bytesize()} "
+                        f"masks {screen.get_masks()}\n")
+
+    def frame(self, screen):
+        """Queue a copy of what was just presented. Never blocks."""
+        start = perf_counter()
+        if self.started is None:
+            self.started = start
+        if screen.get_size() != self.size:
+            self._pool(screen)
+        n = self.offered
+        self.offered += 1
+        try:
+            buf = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buf.blit(screen, (0, 0))
+        self.jobs.put((n, buf))
+        self.captured += 1
+        self.index.write(f"{n},{(start - self.started) * 1000.0:.1f}\n")
+        self.copy_time += perf_counter() - start
+        return True
+
+    def _encode(self):
+        while True:
+            job = self.jobs.get()
+            if job is _STOP:
+                return
+            n, buf = job
+            path = os.path.join(self.directory, f"{n:06d}.{self.fmt}")
+            if self.fmt == "raw":
+                with open(path, "wb") as f:
+                    f.write(buf.get_buffer())
+            else:
+                write_png(buf, path)
+            size = os.path.getsize(path)
+            with self._lock:
+                self.encoded += 1
+                self.bytes_written += size
+            if buf.get_size() == self.size:
+                self.free.put(buf)
+
+    def close(self):
+        """Finish encoding what's queued, stop the threads and print the stats."""
+        if not self._threads:
+            return
+        for _ in self._threads:
+            self.jobs.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self.index.close()
+        atexit.unregister(self.close)
+        print("\n".join(self.report()), file=sys.stderr)
+
+    def report(self):
+        took = perf_counter() - self.started if self.started is not None else 0.0
+        if not self.offered or took <= 0:
+            return [f"[capture] {self.directory}: no frames"]
+        return [f"[capture] {self.directory}: {self.captured} of {self.offered} frames captured, "
+                f"{self.dropped} dropped ({100.0 * self.dropped / self.offered:.1f}%)",
+                f"[capture] {self.encoded / took:.1f} frames/s, {self.bytes_written / took / 1e6:.1f} MB/s "
+                f"written as {self.fmt}, {1000.0 * self.copy_time / max(self.captured, 1):.2f} ms "
+                f"per frame on the game thread"]
@@ -0,0 +1,180 @@
+# frame_profiler.py
+# Per-phase frame timing for the game loops.
+#
+# Usage inside a loop:
+#     profiler.frame()            # top of the loop, closes the previous frame
+#     ...pump events...
+#     profiler.mark("events")     # time since the last mark goes to "events"
+#     ...
+# Timings go into a fixed-size ring buffer. F3 toggles an overlay with
+# p50/p99 frame times; FRAME_PROFILE=1 shows it from the start and writes
+# a CSV of the buffer on exit (path from FRAME_PROFILE_CSV if set).
+# F4 / PROFILE_FRAMES run cProfile over a window of frames and add its top
+# functions to the overlay (see profile_capture.py).
+#
+# mark() charges the thread that calls frame(). With PIPELINE=1 the update
+# runs on a worker: its marks go to a separate split (offthread_begin() /
+# offthread_end()) that the loop adds with charge() once the worker is
+# done. Update then overlaps flip, so the phases can add up to more than
+# the frame.
+
+import atexit
+import csv
+import os
+import threading
+from array import array
+from time import perf_counter
+
+from profile_capture import ProfileCapture
+
+PHASES = ("events", "update", "collision", "draw", "flip", "tick")
+
+
+class FrameProfiler:
+    def __init__(self, name, size=600, phases=PHASES):
+        self.name = name
+        self.size = size
+        self.phases = tuple(phases) + ("other",)
+        self._slot = {p: n for n, p in enumerate(self.phases)}
+        self.samples = [array("d", bytes(8 * size)) for _ in self.phases]
+        self.totals = array("d", bytes(8 * size))
+        self.pos = 0
+        self.count = 0
+
+        self._cur = [0.0] * len(self.phases)
+        self._start = None
+        self._last = None
+        self._owner = None           # the thread that calls frame()
+        self._off = None             # worker thread split: [last mark, per-phase seconds]
+
+        self.show = os.environ.get("FRAME_PROFILE") == "1"
+        self._lines = []
+        self._lines_at = -1
+        self._shown = 0
+
+        self.capture = ProfileCapture(name)
+
+        if self.show:
+            path = os.environ.get("FRAME_PROFILE_CSV") or f"frame_profile_{name}.csv"
+            atexit.register(self.export_csv, path)
+
+    def frame(self):
+        """Close the previous frame (if any) and start a new one."""
+        self.capture.frame()
+        self._owner = threading.get_ident()
+        now = perf_counter()
+        if self._start is not None:
+            cur = self._cur
+            total = now - self._start
+            cur[-1] += now - self._last
+            pos = self.pos
+            for n, v in enumerate(cur):
+                self.samples[n][pos] = v * 1000.0
+                cur[n] = 0.0
+            self.totals[pos] = total * 1000.0
+            self.pos = (pos + 1) % self.size
+            self.count += 1
+        self._start = now
+        self._last = now
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        now = perf_counter()
+        if self._owner is not None and threading.get_ident() != self._owner:
+            off = self._off
+            if off is not None:
+                off[1][self._slot[phase]] += now - off[0]
+                off[0] = now
+            return
+        if self._last is not None:
+            self._cur[self._slot[phase]] += now - self._last
+        self._last = now
+
+    def offthread_begin(self):
+        """On the worker, before its update: its marks are timed from here."""
+        self._off = [perf_counter(), [0.0] * len(self.phases)]
+
+    def offthread_end(self):
+        """On the worker, after its update: the per-phase seconds it marked."""
+        off, self._off = self._off, None
+        return off[1]
+
+    def charge(self, split):
+        """
+        On the frame's thread: add a worker's split. The time since the last
+        mark was spent waiting for that worker, so it isn't charged again.
+        """
+        for n, v in enumerate(split):
+            self._cur[n] += v
+        self._last = perf_counter()
+
+    def loop_started(self):
+        """Called by GameLoop.run(): a PROFILE_FRAMES capture starts here, not at import."""
+        if self.capture.loop_started():
+            self.show = True
+
+    def toggle(self):
+        self.show = not self.show
+
+    def toggle_capture(self):
+        """Start or stop a cProfile window; the overlay comes on to show it."""
+        self.capture.toggle()
+        self.show = True
+
+    # ---- stats ----
+
+    def _window(self, data):
+        n = min(self.count, self.size)
+        if self.count <= self.size:
+            return list(data[:n])
+        return list(data[self.pos:]) + list(data[:self.pos])
+
+    def percentiles(self, data, *qs):
+        values = sorted(self._window(data))
+        if not values:
+            return [0.0 for _ in qs]
+        return [values[min(len(values) - 1, int(q * len(values)))] for q in qs]
+
+    def lines(self):
+        """Overlay text, refreshed every 30 frames so it is readable and cheap."""
+        if self.count - self._lines_at >= 30 or not self._lines:
+            p50, p99 = self.percentiles(self.totals, 0.5, 0.99)
+            out = [f"frame p50 {p50:5.2f}ms  p99 {p99:5.2f}ms"]
+            for n, phase in enumerate(self.phases):
+                a, b = self.percentiles(self.samples[n], 0.5, 0.99)
+                out.append(f"{phase:>9} {a:5.2f} / {b:5.2f}")
+            self._lines = out
+            self._lines_at = self.count
+        return self._lines + self.capture.summary
+
+    # ---- output ----
+
+    def draw(self, screen, font, color, pos=(10, 60)):
+        """Blit the overlay straight onto the screen."""
+        if not self.show:
+            return
+        x, y = pos
+        for line in self.lines():
+            surf = font.render(line, True, color)
+            screen.blit(surf, (x, y))
+            y += surf.get_height()
+
+    def show_on(self, renderer, font, color, pos=(10, 60)):
+        """Keep the overlay on a DirtyRenderer's HUD layer."""
+        x, y = pos
+        lines = self.lines() if self.show else []
+        for n in range(max(len(lines), self._shown)):
+            key = f"profiler{n}"
+            if n < len(lines):
+                renderer.set_text(key, font, lines[n], color, (x, y + n * font.get_linesize()))
+            else:
+                renderer.remove_text(key)
+        self._shown = len(lines)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame_ms",) + tuple(p + "_ms" for p in self.phases))
+            columns = [self._window(self.totals)] + [self._window(s) for s in self.samples]
+            for row in zip(*columns):
+                writer.writerow([f"{v:.3f}" for v in row])
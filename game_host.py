@@ -0,0 +1,97 @@
+# game_host.py
+# One pygame setup shared by every game: init, the display window,
+# fonts and sounds. Games ask for what they need instead of calling
+# pygame.init() / set_mode() themselves, so the launcher can switch
+# between games without restarting the process.
+# CAPTURE=<dir> records every presented frame (see frame_capture.py).
+
+import os
+from time import perf_counter
+
+import pygame
+
+_ready = False
+_mode = None
+_fonts = {}
+_sounds = {}
+capture = None
+
+# startup timing for the launcher report
+started_at = None
+first_frame_at = None
+
+
+def init():
+    """pygame.init() and the mixer, once per process."""
+    global _ready, capture
+    if _ready:
+        return
+    pygame.init()
+    if os.environ.get("CAPTURE"):
+        # only imported when capturing: it needs numpy, which Othello otherwise does without
+        from frame_capture import FrameCapture
+        capture = FrameCapture.from_env()
+    try:
+        pygame.mixer.init()
+    except Exception:
+        # No problem; sound optional
+        pass
+    _ready = True
+
+
+def open_window(size, caption, flags=0, vsync=0):
+    """Return the display surface, only calling set_mode() when size or flags change."""
+    global _mode
+    init()
+    mode = (tuple(size), flags, vsync)
+    screen = pygame.display.get_surface()
+    if screen is None or mode != _mode:
+        if _mode and (_mode[1] ^ flags) & pygame.SCALED:
+            # SDL can't switch a window in or out of SCALED, start a fresh one
+            pygame.display.quit()
+            pygame.display.init()
+        try:
+            screen = pygame.display.set_mode(size, flags, vsync=vsync)
+        except pygame.error:
+            # no vsync available on this renderer
+            screen = pygame.display.set_mode(size, flags)
+        _mode = mode
+    pygame.display.set_caption(caption)
+    return screen
+
+
+def font(size):
+    f = _fonts.get(size)
+    if f is None:
+        f = _fonts[size] = pygame.font.Font(None, size)
+    return f
+
+
+def sound(path):
+    """Sound object or None if the mixer or file isn't available."""
+    if path not in _sounds:
+        try:
+            _sounds[path] = pygame.mixer.Sound(path)
+        except Exception:
+            _sounds[path] = None
+    return _sounds[path]
+
+
+def present(rects=None):
+    """Flip the display (or update only `rects`) and note the first frame shown."""
+    global first_frame_at
+    if rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rects)
+    if capture is not None:
+        capture.frame(pygame.display.get_surface())
+    if first_frame_at is None:
+        first_frame_at = perf_counter()
+
+
+def start_clock():
+    """Start timing a game launch; the next present() closes it."""
+    global started_at, first_frame_at
+    started_at = perf_counter()
+    first_frame_at = None
@@ -0,0 +1,288 @@
+# game_loop.py
+# The main loop shared by every game.
+#
+# A game is one or more Scenes (menu, match, ...). GameLoop.run() pumps
+# input, advances the current scene in fixed steps, lets it draw and
+# presents the frame, so pacing works the same way in every game:
+#
+#     loop = GameLoop(profiler)
+#     loop.run(MenuScene())
+#
+# - update(dt_ms) runs at `fps` steps per second of game time no matter how
+#   fast frames are drawn: a late frame runs several steps (at most
+#   MAX_STEPS), an early one none. dt_ms is a whole number of ms
+#   (17, 17, 16, ...) adding up to exactly 1000 per second.
+# - draw(alpha) gets how far game time is into the next step (0..1) for
+#   interpolating positions, and returns what changed: None for the whole
+#   screen, a list of rects, or [] for nothing.
+# - while scene.idle is true nothing moves, so the loop sleeps in
+#   pygame.event.wait() until there is input instead of ticking.
+# - every() / after() run callbacks on game time: they stop while the game
+#   is idle and replay exactly, unlike pygame.time.set_timer().
+#
+# PIPELINE=1 runs the update steps of frame N+1 on a worker thread while
+# the main thread presents frame N. draw() has already composed frame N
+# into the screen surface, which update() never touches, so that surface
+# is the snapshot being shown; pygame releases the GIL while it copies it
+# to the display, so the two really overlap. The price is one frame more
+# of input latency. How much time overlapped is printed when the loop ends.
+
+import os
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, time
+
+import pygame
+
+import game_host
+import scores
+
+MAX_STEPS = 5  # more than this many steps behind and the loop lets game time slip
+PIPELINE = os.environ.get("PIPELINE") == "1"
+
+
+class Scene:
+    """One screen of a game. Override what you need; self.loop is set on entry."""
+
+    idle = False
+
+    def enter(self):
+        pass
+
+    def event(self, ev):
+        pass
+
+    def update(self, dt_ms):
+        pass
+
+    def draw(self, alpha):
+        return None
+
+    def present(self, rects):
+        if rects != []:
+            game_host.present(rects)
+
+
+class Timer:
+    def __init__(self, due, interval, callback, repeat):
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.repeat = repeat
+
+
+class GameLoop:
+    """
+    profiler: the game's FrameProfiler (F3 toggles its overlay, F4 a cProfile capture)
+    latency: optional LatencyProbe (input_latency.py)
+    inputs: optional InputSource (input_replay.py); steps per frame are
+    recorded with the input so replays run the same steps
+    pipeline: overlap update and present on two threads (default: PIPELINE=1)
+    """
+
+    def __init__(self, profiler, fps=60, latency=None, inputs=None, pipeline=PIPELINE):
+        self.profiler = profiler
+        self.fps = fps
+        self.latency = latency
+        self.inputs = inputs
+        self.headless = inputs is not None and inputs.headless
+        self.clock = pygame.time.Clock()
+        self.keys = None
+        self.scene = None
+        self.running = False
+        self.steps = 0       # fixed steps run so far
+        self.time = 0        # game time in ms
+        self._lag = 0.0      # real time not yet simulated, ms
+        self._next = None
+        self._timers = []
+        self.pipeline = pipeline
+        self.overlap = array("d")   # per pipelined frame: ms update and present ran at the same time
+        self.serial = array("d")    # ... and ms they would have taken one after the other
+
+    # ---- timers (game time) ----
+    def every(self, ms, callback):
+        timer = Timer(self.time + ms, ms, callback, True)
+        self._timers.append(timer)
+        return timer
+
+    def after(self, ms, callback):
+        timer = Timer(self.time + ms, ms, callback, False)
+        self._timers.append(timer)
+        return timer
+
+    def cancel(self, timer):
+        if timer in self._timers:
+            self._timers.remove(timer)
+
+    # ---- scenes ----
+    def switch(self, scene):
+        """Change scene after the current step; timers of the old scene are dropped."""
+        self._next = scene
+
+    def stop(self):
+        self.running = False
+
+    def _enter(self, scene):
+        self._next = None
+        self._timers.clear()
+        self.scene = scene
+        scene.loop = self
+        scene.enter()
+
+    def _step(self):
+        """Advance game time by one step and fire due timers. Returns the step in ms."""
+        n = self.steps
+        dt = (n + 1) * 1000 // self.fps - n * 1000 // self.fps
+        self.steps += 1
+        self.time += dt
+        for timer in [t for t in self._timers if t.due <= self.time]:
+            if timer.repeat:
+                timer.due += timer.interval
+            else:
+                self._timers.remove(timer)
+            timer.callback()
+        return dt
+
+    def _update(self, scene, steps):
+        for _ in range(steps):
+            if self._next is not None:
+                break
+            scene.update(self._step())
+        self.profiler.mark("update")
+
+    def _timed_update(self, scene, steps):
+        """The worker's task: returns (seconds, per-phase split) for the main thread to charge."""
+        prof = self.profiler
+        prof.offthread_begin()
+        start = perf_counter()
+        prof.capture.in_worker(self._update, scene, steps)
+        return perf_counter() - start, prof.offthread_end()
+
+    def _poll(self, wait):
+        if self.inputs is not None:
+            return self.inputs.poll()
+        events = pygame.event.get()
+        if wait and not events:
+            events = [pygame.event.wait()] + pygame.event.get()
+        return events, pygame.key.get_pressed()
+
+    def run(self, scene):
+        """Run scenes until stop() or a QUIT event. Returns the last scene."""
+        prof = self.profiler
+        step_ms = 1000.0 / self.fps
+        self.running = True
+        started = time()
+        self._enter(scene)
+        worker = ThreadPoolExecutor(1, thread_name_prefix="update") if self.pipeline else None
+        shown = None  # pipelined: (scene, rects) drawn but not presented yet
+        prof.loop_started()
+
+        while self.running:
+            prof.frame()
+            scene = self.scene
+            idle = scene.idle and self.inputs is None
+            if idle:
+                # nothing moves: sleep until input and don't count the wait as game time
+                events, self.keys = self._poll(True)
+                self.clock.tick()
+                self._lag = 0.0
+            else:
+                if self.headless:
+                    self._lag += step_ms
+                elif self.latency:
+                    self._lag += self.latency.tick(self.clock, self.fps)
+                else:
+                    self._lag += self.clock.tick(self.fps)
+                prof.mark("tick")
+                events, self.keys = self._poll(False)
+            if self.latency:
+                self.latency.polled(events)
+
+            for ev in events:
+                if ev.type == pygame.QUIT:
+                    self.running = False
+                elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_F3:
+                    prof.toggle()
+                elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_F4:
+                    prof.toggle_capture()
+                scene.event(ev)
+            prof.mark("events")
+
+            steps = 0
+            if not idle:
+                steps = min(int(self._lag // step_ms), MAX_STEPS) if self.running else 0
+                if self.inputs is not None:
+                    steps = self.inputs.steps(steps)
+                self._lag = min(max(self._lag - steps * step_ms, 0.0), step_ms)
+            if not self.running:
+                break
+            if worker is None:
+                self._update(scene, steps)
+            else:
+                self._present_while_updating(worker, scene, steps, shown)
+
+            if self._next is not None:
+                self._enter(self._next)
+                scene = self.scene
+            rects = scene.draw(self._lag / step_ms)
+            prof.mark("draw")
+            if worker is None:
+                scene.present(rects)
+                if self.latency:
+                    self.latency.presented()
+                prof.mark("flip")
+            elif scene.idle and self.inputs is None:
+                # the next frame waits for input, so this one can't wait for it
+                scene.present(rects)
+                if self.latency:
+                    self.latency.presented()
+                shown = None
+            else:
+                shown = (scene, rects)
+
+        if worker is not None:
+            worker.shutdown()
+            self.print_overlap()
+        self._save_session(started)
+        return self.scene
+
+    def _save_session(self, started):
+        """Note the play session in scores.db (not for replays)."""
+        if self.inputs is not None and self.inputs.replaying:
+            return
+        store = scores.shared()
+        if store:
+            store.add_session(self.profiler.name, started, time(), steps=self.steps,
+                              frames=self.profiler.count)
+
+    def _present_while_updating(self, worker, scene, steps, shown):
+        """Present the frame drawn last time while the worker runs this frame's steps."""
+        # whatever the worker moves now is only seen at the next present
+        moved = self.latency.take_moved() if self.latency else None
+        start = perf_counter()
+        job = worker.submit(self._timed_update, scene, steps)
+        present = 0.0
+        if shown is not None:
+            shown[0].present(shown[1])
+            present = perf_counter() - start
+            if self.latency:
+                self.latency.presented(moved)
+        self.profiler.mark("flip")
+        update, split = job.result()
+        wall = perf_counter() - start
+        if steps and shown is not None:
+            self.overlap.append(max(0.0, update + present - wall) * 1000.0)
+            self.serial.append((update + present) * 1000.0)
+        self.profiler.charge(split)
+
+    def print_overlap(self):
+        n = len(self.overlap)
+        if not n:
+            return
+        overlap = sorted(self.overlap)
+        total = sum(self.serial)
+        print(f"[pipeline] {self.profiler.name}: {n} frames, update || present overlap "
+              f"mean {sum(overlap) / n:.2f} ms, p50 {overlap[n // 2]:.2f} ms, p90 {overlap[int(n * 0.9)]:.2f} ms "
+              f"per frame ({100.0 * sum(overlap) / max(total, 1e-9):.0f}% of update + present)",
+              file=sys.stderr)
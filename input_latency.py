@@ -0,0 +1,138 @@
+# input_latency.py
+# How long a key press takes to show up on screen, and a way to shorten it.
+#
+#   INPUT_LATENCY=1 python PingPong.py     print a latency histogram on exit
+#   LATE_INPUT=1 python Invaders01.py      sample input as late as possible
+#
+# Usage inside a loop:
+#     dt = latency.tick(clock, 60)     # instead of clock.tick(60), just before reading input
+#     events = pygame.event.get()
+#     latency.polled(events)           # right after input is read
+#     ...move things; latency.moved() if a controlled object moved...
+#     pygame.display.flip()
+#     latency.presented()              # right after the flip
+#
+# A press is timed from the poll that first saw it to the end of the first
+# flip after which the controlled object had moved. The press itself
+# happened somewhere between that poll and the one before it, so the
+# report gives both bounds.
+#
+# Normally the loop sleeps in clock.tick() and then reads input. When the
+# flip waits for vsync that input is almost a frame old by the time it is
+# shown. With LATE_INPUT=1 tick() instead sleeps until just before the next
+# flip is due, minus how long sampling -> flip has recently taken, and only
+# then lets the game read input.
+
+import atexit
+import os
+import sys
+from array import array
+from time import perf_counter, sleep
+
+import pygame
+
+MAX_PENDING_FRAMES = 30  # a press with no visible effect by then is dropped (e.g. paddle at the wall)
+MARGIN = 0.002           # slack kept before the flip deadline in late mode, seconds
+BUCKETS_MS = (4, 8, 16, 25, 33, 50, 75, 100)
+
+
+class LatencyProbe:
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = set(keys)
+        self.enabled = os.environ.get("INPUT_LATENCY") == "1"
+        self.late = os.environ.get("LATE_INPUT") == "1"
+        self.frame = 0
+        self.pending = []               # (seen at, previous poll at, frame)
+        self.low = array("d")           # ms from the poll that saw the press
+        self.high = array("d")          # ms from the poll before that
+        self.frames = array("H")        # flips until it showed
+        self.work = 0.004               # recent sample -> flip time, seconds
+        self.sampled_at = None
+        self.last_poll = None
+        self.last_present = None
+        self._moved = False
+        if self.enabled:
+            atexit.register(self.print_report)
+
+    def tick(self, clock, fps):
+        """clock.tick(fps), or in late mode sleep until input is due for the next flip."""
+        if not self.late or self.last_present is None:
+            return clock.tick(fps)
+        wake = self.last_present + 1.0 / fps - self.work - MARGIN
+        delay = wake - perf_counter()
+        if delay > 0:
+            sleep(delay)
+        return clock.tick()
+
+    def polled(self, events):
+        now = perf_counter()
+        self.sampled_at = now
+        if self.enabled:
+            prev = self.last_poll if self.last_poll is not None else now
+            for ev in events:
+                if ev.type == pygame.KEYDOWN and ev.key in self.keys:
+                    self.pending.append((now, prev, self.frame))
+        self.last_poll = now
+
+    def moved(self):
+        """A controlled object changed position this frame."""
+        self._moved = True
+
+    def take_moved(self):
+        """Whether something moved since the last call; for loops that present a frame late."""
+        moved, self._moved = self._moved, False
+        return moved
+
+    def presented(self, moved=None):
+        """Right after a flip. moved: what take_moved() said for this frame, if the loop used it."""
+        now = perf_counter()
+        self.last_present = now
+        if self.sampled_at is not None:
+            # jumps up at once after a slow frame, comes back down slowly
+            took = now - self.sampled_at
+            self.work = max(took, self.work * 0.95 + took * 0.05)
+        if moved is None:
+            moved, self._moved = self._moved, False
+        if self.pending:
+            if moved:
+                for seen, prev, frame in self.pending:
+                    self.low.append((now - seen) * 1000.0)
+                    self.high.append((now - prev) * 1000.0)
+                    self.frames.append(self.frame - frame + 1)
+                self.pending.clear()
+            else:
+                self.pending = [p for p in self.pending if self.frame - p[2] < MAX_PENDING_FRAMES]
+        self.frame += 1
+
+    def report(self):
+        """Text lines: percentiles and a histogram of input -> display times."""
+        n = len(self.low)
+        mode = "late input" if self.late else "normal input"
+        if not n:
+            return [f"[latency] {self.name} ({mode}): no presses measured"]
+        low = sorted(self.low)
+        high = sorted(self.high)
+
+        def pct(values, p):
+            return values[min(n - 1, int(p * n))]
+
+        lines = [f"[latency] {self.name} ({mode}): {n} presses, input -> display "
+                 f"p50 {pct(low, 0.5):.1f}-{pct(high, 0.5):.1f} ms, "
+                 f"p90 {pct(low, 0.9):.1f}-{pct(high, 0.9):.1f} ms, "
+                 f"max {low[-1]:.1f}-{high[-1]:.1f} ms"]
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for v in self.high:
+            counts[sum(1 for b in BUCKETS_MS if v > b)] += 1
+        edges = (0,) + BUCKETS_MS
+        for k, c in enumerate(counts):
+            label = f"{edges[k]}-{BUCKETS_MS[k]} ms" if k < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]} ms"
+            lines.append(f"  {label:>10} {c:5d} {'#' * round(40 * c / n)}")
+        by_frames = {}
+        for f in self.frames:
+            by_frames[f] = by_frames.get(f, 0) + 1
+        lines.append("  frames until shown: " + ", ".join(f"{f}: {c}" for f, c in sorted(by_frames.items())))
+        return lines
+
+    def print_report(self):
+        print("\n".join(self.report()), file=sys.stderr)
@@ -0,0 +1,181 @@
+# input_replay.py
+# Deterministic input recording and replay for the Invaders games.
+#
+#   RECORD_INPUT=run.inp python Invaders02.py         record a session
+#   REPLAY_INPUT=run.inp python Invaders02.py         watch it again
+#   REPLAY_INPUT=run.inp REPLAY_HEADLESS=1 ...        replay at max speed, no window
+#
+# Each frame stores the held keys as a bitmask, how many fixed update steps
+# the game loop ran and the watched events as one byte each, so a 10 minute
+# session is well under 100 KB. The header
+# keeps the RNG seed; the footer keeps the frame count and a checksum of
+# the final game state, which replay compares against as a regression check.
+
+import os
+import struct
+import sys
+import zlib
+from time import perf_counter
+
+import pygame
+
+MAGIC = b"INVR"
+VERSION = 2
+END = 0xFF
+MAX_KEYS = 7  # mask value 0xFF is reserved for the footer marker
+
+
+class _Keys:
+    """Stand-in for pygame.key.get_pressed() built from a recorded mask."""
+
+    def __init__(self, watched, mask):
+        self.held = {k for n, k in enumerate(watched) if mask & (1 << n)}
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class InputSource:
+    """
+    Per-frame input for a game loop: live, recording or replaying.
+    watched_keys: key constants polled every frame (LEFT, RIGHT, ...)
+    watched_events: (event type, key or None) pairs that matter to the game
+    """
+
+    def __init__(self, game, watched_keys, watched_events, record=None, replay=None, headless=False):
+        assert len(watched_keys) <= MAX_KEYS
+        self.game = game
+        self.watched_keys = tuple(watched_keys)
+        # QUIT is always recorded so a replay stops on the same frame
+        self.watched_events = [(pygame.QUIT, None)] + list(watched_events)
+        self.headless = headless and replay is not None
+        self.frames = 0
+        self.resets = 0
+        self.started = perf_counter()
+        self._out = None
+        self._data = None
+        self._pos = 0
+        self._frame = None
+        self._steps = 0
+
+        if replay:
+            with open(replay, "rb") as f:
+                self._data = f.read()
+            self._read_header()
+        else:
+            self.seed = int.from_bytes(os.urandom(4), "little")
+            if record:
+                self._out = open(record, "wb")
+                name = game.encode()
+                self._out.write(struct.pack("<4sBQB", MAGIC, VERSION, self.seed, len(name)) + name)
+
+    @classmethod
+    def from_env(cls, game, watched_keys, watched_events):
+        src = cls(game, watched_keys, watched_events,
+                  record=os.environ.get("RECORD_INPUT"),
+                  replay=os.environ.get("REPLAY_INPUT"),
+                  headless=os.environ.get("REPLAY_HEADLESS") == "1")
+        if src.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        return src
+
+    @property
+    def replaying(self):
+        return self._data is not None
+
+    def new_seed(self):
+        """Seed for the next game (restarts get their own, still deterministic)."""
+        seed = self.seed + self.resets
+        self.resets += 1
+        return seed
+
+    def _read_header(self):
+        size = struct.calcsize("<4sBQB")
+        magic, version, self.seed, n = struct.unpack_from("<4sBQB", self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an input recording")
+        name = self._data[size:size + n].decode()
+        if name != self.game:
+            raise ValueError(f"recording is for {name}, not {self.game}")
+        self._pos = size + n
+
+    def poll(self):
+        """Return (events, keys) for this frame."""
+        self.frames += 1
+        if self._data is not None:
+            return self._replay_frame()
+
+        events = pygame.event.get()
+        keys = pygame.key.get_pressed()
+        if self._out:
+            mask = 0
+            for n, k in enumerate(self.watched_keys):
+                if keys[k]:
+                    mask |= 1 << n
+            codes = bytes(self._code(ev) for ev in events)
+            self._frame = (mask, codes.replace(b"\xff", b""))
+        return events, keys
+
+    def steps(self, n):
+        """
+        Update steps to run this frame: `n` when live (and it is recorded),
+        the recorded count when replaying.
+        """
+        if self._data is not None:
+            return self._steps
+        if self._out and self._frame is not None:
+            mask, codes = self._frame
+            self._out.write(bytes((mask, n, len(codes))) + codes)
+            self._frame = None
+        return n
+
+    def _code(self, ev):
+        for n, (etype, key) in enumerate(self.watched_events):
+            if ev.type == etype and (key is None or getattr(ev, "key", None) == key):
+                return n
+        return END
+
+    def _replay_frame(self):
+        # keep the window responsive, but the live input is ignored
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                self._steps = 0
+                return [ev], _Keys((), 0)
+        data = self._data
+        if self._pos >= len(data) or data[self._pos] == END:
+            self._steps = 0
+            return [pygame.event.Event(pygame.QUIT)], _Keys((), 0)
+        mask, self._steps, n = data[self._pos], data[self._pos + 1], data[self._pos + 2]
+        codes = data[self._pos + 3:self._pos + 3 + n]
+        self._pos += 3 + n
+        events = []
+        for c in codes:
+            etype, key = self.watched_events[c]
+            events.append(pygame.event.Event(etype, key=key) if key is not None else pygame.event.Event(etype))
+        return events, _Keys(self.watched_keys, mask)
+
+    def close(self, checksum):
+        """Finish a recording or check a replay against it."""
+        if self._out:
+            self._out.write(bytes((END,)) + struct.pack("<II", self.frames, checksum))
+            self._out.close()
+            self._out = None
+        elif self._data is not None:
+            elapsed = perf_counter() - self.started
+            result = "no footer"
+            if len(self._data) >= 9 and self._data[-9] == END:
+                frames, expected = struct.unpack_from("<II", self._data, len(self._data) - 8)
+                result = "MATCH" if expected == checksum else f"MISMATCH (expected {expected:08x})"
+            print(f"[replay] {self.game}: {self.frames} frames in {elapsed:.2f}s "
+                  f"({self.frames / max(elapsed, 1e-9):.0f} fps) checksum {checksum:08x} {result}",
+                  file=sys.stderr)
+
+
+def state_checksum(store, score):
+    """CRC of every live entity and the score."""
+    alive = store.alive
+    crc = zlib.crc32(struct.pack("<q", score))
+    for arr in (store.kind, store.x, store.y, store.vx, store.vy):
+        crc = zlib.crc32(arr[alive].tobytes(), crc)
+    return crc
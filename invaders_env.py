@@ -0,0 +1,476 @@
+# invaders_env.py
+# Invaders02 as a batched, gym-style environment for training and testing bots.
+#
+#   python invaders_env.py --bench           env steps per second for 1 .. 4096 instances
+#   python invaders_env.py --check           step the env next to Invaders02.GameScene, compare every entity
+#
+#   env = InvadersVecEnv(256, seed=1)
+#   obs, info = env.reset()
+#   obs, reward, done, info = env.step(actions)      # actions: (256,) ints, see ACTIONS
+#
+# The N instances share one set of arrays shaped (N, CAP): one row per
+# game and one column per EntityStore slot, with the same free-slot order,
+# so every rule Invaders02 applies (moving, wall bounces, alien fire,
+# bunkers, bullet/alien and bullet/player hits) runs once for the whole
+# batch. Instance i of reset(seed=s) plays exactly like Invaders02 whose
+# EntityStore was seeded with s + i; after a game ends it is started again
+# with the seed N higher. Rendering is off unless render() is called.
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+from entities import PLAYER, ALIEN, BULLET, ALIEN_BULLET
+import Invaders02
+from Invaders02 import BUNKER_SIZE, BUNKER_Y, CRATER, WHITE, RED, GREEN, DARK_GREEN
+
+WIDTH, HEIGHT = 800, 600
+CAP = 128            # entity slots per instance (the game's store starts with 256, play never needs 128)
+ALIENS = 30          # slots 1..30, in the order Invaders02 spawns them
+BUNKER_X = (160, 320, 480, 640)
+RANDOM_BLOCK = 4096  # alien fire randoms drawn ahead per instance
+MAX_STEPS = 20000    # a game that lasts longer is cut off (truncated in info)
+
+ACTIONS = ("noop", "left", "right", "fire", "left+fire", "right+fire")
+NEAREST = 8          # alien / player bullets in the observation
+OBS_SIZE = 1 + ALIENS * 3 + NEAREST * 3 * 2 + len(BUNKER_X)
+
+
+def _mask_array(mask):
+    w, h = mask.get_size()
+    return np.array([[mask.get_at((x, y)) for x in range(w)] for y in range(h)], bool)
+
+
+def _bunker_bitmaps():
+    background = pygame.Surface((WIDTH, HEIGHT))
+    return np.stack([_mask_array(Invaders02.Bunker(x, background).mask) for x in BUNKER_X])
+
+
+BUNKERS = _bunker_bitmaps()            # (4, h, w)
+BUNKER_LEFT = np.array([x - BUNKER_SIZE[0] // 2 for x in BUNKER_X])
+CRATER_BITS = _mask_array(CRATER)
+CRATER_R = CRATER.get_size()[0] // 2
+
+
+class InvadersVecEnv:
+    def __init__(self, num_envs, seed=None, render_mode=None, max_steps=MAX_STEPS):
+        """render_mode: None, "rgb_array" (render() returns pixels) or "human" (render() shows a window)"""
+        n = self.num_envs = num_envs
+        self.render_mode = render_mode
+        self.max_steps = max_steps
+        self.seed = seed
+
+        for name in ("x", "y", "vx", "vy", "w", "h"):
+            setattr(self, name, np.zeros((n, CAP), np.int32))
+        self.kind = np.full((n, CAP), -1, np.int8)
+        self.alive = np.zeros((n, CAP), bool)
+        self.free = np.zeros((n, CAP), np.int32)   # LIFO stack of free slots, like EntityStore.free
+        self.nfree = np.zeros(n, np.int32)
+        self.bunkers = np.zeros((n,) + BUNKERS.shape, bool)
+
+        self.score = np.zeros(n, np.int64)
+        self.steps = np.zeros(n, np.int64)
+        self.seeds = np.zeros(n, np.int64)
+        self.dropped = np.zeros(n, np.int64)       # spawns that found no free slot
+        self.rngs = [None] * n
+        self.randoms = np.zeros((n, RANDOM_BLOCK))
+        self.cursor = np.zeros(n, np.int64)
+        self._rows = np.arange(n)
+        self._screen = None
+
+    # ---- gym API ----
+    def reset(self, seed=None):
+        """Start every instance; instance i gets seed + i. Returns (obs, info)."""
+        if seed is None:
+            seed = self.seed if self.seed is not None else int(np.random.SeedSequence().entropy % 2 ** 31)
+        self.seed = seed
+        self._reset(self._rows, seed + self._rows)
+        return self.observe(), {"seed": self.seeds.copy()}
+
+    def step(self, actions):
+        """
+        Advance every instance by one game update.
+        Returns (obs, reward, done, info). Instances that finished are started
+        again at once; info["final_obs"] / info["final_score"] hold how they ended.
+        """
+        actions = np.asarray(actions)
+        before = self.score.copy()
+        game_over = self._update(actions)
+        self.steps += 1
+        game_clear = ~(self.alive[:, 1:ALIENS + 1] & (self.kind[:, 1:ALIENS + 1] == ALIEN)).any(axis=1)
+        truncated = (self.steps >= self.max_steps) & ~game_over & ~game_clear
+        done = game_over | game_clear | truncated
+        reward = (self.score - before).astype(np.float32)
+        obs = self.observe()
+        info = {"game_over": game_over, "game_clear": game_clear, "truncated": truncated,
+                "score": self.score.copy()}
+        if done.any():
+            ended = np.flatnonzero(done)
+            info["final_obs"] = obs[ended]
+            info["final_score"] = self.score[ended]
+            info["ended"] = ended
+            self._reset(ended, self.seeds[ended] + self.num_envs)
+            obs[ended] = self.observe()[ended]
+        return obs, reward, done, info
+
+    def observe(self):
+        """
+        float32 (N, OBS_SIZE), coordinates scaled to 0..1:
+        player x, then (alive, x, y) of every alien, of the NEAREST alien bullets
+        (lowest first) and of the NEAREST player bullets (highest first), then the
+        fraction of each bunker left.
+        """
+        n = self.num_envs
+        obs = np.zeros((n, OBS_SIZE), np.float32)
+        obs[:, 0] = self.x[:, 0] / WIDTH
+        a = slice(1, ALIENS + 1)
+        aliens = self.alive[:, a] & (self.kind[:, a] == ALIEN)
+        obs[:, 1:1 + ALIENS * 3] = np.stack([aliens, self.x[:, a] / WIDTH * aliens,
+                                              self.y[:, a] / HEIGHT * aliens], axis=2).reshape(n, -1)
+        col = 1 + ALIENS * 3
+        for kind, key in ((ALIEN_BULLET, -self.y), (BULLET, self.y)):
+            m = self.alive & (self.kind == kind)
+            order = np.argsort(np.where(m, key, 1 << 20), axis=1, kind="stable")[:, :NEAREST]
+            keep = np.take_along_axis(m, order, 1)
+            block = np.stack([keep, np.take_along_axis(self.x, order, 1) / WIDTH * keep,
+                              np.take_along_axis(self.y, order, 1) / HEIGHT * keep], axis=2)
+            obs[:, col:col + NEAREST * 3] = block.reshape(n, -1)
+            col += NEAREST * 3
+        obs[:, col:] = self.bunkers.sum(axis=(2, 3)) / BUNKERS.sum(axis=(1, 2))
+        return obs
+
+    def render(self, index=0):
+        """Draw one instance. rgb_array: returns (HEIGHT, WIDTH, 3) uint8; human: shows it."""
+        if self.render_mode is None:
+            return None
+        if self._screen is None:
+            if self.render_mode == "human":
+                import game_host
+                self._screen = game_host.open_window((WIDTH, HEIGHT), "Space Invaders - env")
+            else:
+                self._screen = pygame.Surface((WIDTH, HEIGHT))
+        screen = self._screen
+        screen.fill(DARK_GREEN)
+        pix = pygame.surfarray.pixels3d(screen)
+        for b, left in enumerate(BUNKER_LEFT):
+            ys, xs = np.nonzero(self.bunkers[index, b])
+            pix[xs + left, ys + BUNKER_Y] = GREEN
+        del pix
+        colors = {PLAYER: GREEN, ALIEN: RED, BULLET: WHITE, ALIEN_BULLET: RED}
+        for i in np.flatnonzero(self.alive[index]):
+            rect = (self.x[index, i], self.y[index, i], self.w[index, i], self.h[index, i])
+            screen.fill(colors[int(self.kind[index, i])], rect)
+        if self.render_mode == "human":
+            pygame.event.pump()
+            pygame.display.flip()
+            return None
+        return pygame.surfarray.array3d(screen).swapaxes(0, 1)
+
+    # ---- the batched EntityStore ----
+    def _reset(self, envs, seeds):
+        self.seeds[envs] = seeds
+        self.alive[envs] = False
+        self.kind[envs] = -1
+        self.free[envs] = np.arange(CAP - 1, -1, -1)
+        self.nfree[envs] = CAP
+        self.score[envs] = 0
+        self.steps[envs] = 0
+        self.bunkers[envs] = BUNKERS
+        # the player, then the aliens column by column, as GameScene spawns them
+        rows = np.repeat(envs, 1 + ALIENS)
+        ax = np.repeat(50 + np.arange(10) * 50, 3)
+        ay = np.tile(70 + np.arange(3) * 80, 10)
+        n = len(envs)
+        self._spawn(rows, np.tile(np.r_[PLAYER, [ALIEN] * ALIENS], n), np.tile(np.r_[385, ax], n),
+                    np.tile(np.r_[535, ay], n), 30, 30, np.tile(np.r_[0, [2] * ALIENS], n), 0)
+        for e, s in zip(envs.tolist(), seeds.tolist()):
+            self.rngs[e] = np.random.default_rng(s)
+            self.randoms[e] = self.rngs[e].random(RANDOM_BLOCK)
+            self.cursor[e] = 0
+
+    def _spawn(self, envs, kind, x, y, w, h, vx, vy):
+        """Spawn one entity per entry of envs, in order (EntityStore.spawn per entity)."""
+        if not len(envs):
+            return
+        rank = _rank_in_group(envs)
+        ok = rank < self.nfree[envs]
+        if not ok.all():
+            np.add.at(self.dropped, envs[~ok], 1)
+        e = envs[ok]
+        slots = self.free[e, self.nfree[e] - 1 - rank[ok]]
+        for name, value in (("x", x), ("y", y), ("w", w), ("h", h), ("vx", vx), ("vy", vy)):
+            getattr(self, name)[e, slots] = np.broadcast_to(value, envs.shape)[ok]
+        self.kind[e, slots] = np.broadcast_to(kind, envs.shape)[ok]
+        self.alive[e, slots] = True
+        np.subtract.at(self.nfree, e, 1)
+
+    def _release(self, envs, slots):
+        """Free slots, in the given order per instance (EntityStore.release)."""
+        if not len(envs):
+            return
+        rank = _rank_in_group(envs)
+        self.free[envs, self.nfree[envs] + rank] = slots
+        self.alive[envs, slots] = False
+        self.kind[envs, slots] = -1
+        np.add.at(self.nfree, envs, 1)
+
+    def _of_kind(self, kind):
+        return self.alive & (self.kind == kind)
+
+    # ---- one GameScene.update for every instance ----
+    def _update(self, actions):
+        x, y, w, h = self.x, self.y, self.w, self.h
+        fire = (actions == 3) | (actions == 4) | (actions == 5)
+        left = (actions == 1) | (actions == 4)
+        right = (actions == 2) | (actions == 5)
+
+        # SPACE: a bullet from the top of the player (GameScene.event)
+        e = np.flatnonzero(fire)
+        self._spawn(e, BULLET, x[e, 0] + 15 - 2, y[e, 0] - 5, 5, 10, 0, -10)
+
+        # Player.update
+        x[:, 0] -= 5 * (left & (x[:, 0] > 0))
+        x[:, 0] += 5 * (right & (x[:, 0] + 30 < WIDTH))
+
+        # update_entities: move, bounce, alien fire, cull
+        x += self.vx * self.alive
+        y += self.vy * self.alive
+        m = self._of_kind(ALIEN) & ((x + w >= WIDTH) | (x <= 0))
+        self.vx[m] = -self.vx[m]
+        y[m] += 40
+        self._alien_fire()
+        dead = []
+        for kind in (BULLET, ALIEN_BULLET):
+            dead.append(np.nonzero(self._of_kind(kind) & ((y + h < 0) | (y > HEIGHT))))
+        self._release_in_order(dead)
+
+        self._bunker_hits()
+
+        # bullets against aliens: every alien goes to the first bullet (by slot) on it
+        self._bullets_vs_aliens()
+
+        # alien bullets against the player
+        px, py = x[:, :1], y[:, :1]
+        hit = self._of_kind(ALIEN_BULLET) & (px < x + w) & (x < px + 30) & (py < y + h) & (y < py + 30)
+        game_over = hit.any(axis=1)
+        self._release_in_order([np.nonzero(hit)])
+
+        # aliens reaching the player
+        aliens = self._of_kind(ALIEN)
+        lowest = np.where(aliens, y + h, -1).max(axis=1)
+        game_over |= aliens.any(axis=1) & (lowest >= y[:, 0])
+        return game_over
+
+    def _alien_fire(self):
+        """Each alien fires with probability 1/300, drawing from its instance's store.rng stream."""
+        a = slice(1, ALIENS + 1)
+        aliens = self.alive[:, a] & (self.kind[:, a] == ALIEN)
+        for e in np.flatnonzero(self.cursor + ALIENS > RANDOM_BLOCK).tolist():
+            rest = self.randoms[e, self.cursor[e]:]
+            self.randoms[e] = np.concatenate([rest, self.rngs[e].random(RANDOM_BLOCK - len(rest))])
+            self.cursor[e] = 0
+        order = np.cumsum(aliens, axis=1) - 1
+        u = np.take_along_axis(self.randoms, self.cursor[:, None] + np.maximum(order, 0), 1)
+        self.cursor += aliens.sum(axis=1)
+        env, col = np.nonzero(aliens & (u < 1 / 300))
+        s = col + 1
+        self._spawn(env, ALIEN_BULLET, self.x[env, s] + 15 - 2, self.y[env, s] + 30 - 5, 5, 10, 0, 5)
+
+    def _release_in_order(self, groups):
+        """Release several (env, slot) groups, keeping group order within each instance."""
+        envs = np.concatenate([g[0] for g in groups])
+        slots = np.concatenate([g[1] for g in groups])
+        order = np.argsort(envs, kind="stable")
+        self._release(envs[order], slots[order])
+
+    def _bunker_hits(self):
+        """bunker_hits(): bullets chip craters, aliens wear bunkers away."""
+        x, y, w, h = self.x, self.y, self.w, self.h
+        bh, bw = BUNKERS.shape[1:]
+        bullets = self.alive & ((self.kind == BULLET) | (self.kind == ALIEN_BULLET))
+        in_band = bullets & (y < BUNKER_Y + bh) & (y + h > BUNKER_Y)
+        env, slot = np.nonzero(in_band)
+        if len(env):
+            bx = x[env, slot]
+            # which bunker the bullet's rect overlaps, if any (they are far apart)
+            over = (bx[:, None] < BUNKER_LEFT + bw) & (bx[:, None] + 5 > BUNKER_LEFT)
+            keep = over.any(axis=1)
+            env, slot, bunker = env[keep], slot[keep], over[keep].argmax(axis=1)
+        if len(env):
+            # bullets of one bunker are tested in slot order, each after the craters before it
+            key = (env * len(BUNKER_X) + bunker) * CAP + slot
+            order = np.argsort(key)
+            env, slot, bunker = env[order], slot[order], bunker[order]
+            rank = _rank_in_group(env * len(BUNKER_X) + bunker)
+            dead = np.zeros(len(env), bool)
+            dy = np.arange(10)[:, None]
+            dx = np.arange(5)[None, :]
+            for k in range(rank.max() + 1):
+                r = np.flatnonzero(rank == k)
+                e, b = env[r], bunker[r]
+                lx = x[e, slot[r]] - BUNKER_LEFT[b]
+                ly = y[e, slot[r]] - BUNKER_Y
+                cy, cx = np.broadcast_arrays(ly[:, None, None] + dy, lx[:, None, None] + dx)
+                valid = (cy >= 0) & (cy < bh) & (cx >= 0) & (cx < bw)
+                bits = self.bunkers[e[:, None, None], b[:, None, None], np.clip(cy, 0, bh - 1),
+                                    np.clip(cx, 0, bw - 1)] & valid
+                hit = bits.any(axis=(1, 2))
+                # Mask.overlap's first point: 64 px column stripes, then rows, then columns
+                rank_key = np.where(bits, (cx // 64) * 1 << 20 | cy << 10 | cx, 1 << 30).reshape(len(r), -1)
+                first = rank_key.argmin(axis=1)
+                first = first[:, None]
+                px = np.take_along_axis(cx.reshape(len(r), -1), first, 1)[:, 0]
+                py = np.take_along_axis(cy.reshape(len(r), -1), first, 1)[:, 0]
+                r, e, b, px, py = r[hit], e[hit], b[hit], px[hit], py[hit]
+                dead[r] = True
+                self._erase(e, b, px - CRATER_R, py - CRATER_R, CRATER_BITS)
+            env, slot = env[dead], slot[dead]
+            self._release(env, slot)
+
+        # aliens on a bunker erase a 30x30 block of it
+        aliens = self._of_kind(ALIEN) & (y < BUNKER_Y + bh) & (y + h > BUNKER_Y)
+        for e, s in zip(*np.nonzero(aliens)):
+            for b in np.flatnonzero((x[e, s] < BUNKER_LEFT + bw) & (x[e, s] + 30 > BUNKER_LEFT)):
+                lx, ly = x[e, s] - BUNKER_LEFT[b], y[e, s] - BUNKER_Y
+                self.bunkers[e, b, max(ly, 0):max(ly + 30, 0), max(lx, 0):max(lx + 30, 0)] = False
+
+    def _erase(self, env, bunker, lx, ly, bits):
+        """Mask.erase of `bits` at (lx, ly) in bunker coordinates, for many bunkers at once."""
+        bh, bw = BUNKERS.shape[1:]
+        ys, xs = np.nonzero(bits)
+        cy = ly[:, None] + ys
+        cx = lx[:, None] + xs
+        valid = (cy >= 0) & (cy < bh) & (cx >= 0) & (cx < bw)
+        k = np.nonzero(valid)
+        self.bunkers[env[k[0]], bunker[k[0]], cy[k], cx[k]] = False
+
+    def _bullets_vs_aliens(self):
+        """EntityStore.collide(BULLET, ALIEN) for every instance."""
+        x, y, w, h = self.x, self.y, self.w, self.h
+        a = slice(1, ALIENS + 1)
+        aliens = self.alive[:, a] & (self.kind[:, a] == ALIEN)
+        top = np.where(aliens, y[:, a], 1 << 20).min(axis=1)
+        bottom = np.where(aliens, y[:, a] + 30, -(1 << 20)).max(axis=1)
+        near = self._of_kind(BULLET) & (y < bottom[:, None]) & (y + h > top[:, None])
+        env, slot = np.nonzero(near)
+        if not len(env):
+            return
+        bx, by = x[env, slot, None], y[env, slot, None]
+        ax, ay = x[env, a], y[env, a]
+        hit = (bx < ax + 30) & (ax < bx + 5) & (by < ay + 30) & (ay < by + 10) & aliens[env]
+        # first bullet (lowest slot) per alien within each instance
+        starts = np.flatnonzero(np.r_[True, env[1:] != env[:-1]])
+        first = np.minimum.reduceat(np.where(hit, slot[:, None], CAP), starts, axis=0)
+        group_env = env[starts]
+        claimed = first < CAP
+        got = claimed.any(axis=1)
+        self.score[group_env[got]] += 10
+
+        dead_b = np.zeros((self.num_envs, CAP), bool)
+        g, j = np.nonzero(claimed)
+        dead_b[group_env[g], first[g, j]] = True
+        dead_a = np.zeros((self.num_envs, CAP), bool)
+        dead_a[group_env[g], j + 1] = True
+        self._release_in_order([np.nonzero(dead_b), np.nonzero(dead_a)])
+
+
+def _rank_in_group(groups):
+    """For each entry, how many earlier entries have the same value."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.r_[0, np.flatnonzero(sorted_groups[1:] != sorted_groups[:-1]) + 1]
+    counts = np.diff(np.r_[starts, len(groups)])
+    rank_sorted = np.arange(len(groups)) - np.repeat(starts, counts)
+    rank = np.empty_like(rank_sorted)
+    rank[order] = rank_sorted
+    return rank
+
+
+def check(steps=3000, seed=7):
+    """Play Invaders02.GameScene and a 1-instance env with the same random inputs; compare each step."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    Invaders02.KEEP_SCORES = False
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    env = InvadersVecEnv(1, seed=seed)
+    env.reset()
+
+    class Loop:
+        keys = None
+
+    def new_scene():
+        scene = Invaders02.GameScene(screen)
+        scene.loop = Loop()
+        scene.store.rng = np.random.default_rng(int(env.seeds[0]))
+        scene.game_started = True
+        return scene
+
+    scene = new_scene()
+    actions = np.random.default_rng(seed).integers(0, len(ACTIONS), steps)
+    keys = {pygame.K_LEFT: False, pygame.K_RIGHT: False}
+    games = 0
+    for t, action in enumerate(actions.tolist()):
+        if action in (3, 4, 5):
+            scene.event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        keys[pygame.K_LEFT] = action in (1, 4)
+        keys[pygame.K_RIGHT] = action in (2, 5)
+        scene.loop.keys = keys
+        scene.update(16)
+        _, reward, done, info = env.step([action])
+
+        ended = scene.game_over or scene.game_clear
+        if ended != bool(done[0]):
+            print(f"step {t}: only one of them ended")
+            return t
+        if ended:
+            # the env has already started its next game; compare how this one finished
+            if scene.score != info["final_score"][0]:
+                print(f"step {t}: final score {scene.score} != {info['final_score'][0]}")
+                return t
+            games += 1
+            scene = new_scene()
+            continue
+        store = scene.store
+        n = min(store.capacity, CAP)
+        alive = store.alive[:n]
+        same = (np.array_equal(alive, env.alive[0, :n]) and not store.alive[n:].any()
+                and all(np.array_equal(getattr(store, k)[:n][alive], getattr(env, k)[0, :n][alive])
+                        for k in ("x", "y", "vx", "vy", "kind"))
+                and all(np.array_equal(_mask_array(bunker.mask), env.bunkers[0, b])
+                        for b, bunker in enumerate(scene.bunkers))
+                and scene.score == env.score[0])
+        if not same:
+            print(f"step {t}: env and Invaders02 differ")
+            return t
+    print(f"{steps} steps over {games + 1} games: env matches Invaders02 at every step")
+    return None
+
+
+def bench(sizes=(1, 16, 256, 1024, 4096), seconds=1.0):
+    print(f"{'envs':>6} {'batch steps/s':>14} {'env steps/s':>12}")
+    for n in sizes:
+        env = InvadersVecEnv(n, seed=1)
+        env.reset()
+        rng = np.random.default_rng(0)
+        steps = 0
+        start = perf_counter()
+        while perf_counter() - start < seconds:
+            env.step(rng.integers(0, len(ACTIONS), n))
+            steps += 1
+        took = perf_counter() - start
+        print(f"{n:>6} {steps / took:>14.0f} {steps * n / took:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched Invaders02 environment")
+    parser.add_argument("--bench", action="store_true", help="steps per second for growing batch sizes")
+    parser.add_argument("--check", action="store_true", help="compare against Invaders02.GameScene")
+    parser.add_argument("--steps", type=int, default=3000)
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(1 if check(args.steps) is not None else 0)
+    bench()
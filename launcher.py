@@ -0,0 +1,132 @@
+# launcher.py
+# One entry point for all the games.
+#
+# Pick a game with the number keys (or arrows + Enter). Each game module is
+# imported only when it is first picked and shares the pygame setup in
+# game_host.py, so switching games never restarts the process. Import time
+# and time to first frame are printed for every launch to catch regressions.
+
+import importlib
+import sys
+from time import perf_counter
+
+launch_started = perf_counter()
+
+import pygame
+
+import game_host
+
+WIDTH = 640
+HEIGHT = 420
+
+WHITE = (255, 255, 255)
+BLACK = (12, 12, 12)
+GRAY = (90, 90, 90)
+CYAN = (0, 200, 220)
+
+# (menu label, module name)
+GAMES = [
+    ("Space Invaders (auto fire)", "Invaders01"),
+    ("Space Invaders", "Invaders02"),
+    ("Othello", "Othello"),
+    ("Polished Pong", "PingPong"),
+    ("Pong multi-ball", "pong_multiball"),
+]
+
+
+def report(name, import_ms, cached):
+    """Startup report for one launch."""
+    first = game_host.first_frame_at
+    frame_ms = (first - game_host.started_at) * 1000.0 if first else float("nan")
+    note = " (already imported)" if cached else ""
+    line = f"{name}: import {import_ms:.1f} ms{note}, first frame {frame_ms:.1f} ms"
+    print("[startup] " + line, file=sys.stderr)
+    return line
+
+
+def run_game(module_name):
+    """Import (first time only) and run a game's main(). Returns the report line."""
+    game_host.start_clock()
+    cached = module_name in sys.modules
+    t0 = perf_counter()
+    module = importlib.import_module(module_name)
+    import_ms = (perf_counter() - t0) * 1000.0
+    try:
+        module.main()
+    except SystemExit:
+        # a game may still bail out the old way; stay in the launcher
+        pass
+    return report(module_name, import_ms, cached)
+
+
+def draw_menu(screen, selected, last_report):
+    title_font = game_host.font(56)
+    item_font = game_host.font(34)
+    small_font = game_host.font(22)
+
+    screen.fill(BLACK)
+    title = title_font.render("MINI GAMES", True, WHITE)
+    screen.blit(title, title.get_rect(center=(WIDTH // 2, 60)))
+    for n, (label, _) in enumerate(GAMES):
+        color = CYAN if n == selected else WHITE
+        text = item_font.render(f"{n + 1}. {label}", True, color)
+        screen.blit(text, (80, 130 + n * 50))
+    hint = small_font.render(f"1-{len(GAMES)} or UP/DOWN + Enter to play • ESC to quit", True, GRAY)
+    screen.blit(hint, hint.get_rect(center=(WIDTH // 2, HEIGHT - 50)))
+    if last_report:
+        text = small_font.render(last_report, True, GRAY)
+        screen.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT - 22)))
+    game_host.present()
+
+
+def main():
+    game_host.start_clock()
+    game_host.started_at = launch_started
+    selected = 0
+    last_report = ""
+    redraw = True
+    first = True
+    clock = pygame.time.Clock()
+
+    while True:
+        if redraw:
+            screen = game_host.open_window((WIDTH, HEIGHT), "Mini Games")
+            draw_menu(screen, selected, last_report)
+            redraw = False
+            if first:
+                report("launcher", 0.0, False)
+                first = False
+
+        # nothing moves in the menu: sleep until something happens
+        ev = pygame.event.wait()
+        choice = None
+        if ev.type == pygame.QUIT:
+            return
+        if ev.type == pygame.KEYDOWN:
+            if ev.key == pygame.K_ESCAPE:
+                return
+            if pygame.K_1 <= ev.key < pygame.K_1 + len(GAMES):
+                choice = ev.key - pygame.K_1
+            elif ev.key == pygame.K_UP:
+                selected = (selected - 1) % len(GAMES)
+                redraw = True
+            elif ev.key == pygame.K_DOWN:
+                selected = (selected + 1) % len(GAMES)
+                redraw = True
+            elif ev.key in (pygame.K_RETURN, pygame.K_SPACE):
+                choice = selected
+        elif ev.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            redraw = True
+
+        if choice is not None:
+            selected = choice
+            last_report = run_game(GAMES[choice][1])
+            pygame.event.clear()
+            redraw = True
+        clock.tick(60)
+
+
+if __name__ == "__main__":
+    main()
+    pygame.quit()
+    sys.exit()
@@ -0,0 +1,163 @@
+# particles.py
+# Array-backed particles for explosions, hits and trails.
+#
+#   particles = ParticleSystem((800, 600), bg_color)
+#   particles.burst(xs, ys, 12, RED)      # 12 sparks around every (x, y)
+#   particles.update(dt_ms)               # once per update step
+#   renderer.render(sprites, particles)   # DirtyRenderer draws and clears them
+#
+# Every particle is a slot in preallocated numpy arrays; free slots sit on
+# a stack, so bursts and deaths are slice assignments and no Python object
+# is made per particle. Drawing writes pixels straight into the surface
+# through surfarray, colored by a precomputed fade-to-background table,
+# and reports which TILE x TILE tiles it touched so a dirty-rect renderer
+# only clears and updates those.
+
+import math
+
+import numpy as np
+import pygame
+
+SHADES = 16   # fade steps from full color to the background
+TILE = 64     # granularity of the rects draw() reports
+
+
+class ParticleSystem:
+    def __init__(self, size, bg_color, capacity=16384, dot=2, gravity=0.0, drag=0.0, seed=None):
+        """
+        size: (width, height) of the surface they are drawn on
+        dot: particles are dot x dot pixels
+        gravity: px/ms^2 added to vy, drag: fraction of speed lost per ms
+        """
+        self.width, self.height = size
+        self.bg_color = bg_color
+        self.capacity = capacity
+        self.dot = dot
+        self.gravity = gravity
+        self.drag = drag
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)   # px per ms
+        self.vy = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.float32)  # ms left
+        self.ttl = np.ones(capacity, np.float32)    # ms it started with
+        self.color = np.zeros(capacity, np.uint8)   # index into self.colors
+        self.alive = np.zeros(capacity, bool)
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.nfree = capacity
+        self.dropped = 0
+
+        self.colors = []
+        self._mapped = None   # (color, shade) -> pixel value for the last surface format
+        self._mapped_for = None
+        self._cols = (self.width + TILE - 1) // TILE
+        self._tiles = self._cols * ((self.height + TILE - 1) // TILE)
+
+    def __len__(self):
+        return self.capacity - self.nfree
+
+    def color_id(self, color):
+        color = tuple(color[:3])
+        if color not in self.colors:
+            self.colors.append(color)
+            self._mapped = None
+        return self.colors.index(color)
+
+    def burst(self, x, y, count, color, speed=(0.05, 0.3), life=(250, 700), angle=0.0, spread=2 * math.pi):
+        """
+        count particles from each of the points x, y (scalars or arrays), flying
+        off within `spread` radians around `angle` at a random speed in px/ms.
+        When the arrays are full the rest are dropped and counted.
+        """
+        x = np.atleast_1d(np.asarray(x, np.float32))
+        y = np.atleast_1d(np.asarray(y, np.float32))
+        n = len(x) * count
+        if n > self.nfree:
+            self.dropped += n - self.nfree
+            n = self.nfree
+        if not n:
+            return
+        slots = self.free[self.nfree - n:self.nfree]
+        self.nfree -= n
+        rng = self.rng
+        a = angle + rng.uniform(-spread / 2, spread / 2, n)
+        v = rng.uniform(speed[0], speed[1], n)
+        self.x[slots] = np.repeat(x, count)[:n]
+        self.y[slots] = np.repeat(y, count)[:n]
+        self.vx[slots] = np.cos(a) * v
+        self.vy[slots] = np.sin(a) * v
+        self.life[slots] = self.ttl[slots] = rng.uniform(life[0], life[1], n)
+        self.color[slots] = self.color_id(color)
+        self.alive[slots] = True
+
+    def trail(self, x, y, color, life=(120, 220)):
+        """One slow particle left behind at x, y."""
+        self.burst(x, y, 1, color, speed=(0.0, 0.02), life=life)
+
+    def update(self, dt_ms):
+        """Move every particle and free the ones that burned out or left the surface."""
+        if len(self) == 0:
+            return
+        alive = self.alive
+        if self.gravity:
+            self.vy += self.gravity * dt_ms
+        if self.drag:
+            keep = max(0.0, 1.0 - self.drag * dt_ms)
+            self.vx *= keep
+            self.vy *= keep
+        self.x += self.vx * dt_ms
+        self.y += self.vy * dt_ms
+        self.life -= dt_ms
+        dead = alive & ((self.life <= 0) | (self.x < 0) | (self.x >= self.width - self.dot) |
+                        (self.y < 0) | (self.y >= self.height - self.dot))
+        dead = np.flatnonzero(dead)
+        if len(dead):
+            alive[dead] = False
+            self.free[self.nfree:self.nfree + len(dead)] = dead
+            self.nfree += len(dead)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.nfree = self.capacity
+
+    def _shades(self, surface):
+        fmt = (surface.get_bitsize(), surface.get_masks())
+        if self._mapped is None or self._mapped_for != fmt:
+            bg = self.bg_color
+            table = np.zeros((max(1, len(self.colors)), SHADES), np.uint32)
+            for c, color in enumerate(self.colors):
+                for s in range(SHADES):
+                    t = (s + 1) / SHADES
+                    table[c, s] = surface.map_rgb([round(bg[k] + (color[k] - bg[k]) * t) for k in range(3)])
+            self._mapped = table
+            self._mapped_for = fmt
+        return self._mapped
+
+    def draw(self, surface):
+        """Write every live particle into surface. Returns the tile rects that were drawn on."""
+        live = np.flatnonzero(self.alive)
+        if not len(live):
+            return []
+        xi = self.x[live].astype(np.int32)
+        yi = self.y[live].astype(np.int32)
+        # bursts can start right on the edge, before update() culls them
+        np.clip(xi, 0, self.width - self.dot, out=xi)
+        np.clip(yi, 0, self.height - self.dot, out=yi)
+        shade = (self.life[live] / self.ttl[live] * SHADES).astype(np.int32)
+        np.clip(shade, 0, SHADES - 1, out=shade)
+        pixel = self._shades(surface)[self.color[live], shade]
+
+        pix = pygame.surfarray.pixels2d(surface)
+        for dx in range(self.dot):
+            for dy in range(self.dot):
+                pix[xi + dx, yi + dy] = pixel
+        del pix  # unlock the surface
+
+        tiles = np.flatnonzero(np.bincount((yi // TILE) * self._cols + xi // TILE, minlength=self._tiles))
+        rects = []
+        for t in tiles.tolist():
+            rects.append(pygame.Rect((t % self._cols) * TILE, (t // self._cols) * TILE, TILE + self.dot, TILE + self.dot))
+        return rects
@@ -0,0 +1,268 @@
+# pong_multiball.py
+# Polished Pong with lots of balls at once.
+#
+#   python pong_multiball.py 200          play with 200 balls (UP/DOWN doubles / halves them)
+#   python pong_multiball.py --bench      frame time vs ball count, numpy vs one Ball sprite each
+#
+# All balls live in one set of numpy arrays and move in a single batched
+# step: walls and paddles are handled with masks over the whole array
+# instead of a Ball.update() / paddle_hit_ball() call per ball. Bounce
+# angles and the speed-up per hit follow the same rules as PingPong.py.
+# Player 1 is W / S; the right paddle follows whichever ball reaches it next.
+# Runs on GameLoop like the other games, so F3 / F4 profile it too.
+
+import argparse
+import math
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+import game_host
+from frame_profiler import FrameProfiler
+from game_loop import GameLoop, Scene
+from PingPong import (Ball, Paddle, bake_court, paddle_hit_ball, BALL_MAX_SPEED, BALL_SIZE, BALL_SPEED,
+                      BALL_SPEEDUP, FPS, PADDLE_MARGIN, PADDLE_SPEED, SCREEN_WIDTH, SCREEN_HEIGHT,
+                      WHITE, CYAN, MAGENTA, GRAY)
+
+MAX_ANGLE = 3 * math.pi / 8  # same as bounce_off_paddle
+BENCH_COUNTS = (1, 10, 50, 100, 200, 500, 1000)
+BENCH_FRAMES = 300
+
+# F3 shows per-phase frame times, F4 captures a cProfile (see frame_profiler.py)
+profiler = FrameProfiler("pong_multiball")
+
+
+class BallArray:
+    """Position, velocity and speed of every ball, one array each."""
+
+    def __init__(self, count, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.vx = np.zeros(0)
+        self.vy = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.resize(count)
+
+    def __len__(self):
+        return len(self.x)
+
+    def resize(self, count):
+        """Drop balls off the end or serve new ones from the centre."""
+        old = len(self.x)
+        if count <= old:
+            for name in ("x", "y", "vx", "vy", "speed"):
+                setattr(self, name, getattr(self, name)[:count])
+            return
+        extra = count - old
+        for name in ("x", "y", "vx", "vy", "speed"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra)]))
+        self.serve(np.arange(old, count), self.rng.choice([-1.0, 1.0], extra))
+
+    def serve(self, idx, direction):
+        """Put balls idx back in the middle heading for `direction` (like Ball.reset)."""
+        angle = self.rng.uniform(-0.25 * math.pi, 0.25 * math.pi, len(idx))
+        self.x[idx] = SCREEN_WIDTH / 2
+        self.y[idx] = SCREEN_HEIGHT / 2
+        self.speed[idx] = BALL_SPEED
+        self.vx[idx] = direction * BALL_SPEED * np.cos(angle)
+        self.vy[idx] = BALL_SPEED * np.sin(angle)
+
+    def step(self, paddle1, paddle2):
+        """Move every ball one frame. Returns (points for player 1, points for player 2)."""
+        half = BALL_SIZE / 2
+        nx = self.x + self.vx
+        ny = self.y + self.vy
+
+        # paddles: balls whose path crosses the paddle face inside its span
+        for paddle, face, sign in ((paddle1, paddle1.rect.right + half, 1),
+                                   (paddle2, paddle2.rect.left - half, -1)):
+            toward = self.vx * sign < 0
+            crossing = toward & ((self.x - face) * sign >= 0) & ((nx - face) * sign < 0)
+            if not crossing.any():
+                continue
+            idx = np.flatnonzero(crossing)
+            t = (face - self.x[idx]) / self.vx[idx]
+            y_hit = self.y[idx] + self.vy[idx] * t
+            on_paddle = (y_hit >= paddle.rect.top - half) & (y_hit <= paddle.rect.bottom + half)
+            idx, t, y_hit = idx[on_paddle], t[on_paddle], y_hit[on_paddle]
+
+            rel_y = np.clip((y_hit - paddle.rect.centery) / (paddle.rect.height / 2), -1, 1)
+            speed = np.clip(self.speed[idx] * BALL_SPEEDUP, 3.0, BALL_MAX_SPEED)
+            angle = rel_y * MAX_ANGLE
+            self.speed[idx] = speed
+            self.vx[idx] = sign * speed * np.cos(angle)
+            self.vy[idx] = speed * np.sin(angle)
+            # the rest of the frame is spent moving away from the paddle
+            nx[idx] = face + self.vx[idx] * (1 - t)
+            ny[idx] = y_hit + self.vy[idx] * (1 - t)
+
+        # top / bottom walls
+        top = ny < half
+        ny[top] = 2 * half - ny[top]
+        bottom = ny > SCREEN_HEIGHT - half
+        ny[bottom] = 2 * (SCREEN_HEIGHT - half) - ny[bottom]
+        self.vy[top | bottom] *= -1
+
+        self.x = nx
+        self.y = np.clip(ny, half, SCREEN_HEIGHT - half)
+
+        # points: the ball is served again towards whoever lost it
+        out_left = np.flatnonzero(self.x - half <= 0)
+        out_right = np.flatnonzero(self.x + half >= SCREEN_WIDTH)
+        if len(out_left):
+            self.serve(out_left, -1.0)
+        if len(out_right):
+            self.serve(out_right, 1.0)
+        return len(out_right), len(out_left)
+
+    def next_arrival(self, paddle):
+        """y of the ball that will reach `paddle` first, or None if none are coming."""
+        coming = self.vx > 0 if paddle.rect.centerx > SCREEN_WIDTH / 2 else self.vx < 0
+        if not coming.any():
+            return None
+        idx = np.flatnonzero(coming)
+        t = np.abs((paddle.rect.centerx - self.x[idx]) / self.vx[idx])
+        return float(self.y[idx[np.argmin(t)]])
+
+    def positions(self):
+        """Top-left corners as a list for Surface.blits()."""
+        half = BALL_SIZE // 2
+        return zip((self.x - half).astype(np.int32).tolist(), (self.y - half).astype(np.int32).tolist())
+
+
+class SpriteBalls:
+    """The same game with one Ball sprite each, as PingPong.main() runs it. Used by --bench."""
+
+    def __init__(self, count, paddles):
+        self.balls = []
+        for _ in range(count):
+            ball = Ball(WHITE)
+            ball.paddles = paddles
+            self.balls.append(ball)
+
+    def step(self, paddle1, paddle2):
+        points1 = points2 = 0
+        for ball in self.balls:
+            ball.update()
+            if not ball.hits:
+                paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2)
+            if ball.rect.left <= 0:
+                points2 += 1
+                ball.reset(direction=-1)
+            elif ball.rect.right >= SCREEN_WIDTH:
+                points1 += 1
+                ball.reset(direction=1)
+        return points1, points2
+
+
+def follow(paddle, y):
+    if y is None:
+        y = SCREEN_HEIGHT / 2
+    if y < paddle.rect.centery - 6:
+        paddle.move_up()
+    elif y > paddle.rect.centery + 6:
+        paddle.move_down()
+
+
+def bench(counts=BENCH_COUNTS, frames=BENCH_FRAMES):
+    """Simulate `frames` frames for each ball count with both paths; print ms per frame."""
+    image = Ball(WHITE).image
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    print(f"{'balls':>6} {'sprites ms':>11} {'numpy ms':>9} {'speedup':>8} {'draw ms':>8}")
+    for count in counts:
+        times = []
+        for make in (lambda p: SpriteBalls(count, p), lambda p: BallArray(count, seed=count)):
+            paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+            paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+            balls = make((paddle1, paddle2))
+            start = perf_counter()
+            for _ in range(frames):
+                balls.step(paddle1, paddle2)
+            times.append((perf_counter() - start) * 1000.0 / frames)
+
+        start = perf_counter()
+        for _ in range(frames):
+            screen.blits([(image, pos) for pos in balls.positions()], doreturn=False)
+        draw_ms = (perf_counter() - start) * 1000.0 / frames
+        print(f"{count:>6} {times[0]:>11.3f} {times[1]:>9.3f} {times[0] / times[1]:>7.1f}x {draw_ms:>8.3f}")
+
+
+class MultiballScene(Scene):
+    def __init__(self, screen, count):
+        self.screen = screen
+        self.court = bake_court()
+        self.big_font = game_host.font(56)
+        self.hud_font = game_host.font(24)
+        self.image = Ball(WHITE).image
+
+        self.paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+        self.paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA, PADDLE_SPEED + 2)
+        self.paddles = pygame.sprite.Group(self.paddle1, self.paddle2)
+        self.balls = BallArray(count)
+        self.score1 = self.score2 = 0
+        self.sim_ms = self.draw_ms = 0.0
+
+    def event(self, ev):
+        if ev.type != pygame.KEYDOWN:
+            return
+        balls = self.balls
+        if ev.key == pygame.K_ESCAPE:
+            self.loop.stop()
+        elif ev.key == pygame.K_UP:
+            balls.resize(min(len(balls) * 2, 5000))
+        elif ev.key == pygame.K_DOWN:
+            balls.resize(max(len(balls) // 2, 1))
+
+    def update(self, dt_ms):
+        keys = self.loop.keys
+        if keys[pygame.K_w]:
+            self.paddle1.move_up()
+        if keys[pygame.K_s]:
+            self.paddle1.move_down()
+        follow(self.paddle2, self.balls.next_arrival(self.paddle2))
+
+        t0 = perf_counter()
+        points1, points2 = self.balls.step(self.paddle1, self.paddle2)
+        self.score1 += points1
+        self.score2 += points2
+        # smoothed so the numbers are readable
+        self.sim_ms += ((perf_counter() - t0) * 1000.0 - self.sim_ms) * 0.05
+        profiler.mark("update")
+
+    def draw(self, alpha):
+        screen = self.screen
+        t0 = perf_counter()
+        screen.blit(self.court, (0, 0))
+        self.paddles.draw(screen)
+        screen.blits([(self.image, pos) for pos in self.balls.positions()], doreturn=False)
+        for score, color, x in ((self.score1, CYAN, SCREEN_WIDTH // 4),
+                                (self.score2, MAGENTA, SCREEN_WIDTH * 3 // 4)):
+            surf = self.big_font.render(str(score), True, color)
+            screen.blit(surf, surf.get_rect(midtop=(x, 18)))
+        self.draw_ms += ((perf_counter() - t0) * 1000.0 - self.draw_ms) * 0.05
+        hud = (f"{len(self.balls)} balls (UP/DOWN)  sim {self.sim_ms:.2f} ms  draw {self.draw_ms:.2f} ms  "
+               f"{self.loop.clock.get_fps():.0f} fps")
+        screen.blit(self.hud_font.render(hud, True, GRAY), (20, SCREEN_HEIGHT - 30))
+        profiler.draw(screen, self.hud_font, WHITE)
+        return None
+
+
+def main(count=100):
+    screen = game_host.open_window((SCREEN_WIDTH, SCREEN_HEIGHT), "Polished Pong - multi-ball")
+    GameLoop(profiler, fps=FPS).run(MultiballScene(screen, count))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pong with many balls")
+    parser.add_argument("balls", type=int, nargs="?", default=100)
+    parser.add_argument("--bench", action="store_true", help="compare frame time against one sprite per ball")
+    args = parser.parse_args()
+    if args.bench:
+        bench()
+    else:
+        main(args.balls)
+    pygame.quit()
+    sys.exit()
@@ -0,0 +1,399 @@
+# pong_net.py
+# Two-player Polished Pong over UDP with client-side prediction and rollback.
+#
+#   python pong_net.py host 5555             player 1 (left paddle)
+#   python pong_net.py join 5555 127.0.0.1   player 2 (right paddle)
+#
+# Both peers run the same fixed-step simulation of Ball / Paddle from
+# PingPong.py. Local input is applied at once; the remote paddle is
+# predicted to keep its last known input. When the real remote input for
+# an older frame arrives and differs, the game state is restored from that
+# frame's snapshot and re-simulated up to now. Snapshots are small packed
+# structs kept in a ring buffer. The HUD shows RTT, rollback depth and how
+# many frames were re-simulated.
+#
+# Every packet carries the last frame up to which we have all of the peer's
+# inputs, and every input of ours the peer hasn't confirmed that way, so a
+# lost packet is made up by the next one that arrives. Neither side runs
+# more than MAX_ROLLBACK frames past the oldest remote input it is still
+# missing, so every prediction can be corrected; a peer that sends nothing
+# for PEER_TIMEOUT seconds is given up on.
+
+import argparse
+import math
+import socket
+import struct
+import sys
+import zlib
+from time import perf_counter
+
+import pygame
+
+import game_host
+from PingPong import (Ball, Paddle, paddle_hit_ball, BALL_SPEED, FPS, PADDLE_MARGIN, SCREEN_WIDTH,
+                      SCREEN_HEIGHT, SERVE_DELAY_MS, WIN_SCORE, WHITE, BLACK, CYAN, MAGENTA, GRAY)
+
+# inputs
+UP = 1
+DOWN = 2
+
+MAX_ROLLBACK = 16        # frames we may run ahead of the oldest remote input still missing
+MAX_INPUTS = 255         # per packet (the count is one byte)
+PEER_TIMEOUT = 3.0       # seconds without a packet before the peer counts as gone
+SERVE_FRAMES = SERVE_DELAY_MS * FPS // 1000
+
+# packets
+HELLO = 0
+WELCOME = 1
+INPUT = 2
+HEADER = struct.Struct("<B")
+WELCOME_MSG = struct.Struct("<BI")
+INPUT_MSG = struct.Struct("<BiiddB")  # type, confirmed frame, last frame, send time, echoed time, count
+
+# snapshot: ball x, y, vx, vy, speed, paddle ys, scores, serve timer/dir, rng, winner
+SNAPSHOT = struct.Struct("<dddddhhBBHbIB")
+
+
+class PongSim:
+    """Deterministic fixed-step Pong. Same seed + same inputs = same game."""
+
+    def __init__(self, seed):
+        self.paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+        self.paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+        self.ball = Ball(WHITE)
+        self.ball.paddles = (self.paddle1, self.paddle2)
+        self.sprites = pygame.sprite.Group(self.paddle1, self.paddle2, self.ball)
+        self.rng = seed & 0xFFFFFFFF
+        self.score1 = 0
+        self.score2 = 0
+        self.winner = 0
+        self.serve_dir = 1 if self._random() < 0.5 else -1
+        self._hold_ball()
+
+    def _random(self):
+        # small LCG so the serve angle is part of the saved state
+        self.rng = (self.rng * 1664525 + 1013904223) & 0xFFFFFFFF
+        return self.rng / 2 ** 32
+
+    def _hold_ball(self):
+        ball = self.ball
+        ball.vx = ball.vy = 0.0
+        ball.speed = BALL_SPEED
+        ball.fx, ball.fy = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
+        ball.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.serve_timer = SERVE_FRAMES
+
+    def step(self, in1, in2):
+        if self.winner:
+            return
+        for paddle, bits in ((self.paddle1, in1), (self.paddle2, in2)):
+            if bits & UP:
+                paddle.move_up()
+            if bits & DOWN:
+                paddle.move_down()
+
+        if self.serve_timer:
+            self.serve_timer -= 1
+            if not self.serve_timer:
+                ball = self.ball
+                angle = (self._random() - 0.5) * 0.5 * math.pi
+                ball.vx = self.serve_dir * BALL_SPEED * math.cos(angle)
+                ball.vy = BALL_SPEED * math.sin(angle)
+            return
+
+        ball = self.ball
+        ball.update()
+        paddle_hit_ball(ball, self.paddle1) or paddle_hit_ball(ball, self.paddle2)
+
+        if ball.rect.left <= 0:
+            self.score2 += 1
+            self.serve_dir = -1
+        elif ball.rect.right >= SCREEN_WIDTH:
+            self.score1 += 1
+            self.serve_dir = 1
+        else:
+            return
+        if self.score1 >= WIN_SCORE:
+            self.winner = 1
+        elif self.score2 >= WIN_SCORE:
+            self.winner = 2
+        self._hold_ball()
+
+    def save(self):
+        b = self.ball
+        fx, fy = b.fx, b.fy
+        if b.rect.center != (round(fx), round(fy)):
+            # pushed out of a paddle this frame; Ball.update will start from the rect
+            fx, fy = b.rect.center
+        return SNAPSHOT.pack(fx, fy, b.vx, b.vy, b.speed,
+                             self.paddle1.rect.y, self.paddle2.rect.y,
+                             self.score1, self.score2, self.serve_timer, self.serve_dir,
+                             self.rng, self.winner)
+
+    def load(self, data):
+        b = self.ball
+        (b.fx, b.fy, b.vx, b.vy, b.speed, self.paddle1.rect.y, self.paddle2.rect.y,
+         self.score1, self.score2, self.serve_timer, self.serve_dir,
+         self.rng, self.winner) = SNAPSHOT.unpack(data)
+        b.rect.center = (round(b.fx), round(b.fy))
+
+
+class Session:
+    """UDP link plus the rollback bookkeeping for one peer."""
+
+    def __init__(self, sock, peer, me, seed):
+        self.sock = sock
+        self.peer = peer
+        self.me = me                      # 1 = left paddle, 2 = right paddle
+        self.sim = PongSim(seed)
+        self.frame = 0                    # next frame to simulate
+        self.local = {}                   # frame -> input bits
+        self.remote = {}
+        self.confirmed = -1               # we have every remote input up to this frame
+        self.acked = -1                   # ... and the peer has every one of ours up to this one
+        self.remote_last = -1             # newest remote frame we have
+        self.last_remote_bits = 0
+        self.predicted = {}               # frames simulated with a guessed remote input
+        self.snapshots = [None] * (MAX_ROLLBACK + 2)
+        self.peer_time = 0.0
+        self.heard = perf_counter()       # when the last packet from the peer arrived
+
+        # stats
+        self.rtt = 0.0
+        self.rollbacks = 0
+        self.rollback_depth = 0
+        self.max_rollback = 0
+        self.resimulated = 0
+
+    # ---- simulation ----
+
+    def _inputs(self, f):
+        mine = self.local.get(f, 0)
+        theirs = self.remote.get(f)
+        if theirs is None:
+            theirs = self.last_remote_bits
+            self.predicted[f] = theirs
+        else:
+            self.predicted.pop(f, None)
+        return (mine, theirs) if self.me == 1 else (theirs, mine)
+
+    def _simulate(self, f):
+        self.snapshots[f % len(self.snapshots)] = self.sim.save()
+        self.sim.step(*self._inputs(f))
+
+    def can_advance(self):
+        # the oldest missing remote input must stay within reach of a snapshot
+        return self.frame - self.confirmed <= MAX_ROLLBACK
+
+    def advance(self, bits):
+        self.local[self.frame] = bits
+        self._simulate(self.frame)
+        self.frame += 1
+        self._forget()
+
+    def _rollback(self, start):
+        depth = self.frame - start
+        if depth > len(self.snapshots):
+            raise RuntimeError(f"desync: the real input for frame {start} came {depth} frames late, "
+                               f"its snapshot is gone")
+        self.sim.load(self.snapshots[start % len(self.snapshots)])
+        for f in range(start, self.frame):
+            self._simulate(f)
+        self.rollbacks += 1
+        self.rollback_depth = depth
+        self.max_rollback = max(self.max_rollback, depth)
+        self.resimulated += depth
+
+    # ---- network ----
+
+    def send(self):
+        """Our confirmed frame and every input of ours the peer hasn't confirmed."""
+        first = self.acked + 1
+        count = min(self.frame - first, MAX_INPUTS)
+        bits = bytes(self.local[f] for f in range(first, first + count))
+        head = INPUT_MSG.pack(INPUT, self.confirmed, first + count - 1, perf_counter(), self.peer_time, count)
+        try:
+            self.sock.sendto(head + bits, self.peer)
+        except OSError:
+            pass
+
+    def receive(self):
+        mismatch = None
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            if data[0] != INPUT or len(data) < INPUT_MSG.size:
+                continue
+            _, acked, last, sent, echo, count = INPUT_MSG.unpack_from(data)
+            self.heard = perf_counter()
+            self.peer_time = sent
+            if echo:
+                self.rtt = (perf_counter() - echo) * 1000.0
+            self.acked = max(self.acked, acked)
+            bits = data[INPUT_MSG.size:INPUT_MSG.size + count]
+            for n, b in enumerate(bits):
+                f = last - count + 1 + n
+                if f <= self.confirmed or f in self.remote:
+                    continue
+                self.remote[f] = b
+                if f > self.remote_last:
+                    self.remote_last = f
+                    self.last_remote_bits = b
+                guess = self.predicted.pop(f, None)
+                if guess is not None and guess != b and (mismatch is None or f < mismatch):
+                    mismatch = f
+            self._confirm()
+        if mismatch is not None:
+            self._rollback(mismatch)
+
+    def _confirm(self):
+        """Move `confirmed` over the remote inputs that now follow it without a gap."""
+        while self.confirmed + 1 in self.remote:
+            self.confirmed += 1
+
+    def _forget(self):
+        """Drop inputs older than every snapshot, once they are confirmed both ways."""
+        old = self.frame - len(self.snapshots) - 1
+        for inputs, upto in ((self.local, min(old, self.acked)), (self.remote, min(old, self.confirmed))):
+            f = upto
+            while inputs.pop(f, None) is not None:
+                f -= 1
+
+    def peer_gone(self):
+        return perf_counter() - self.heard > PEER_TIMEOUT
+
+    def checksum(self):
+        return zlib.crc32(self.sim.save())
+
+
+def connect(mode, port, host):
+    """Handshake. Returns (socket, peer address, which paddle we are, seed)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if mode == "host":
+        sock.bind(("0.0.0.0", port))
+        print(f"waiting for a player on UDP port {port} ...", file=sys.stderr)
+        while True:
+            data, peer = sock.recvfrom(64)
+            if data and data[0] == HELLO:
+                break
+        seed = int(perf_counter() * 1e6) & 0xFFFFFFFF
+        for _ in range(5):
+            sock.sendto(WELCOME_MSG.pack(WELCOME, seed), peer)
+        me = 1
+    else:
+        sock.bind(("0.0.0.0", 0))
+        peer = (host, port)
+        sock.settimeout(0.2)
+        while True:
+            sock.sendto(HEADER.pack(HELLO), peer)
+            try:
+                data, _ = sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            if data and data[0] == WELCOME:
+                _, seed = WELCOME_MSG.unpack(data[:WELCOME_MSG.size])
+                break
+        me = 2
+    sock.setblocking(False)
+    return sock, peer, me, seed
+
+
+def read_input(keys):
+    bits = 0
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        bits |= UP
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        bits |= DOWN
+    return bits
+
+
+def bot_input(sim, me):
+    """Follow the ball, used for soak tests."""
+    paddle = sim.paddle1 if me == 1 else sim.paddle2
+    if sim.ball.rect.centery < paddle.rect.centery - 10:
+        return UP
+    if sim.ball.rect.centery > paddle.rect.centery + 10:
+        return DOWN
+    return 0
+
+
+def draw(screen, session, fonts):
+    big_font, hud_font = fonts
+    sim = session.sim
+    screen.fill(BLACK)
+    for y in range(0, SCREEN_HEIGHT, 22):
+        pygame.draw.rect(screen, GRAY, (SCREEN_WIDTH // 2 - 1, y + 6, 2, 12))
+    sim.sprites.draw(screen)
+    score1_text = big_font.render(str(sim.score1), True, CYAN)
+    score2_text = big_font.render(str(sim.score2), True, MAGENTA)
+    screen.blit(score1_text, (SCREEN_WIDTH // 4 - score1_text.get_width() // 2, 18))
+    screen.blit(score2_text, (SCREEN_WIDTH * 3 // 4 - score2_text.get_width() // 2, 18))
+    hud = hud_font.render(f"P{session.me} • RTT {session.rtt:.0f} ms • rollback {session.rollback_depth} "
+                          f"(max {session.max_rollback}) • resimulated {session.resimulated}", True, WHITE)
+    screen.blit(hud, (20, SCREEN_HEIGHT - 34))
+    if sim.winner:
+        text = big_font.render(f"PLAYER {sim.winner} WINS!", True, WHITE)
+        screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+    game_host.present()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Polished Pong over UDP")
+    parser.add_argument("mode", choices=("host", "join"))
+    parser.add_argument("port", type=int)
+    parser.add_argument("host", nargs="?", default="127.0.0.1")
+    parser.add_argument("--bot", action="store_true", help="let the computer play this side")
+    parser.add_argument("--frames", type=int, default=0, help="stop after this many frames")
+    args = parser.parse_args(argv)
+
+    sock, peer, me, seed = connect(args.mode, args.port, args.host)
+    session = Session(sock, peer, me, seed)
+    screen = game_host.open_window((SCREEN_WIDTH, SCREEN_HEIGHT), f"Polished Pong - Player {me}")
+    fonts = (game_host.font(56), game_host.font(28))
+    clock = pygame.time.Clock()
+
+    code = 0
+    running = True
+    while running:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT or (ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE):
+                running = False
+
+        try:
+            session.receive()
+        except RuntimeError as e:
+            # can't happen while both sides keep to MAX_ROLLBACK; if it does the games have split
+            print(f"[net] player {me}: {e}", file=sys.stderr)
+            code = 1
+            break
+        done = args.frames and session.frame >= args.frames
+        if not done and session.can_advance():
+            bits = bot_input(session.sim, me) if args.bot else read_input(pygame.key.get_pressed())
+            session.advance(bits)
+        session.send()
+        if done and session.confirmed >= args.frames - 1 and session.acked >= args.frames - 1:
+            running = False
+        if session.peer_gone():
+            # the peer quit, or its last inputs were all lost: stop rather than wait for them
+            print(f"[net] player {me}: nothing from the peer for {PEER_TIMEOUT:.0f}s, "
+                  f"{len(session.predicted)} inputs still unconfirmed", file=sys.stderr)
+            running = False
+
+        draw(screen, session, fonts)
+        clock.tick(FPS)
+
+    # let the peer see our last inputs
+    for _ in range(10):
+        session.send()
+    print(f"[net] player {me}: frames {session.frame} state {session.checksum():08x} "
+          f"rtt {session.rtt:.1f} ms rollbacks {session.rollbacks} max depth {session.max_rollback} "
+          f"resimulated {session.resimulated}", file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    code = main()
+    pygame.quit()
+    sys.exit(code)
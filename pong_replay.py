@@ -0,0 +1,429 @@
+# pong_replay.py
+# Frame-by-frame recordings of Polished Pong matches.
+#
+#   PONG_RECORD=match.pongr python PingPong.py    record every match you play
+#   python pong_replay.py play match.pongr         watch it (seek, scrub, speeds)
+#   python pong_replay.py check match.pongr        re-simulate and compare
+#   python pong_replay.py info match.pongr
+#   python pong_replay.py selftest                 record a scripted session with rematches, then check it
+#
+# Every simulated frame is one fixed-size 22 byte record (ball position
+# and velocity, paddles, scores, inputs, frame time), so frame n is at a
+# known offset and the player reads the memory-mapped file directly. Every
+# KEYFRAME_EVERY frames the full game state (including the AI and the seed
+# the match's random generator is reset to) goes into an index at the end of
+# the file; `check` restores each keyframe and re-runs the recorded inputs
+# through the real physics to make sure it lands on the same frames again.
+#
+# The frames and index are flushed together at each keyframe, so a crash
+# loses at most the last couple of seconds.
+
+import argparse
+import atexit
+import bisect
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+
+import pygame
+
+import game_host
+from PingPong import (Ball, Paddle, SimpleAI, bake_court, paddle_hit_ball, BALL_SIZE, FPS, PADDLE_MARGIN,
+                      PADDLE_WIDTH, PADDLE_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, CYAN,
+                      MAGENTA, GRAY)
+
+MAGIC = b"PONR"
+VERSION = 1
+KEYFRAME_EVERY = 120
+
+# mode, keyframe interval, AI paddle speed, win score, AI react ms, AI prediction strength
+HEADER = struct.Struct("<4sBBHBBHd")
+# ball x, y (rect center), vx, vy, paddle 1 / 2 centery, scores, inputs, flags, dt ms
+FRAME = struct.Struct("<hhffhhBBBBH")
+# frame, seed, ball fx, fy, vx, vy, speed, paddle ys, scores, serve dir,
+# AI timer, AI target, AI leg (vx, vy, set)
+KEYFRAME = struct.Struct("<IIdddddhhBBbIdddB")
+# frame count, keyframe count, marker
+FOOTER = struct.Struct("<II4s")
+END = b"PIDX"
+
+# inputs
+W = 1
+S = 2
+UP = 4
+DOWN = 8
+
+# flags
+SERVING = 1
+HIT = 2
+SCORED = 4
+
+SPEEDS = (0.25, 0.5, 1, 2, 4, 8)
+
+
+class PongRecorder:
+    """Writes one match. Call begin_frame() before the inputs and end_frame() after the physics."""
+
+    def __init__(self, path, mode, win_score, ai=None):
+        self.f = open(path, "wb")
+        params = (ai.paddle.speed, ai.react_ms, ai.prediction_strength) if ai else (0, 0, 0.0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, mode, KEYFRAME_EVERY, params[0], win_score,
+                                 params[1], params[2]))
+        self.frames = 0
+        self.written = 0
+        self.keyframes = []
+        self.pending = bytearray()
+        self.force_key = True
+        atexit.register(self.close)
+
+    def restart(self):
+        """The match state jumped (rematch): start the next frame with a keyframe."""
+        self.force_key = True
+
+    def begin_frame(self, ball, paddle1, paddle2, ai, score1, score2, serve_dir):
+        if not (self.force_key or self.frames % KEYFRAME_EVERY == 0):
+            return
+        self.force_key = False
+        # reseed the match's generator (ball.rng, shared with the AI) so the
+        # keyframe only has to carry 4 bytes of random state
+        seed = ball.rng.getrandbits(32)
+        ball.rng.seed(seed)
+        self.keyframes.append(save_state(self.frames, seed, ball, paddle1, paddle2, ai,
+                                         score1, score2, serve_dir))
+        self.flush()
+
+    def end_frame(self, ball, paddle1, paddle2, score1, score2, keys, dt_ms, serving=False, hit=False, scored=False):
+        flags = (SERVING if serving else 0) | (HIT if hit else 0) | (SCORED if scored else 0)
+        inputs = ((W if keys[pygame.K_w] else 0) | (S if keys[pygame.K_s] else 0)
+                  | (UP if keys[pygame.K_UP] else 0) | (DOWN if keys[pygame.K_DOWN] else 0))
+        self.pending += pack_frame(ball, paddle1, paddle2, score1, score2, inputs, flags, dt_ms)
+        self.frames += 1
+
+    def flush(self):
+        """Write the buffered frames, then the whole index and footer after them."""
+        if self.f is None:
+            return
+        self.f.seek(HEADER.size + self.written * FRAME.size)
+        self.f.write(self.pending)
+        self.written = self.frames
+        self.pending.clear()
+        self.f.write(b"".join(self.keyframes))
+        self.f.write(FOOTER.pack(self.frames, len(self.keyframes), END))
+        self.f.truncate()
+        self.f.flush()
+
+    def close(self):
+        if self.f is None:
+            return
+        self.flush()
+        self.f.close()
+        self.f = None
+        atexit.unregister(self.close)
+
+
+def pack_frame(ball, paddle1, paddle2, score1, score2, inputs, flags, dt_ms):
+    return FRAME.pack(ball.rect.centerx, ball.rect.centery, ball.vx, ball.vy,
+                      paddle1.rect.centery, paddle2.rect.centery, score1, score2,
+                      inputs, flags, min(dt_ms, 0xFFFF))
+
+
+def save_state(frame, seed, ball, paddle1, paddle2, ai, score1, score2, serve_dir):
+    fx, fy = ball.fx, ball.fy
+    if ball.rect.center != (round(fx), round(fy)):
+        # placed directly (serve, push-out): Ball.update will take the rect's position
+        fx, fy = ball.rect.center
+    timer, target, leg = (ai.reaction_timer, ai._target, ai._leg) if ai else (0, 0.0, None)
+    return KEYFRAME.pack(frame, seed, fx, fy, ball.vx, ball.vy, ball.speed,
+                         paddle1.rect.centery, paddle2.rect.centery, score1, score2, serve_dir,
+                         timer, target, *(leg or (0.0, 0.0)), leg is not None)
+
+
+class PongReplay:
+    """Read-only view of a recording; frames are unpacked straight from the mapped file."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.mode, self.keyframe_every, ai_speed, self.win_score,
+         ai_react, ai_strength) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Pong recording")
+        self.ai_params = (ai_speed, ai_react, ai_strength)
+        count, keys, end = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if end != END:
+            raise ValueError("recording has no index (still being written?)")
+        self.count = count
+        start = HEADER.size + count * FRAME.size
+        self.keyframes = [KEYFRAME.unpack_from(self.data, start + n * KEYFRAME.size) for n in range(keys)]
+        self.keyframe_frames = [k[0] for k in self.keyframes]
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, n):
+        return FRAME.unpack_from(self.data, HEADER.size + n * FRAME.size)
+
+    def frame_bytes(self, n):
+        offset = HEADER.size + n * FRAME.size
+        return self.data[offset:offset + FRAME.size]
+
+    def keyframe_before(self, n):
+        """Index of the last keyframe at or before frame n."""
+        return max(0, bisect.bisect_right(self.keyframe_frames, n) - 1)
+
+    def close(self):
+        self.data.close()
+        self._file.close()
+
+
+class Resim:
+    """The match objects from PingPong.py, set up from a keyframe."""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN)
+        self.paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+        self.rng = random.Random()
+        self.ball = Ball(WHITE, self.rng)
+        self.ball.paddles = (self.paddle1, self.paddle2)
+        self.ai = None
+        if replay.mode == 1:
+            self.ai = SimpleAI(self.paddle2, rng=self.rng)
+            self.ai.set_params(*replay.ai_params)
+
+    def load(self, key):
+        (frame, seed, fx, fy, vx, vy, speed, y1, y2, self.score1, self.score2, self.serve_dir,
+         timer, target, leg_vx, leg_vy, has_leg) = key
+        self.rng.seed(seed)
+        ball = self.ball
+        ball.fx, ball.fy, ball.vx, ball.vy, ball.speed = fx, fy, vx, vy, speed
+        ball.rect.center = (round(fx), round(fy))
+        self.paddle1.rect.centery = y1
+        self.paddle2.rect.centery = y2
+        if self.ai:
+            self.ai.reaction_timer = timer
+            self.ai._target = target
+            self.ai._leg = (leg_vx, leg_vy) if has_leg else None
+        return frame
+
+    def step(self, inputs, flags, dt_ms):
+        """One frame in the same order as PingPong.main(). Returns the packed frame."""
+        ball, paddle1, paddle2 = self.ball, self.paddle1, self.paddle2
+        if inputs & W:
+            paddle1.move_up()
+        if inputs & S:
+            paddle1.move_down()
+        if self.replay.mode == 2:
+            if inputs & UP:
+                paddle2.move_up()
+            if inputs & DOWN:
+                paddle2.move_down()
+        if self.ai:
+            self.ai.update(ball, dt_ms)
+
+        if flags & SERVING:
+            ball.recenter()
+            return pack_frame(ball, paddle1, paddle2, self.score1, self.score2, inputs, flags, dt_ms)
+        if abs(ball.vx) < 0.001 and abs(ball.vy) < 0.001:
+            ball.reset(direction=self.serve_dir)
+
+        ball.update()
+        hit = bool(ball.hits or paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2))
+        scored = True
+        if ball.rect.left <= 0:
+            self.score2 += 1
+        elif ball.rect.right >= SCREEN_WIDTH:
+            self.score1 += 1
+        else:
+            scored = False
+        out = pack_frame(ball, paddle1, paddle2, self.score1, self.score2, inputs,
+                         (HIT if hit else 0) | (SCORED if scored else 0), dt_ms)
+        if scored:
+            ball.vx = ball.vy = 0
+            ball.recenter()
+            self.serve_dir = self.rng.choice([-1, 1])
+        return out
+
+
+def check(replay):
+    """Re-simulate every keyframe segment. Returns the first frame that differs, or None."""
+    sim = Resim(replay)
+    bounds = replay.keyframe_frames[1:] + [len(replay)]
+    for key, stop in zip(replay.keyframes, bounds):
+        n = sim.load(key)
+        while n < stop:
+            _, _, _, _, _, _, _, _, inputs, flags, dt_ms = replay.frame(n)
+            if sim.step(inputs, flags, dt_ms) != replay.frame_bytes(n):
+                return n
+            n += 1
+    return None
+
+
+def selftest(path, matches=3, win_score=2, seed=1):
+    """
+    Play a scripted 1P session through PingPong.MatchScene without a window,
+    with serves after every point and a rematch after every match, recording
+    it to `path`; then check the recording. Returns what check() returns.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ["GAME_SCORES"] = "off"
+    import PingPong
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    menu = PingPong.MenuScene(pygame.display.get_surface())
+    menu.win_score = win_score
+    scene = PingPong.MatchScene(menu)
+    scene.rng.seed(seed)
+    scene.loop = loop = argparse.Namespace(keys={pygame.K_w: False, pygame.K_s: False,
+                                                 pygame.K_UP: False, pygame.K_DOWN: False},
+                                           clock=pygame.time.Clock())
+    scene.recorder = PongRecorder(path, 1, win_score, scene.ai)
+    script = random.Random(seed)
+    played = frames = 0
+    while played < matches:
+        if frames % 20 == 0:
+            # player 1 chases the ball, badly enough that both sides score
+            up = scene.ball.rect.centery < scene.paddle1.rect.centery
+            loop.keys[pygame.K_w], loop.keys[pygame.K_s] = (up, not up) if script.random() < 0.7 else (not up, up)
+        scene.update(1000 // FPS)
+        frames += 1
+        if scene.winner is not None:
+            played += 1
+            scene.rematch()
+    scene.recorder.close()
+    replay = PongReplay(path)
+    try:
+        print(f"{matches} matches, {len(replay)} frames, {len(replay.keyframes)} keyframes")
+        return check(replay)
+    finally:
+        replay.close()
+
+
+def draw_frame(screen, court, fonts, replay, n, speed, playing):
+    bx, by, vx, vy, y1, y2, score1, score2, inputs, flags, dt_ms = replay.frame(n)
+    big_font, hud_font = fonts
+    screen.blit(court, (0, 0))
+    for score, color, x in ((score1, CYAN, SCREEN_WIDTH // 4), (score2, MAGENTA, SCREEN_WIDTH * 3 // 4)):
+        surf = big_font.render(str(score), True, color)
+        screen.blit(surf, surf.get_rect(midtop=(x, 18)))
+    pygame.draw.rect(screen, CYAN, pygame.Rect(0, 0, PADDLE_WIDTH, PADDLE_HEIGHT)
+                     .move(PADDLE_MARGIN - PADDLE_WIDTH // 2, y1 - PADDLE_HEIGHT // 2))
+    pygame.draw.rect(screen, MAGENTA, pygame.Rect(0, 0, PADDLE_WIDTH, PADDLE_HEIGHT)
+                     .move(SCREEN_WIDTH - PADDLE_MARGIN - PADDLE_WIDTH // 2, y2 - PADDLE_HEIGHT // 2))
+    pygame.draw.circle(screen, WHITE, (bx, by), BALL_SIZE // 2)
+
+    # timeline with a tick for every keyframe
+    bar = pygame.Rect(20, SCREEN_HEIGHT - 16, SCREEN_WIDTH - 40, 6)
+    pygame.draw.rect(screen, GRAY, bar)
+    last = max(1, len(replay) - 1)
+    for k in replay.keyframe_frames:
+        x = bar.left + bar.width * k // last
+        pygame.draw.line(screen, WHITE, (x, bar.top - 3), (x, bar.top - 1))
+    pygame.draw.rect(screen, CYAN, (bar.left, bar.top, bar.width * n // last, bar.height))
+
+    state = ("|| " if not playing else "<< " if speed < 0 else ">> ") + f"{abs(speed):g}x"
+    seconds = n / FPS
+    text = f"{state}  frame {n + 1}/{len(replay)}  {int(seconds // 60)}:{seconds % 60:04.1f}"
+    screen.blit(hud_font.render(text, True, WHITE), (20, SCREEN_HEIGHT - 44))
+    hint = "SPACE pause  LEFT/RIGHT seek  UP/DOWN speed  B reverse  PGUP/PGDN keyframes  click timeline"
+    surf = hud_font.render(hint, True, GRAY)
+    screen.blit(surf, (20, SCREEN_HEIGHT - 66))
+    game_host.present()
+    return bar
+
+
+def play(replay):
+    screen = game_host.open_window((SCREEN_WIDTH, SCREEN_HEIGHT), "Pong replay")
+    clock = pygame.time.Clock()
+    court = bake_court()
+    fonts = (game_host.font(56), game_host.font(22))
+    last = len(replay) - 1
+    pos = 0.0
+    speed_index = SPEEDS.index(1)
+    direction = 1
+    playing = True
+    bar = None
+
+    while True:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                return
+            if ev.type == pygame.KEYDOWN:
+                if ev.key == pygame.K_ESCAPE:
+                    return
+                elif ev.key == pygame.K_SPACE:
+                    playing = not playing
+                elif ev.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    # one frame while paused, a second while playing
+                    step = 1 if not playing else FPS
+                    pos += step if ev.key == pygame.K_RIGHT else -step
+                elif ev.key == pygame.K_UP:
+                    speed_index = min(len(SPEEDS) - 1, speed_index + 1)
+                elif ev.key == pygame.K_DOWN:
+                    speed_index = max(0, speed_index - 1)
+                elif ev.key == pygame.K_b:
+                    direction = -direction
+                elif ev.key == pygame.K_PAGEUP:
+                    k = replay.keyframe_before(int(pos) - 1)
+                    pos = replay.keyframe_frames[k] if replay.keyframes else 0
+                elif ev.key == pygame.K_PAGEDOWN:
+                    k = bisect.bisect_right(replay.keyframe_frames, int(pos))
+                    pos = replay.keyframe_frames[k] if k < len(replay.keyframes) else last
+                elif ev.key == pygame.K_HOME:
+                    pos = 0
+                elif ev.key == pygame.K_END:
+                    pos = last
+            if ev.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION) and bar is not None:
+                if pygame.mouse.get_pressed()[0] and bar.inflate(0, 20).collidepoint(ev.pos):
+                    pos = (ev.pos[0] - bar.left) * last / bar.width
+
+        speed = SPEEDS[speed_index] * direction
+        if playing:
+            pos += speed
+        pos = min(max(pos, 0), last)
+        if playing and pos in (0, last) and (pos == last) == (direction > 0):
+            playing = False
+        bar = draw_frame(screen, court, fonts, replay, int(pos), speed, playing)
+        clock.tick(FPS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play back or check a Pong recording")
+    parser.add_argument("command", choices=("play", "check", "info", "selftest"))
+    parser.add_argument("path", nargs="?")
+    args = parser.parse_args(argv)
+
+    if args.command == "selftest":
+        bad = selftest(args.path or os.path.join(tempfile.gettempdir(), "pong_selftest.pongr"))
+        print("MATCH" if bad is None else f"MISMATCH at frame {bad}")
+        return 0 if bad is None else 1
+    if args.path is None:
+        parser.error("a recording path is needed")
+
+    replay = PongReplay(args.path)
+    try:
+        if args.command == "info":
+            size = os.path.getsize(args.path)
+            print(f"{args.path}: {len(replay)} frames ({len(replay) / FPS:.1f}s), "
+                  f"{len(replay.keyframes)} keyframes, {size} bytes ({FRAME.size} per frame)")
+        elif args.command == "check":
+            bad = check(replay)
+            if bad is None:
+                print(f"{len(replay)} frames re-simulated from {len(replay.keyframes)} keyframes: MATCH")
+            else:
+                print(f"MISMATCH at frame {bad}: recorded {replay.frame(bad)}")
+                return 1
+        elif len(replay):
+            play(replay)
+    finally:
+        replay.close()
+    return 0
+
+
+if __name__ == "__main__":
+    code = main()
+    pygame.quit()
+    sys.exit(code)
@@ -0,0 +1,172 @@
+# pong_tuning.py
+# Headless grid search over SimpleAI parameters.
+#
+#   python pong_tuning.py                    full sweep on every CPU core
+#   python pong_tuning.py --points 50 --workers 2
+#
+# Every (paddle speed, react_ms, prediction_strength) combination plays
+# points against a scripted player using the real Ball / Paddle /
+# paddle_hit_ball physics from PingPong.py, with no window and no frame
+# cap. The table gives the AI's point win rate and the average rally
+# length; at the end the combination closest to each target win rate is
+# printed as a ready-to-paste AI_PRESETS. The levels are picked together,
+# easy to hard, so that each is at least as fast, as quick and as accurate
+# as the one before it and wins more: the presets can only get harder.
+
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from PingPong import (Ball, Paddle, SimpleAI, paddle_hit_ball, BALL_SPEED, FPS, PADDLE_MARGIN,
+                      PADDLE_SPEED, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, CYAN, MAGENTA)
+
+SPEEDS = (4, 6, 8, 10, 12, 14)
+REACT_MS = (20, 40, 80, 120, 160, 220)
+STRENGTHS = (0.3, 0.45, 0.6, 0.75, 0.9, 0.98)
+
+TARGETS = {'easy': 0.25, 'normal': 0.5, 'hard': 0.75}
+
+MAX_POINT_FRAMES = FPS * 60  # a point that long is called a draw
+
+
+class ScriptedPlayer:
+    """
+    Stand-in for a human on the left paddle: follows where the ball was
+    `lag` frames ago at normal paddle speed, and only while it is coming.
+    """
+
+    def __init__(self, paddle, lag=10, deadzone=12):
+        self.paddle = paddle
+        self.lag = lag
+        self.deadzone = deadzone
+        self.seen = []
+
+    def reset(self):
+        """New point: forget where the last ball was."""
+        self.seen.clear()
+
+    def update(self, ball):
+        self.seen.append(ball.rect.centery)
+        if len(self.seen) <= self.lag:
+            return
+        y = self.seen.pop(0)
+        if ball.vx > 0:
+            y = SCREEN_HEIGHT // 2
+        if y < self.paddle.rect.centery - self.deadzone:
+            self.paddle.move_up()
+        elif y > self.paddle.rect.centery + self.deadzone:
+            self.paddle.move_down()
+
+
+def play_point(ball, human, ai, direction):
+    """Returns (winner, paddle hits, frames): winner 1 = scripted player, 2 = AI, 0 = draw."""
+    paddle1, paddle2 = ball.paddles
+    ball.reset(direction=direction, speed=BALL_SPEED)
+    paddle1.rect.centery = paddle2.rect.centery = SCREEN_HEIGHT // 2
+    human.reset()
+    dt_ms = 1000 // FPS
+    hits = 0
+    for frame in range(1, MAX_POINT_FRAMES + 1):
+        human.update(ball)
+        ai.update(ball, dt_ms)
+        ball.update()
+        hits += len(ball.hits)
+        if paddle_hit_ball(ball, paddle1) or paddle_hit_ball(ball, paddle2):
+            hits += 1
+        if ball.rect.left <= 0:
+            return 2, hits, frame
+        if ball.rect.right >= SCREEN_WIDTH:
+            return 1, hits, frame
+    return 0, hits, MAX_POINT_FRAMES
+
+
+def run_combo(args):
+    """Play `points` points with one parameter set. Runs in a worker process."""
+    speed, react_ms, strength, points, seed = args
+    rng = random.Random(seed)
+    paddle1 = Paddle(PADDLE_MARGIN, SCREEN_HEIGHT // 2, CYAN, PADDLE_SPEED)
+    paddle2 = Paddle(SCREEN_WIDTH - PADDLE_MARGIN, SCREEN_HEIGHT // 2, MAGENTA)
+    ball = Ball(WHITE, rng)
+    ball.paddles = (paddle1, paddle2)
+    ai = SimpleAI(paddle2, rng=rng)
+    ai.set_params(speed, react_ms, strength)
+    human = ScriptedPlayer(paddle1)
+
+    ai_points = 0
+    draws = 0
+    total_hits = 0
+    frames = 0
+    for n in range(points):
+        winner, hits, f = play_point(ball, human, ai, 1 if n % 2 else -1)
+        total_hits += hits
+        frames += f
+        if winner == 2:
+            ai_points += 1
+        elif winner == 0:
+            draws += 1
+    decided = max(1, points - draws)
+    return speed, react_ms, strength, ai_points / decided, total_hits / points, frames
+
+
+def harder(r, prev):
+    return r[0] >= prev[0] and r[1] <= prev[1] and r[2] >= prev[2] and r[3] > prev[3]
+
+
+def suggest(results):
+    """
+    [(name, result)] for TARGETS, easiest first, where every level is
+    harder() than the one before. Of those chains, the one closest to the
+    targets overall; among near-ties the one with the longest rallies.
+    """
+    levels = sorted(TARGETS.items(), key=lambda item: item[1])
+    # per result: (cost, chain) of the best chain of levels so far ending with it
+    chains = {}
+    for name, target in levels:
+        step = {}
+        for r in results:
+            cost = (round(abs(r[3] - target), 2), -r[4])
+            if not chains:
+                step[r] = (cost, [(name, r)])
+                continue
+            prevs = [chains[p] for p in chains if harder(r, p)]
+            if prevs:
+                (err, rally), chain = min(prevs, key=lambda c: c[0])
+                step[r] = ((round(err + cost[0], 2), rally + cost[1]), chain + [(name, r)])
+        chains = step
+    return min(chains.values(), key=lambda c: c[0])[1] if chains else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate Pong AI difficulty")
+    parser.add_argument("--points", type=int, default=200, help="points played per combination")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    jobs = [(s, r, p, args.points, args.seed + n)
+            for n, (s, r, p) in enumerate((s, r, p) for s in SPEEDS for r in REACT_MS for p in STRENGTHS)]
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(run_combo, jobs, chunksize=4))
+    elapsed = perf_counter() - start
+
+    print(f"{'speed':>5} {'react':>6} {'predict':>7} {'ai win':>7} {'rally':>6}")
+    for speed, react_ms, strength, win, rally, _ in sorted(results, key=lambda r: r[3]):
+        print(f"{speed:>5} {react_ms:>6} {strength:>7.2f} {win:>7.1%} {rally:>6.1f}")
+    frames = sum(r[5] for r in results)
+    print(f"{len(jobs)} combinations x {args.points} points: {frames} frames in {elapsed:.1f}s "
+          f"({frames / elapsed:.0f} frames/s)", file=sys.stderr)
+
+    print("\nAI_PRESETS = {")
+    for name, best in suggest(results):
+        print(f"    '{name}': ({best[0]}, {best[1]}, {best[2]}),  # {best[3]:.0%} AI wins, rally {best[4]:.1f}")
+    print("}")
+
+
+if __name__ == "__main__":
+    main()
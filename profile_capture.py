@@ -0,0 +1,125 @@
+# profile_capture.py
+# cProfile a window of frames while the game runs, without editing it.
+#
+#   PROFILE_FRAMES=300 python Invaders01.py    profile the first 300 frames
+#   F4 in any game                             start a capture (F4 again stops it early)
+#
+# Each capture is written to profile_<game>_<date>-<time>.pstats (open it
+# with `python -m pstats` or snakeviz) and the functions that took the most
+# time are shown on the F3 overlay. PROFILE_TOP sets how many (default 10).
+# A capture started with F4 is PROFILE_FRAMES frames long, 300 if unset.
+#
+# PROFILE_FRAMES starts a capture when the game's loop starts running, not
+# when its module is imported, so tools that import several games profile
+# only the one that runs. cProfile can only hook one profiler at a time:
+# while one capture is recording, starting another is refused.
+#
+# Before Python 3.12 cProfile only sees the thread that enabled it, so the
+# PIPELINE=1 update worker runs under its own profiler (in_worker()),
+# merged into the same file. From 3.12 one profiler covers every thread.
+
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+DEFAULT_FRAMES = 300
+PER_THREAD = sys.version_info < (3, 12)
+
+_recording = None  # the ProfileCapture currently recording, if any
+
+
+class ProfileCapture:
+    def __init__(self, name):
+        self.name = name
+        self.frames = int(os.environ.get("PROFILE_FRAMES") or DEFAULT_FRAMES)
+        self.top = int(os.environ.get("PROFILE_TOP") or 10)
+        self.profile = None
+        self.worker = None   # the update worker's profiler (PER_THREAD only)
+        self.left = 0
+        self.path = None
+        self.summary = []
+        self.auto = bool(os.environ.get("PROFILE_FRAMES"))  # start() when the loop starts
+
+    def loop_started(self):
+        """The game's loop is running: take the PROFILE_FRAMES capture (once). True if it started."""
+        if not self.auto:
+            return False
+        self.auto = False
+        return self.start()
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        global _recording
+        if _recording is not None:
+            print(f"[profile] {_recording.name} is already being captured, not starting {self.name}",
+                  file=sys.stderr)
+            return False
+        _recording = self
+        self.left = self.frames
+        self.summary = [f"cProfile: recording {self.frames} frames (F4 stops)"]
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        atexit.register(self.stop)
+        return True
+
+    def in_worker(self, fn, *args):
+        """Run fn(*args) on the worker thread, profiled if a capture is recording."""
+        if self.profile is None or not PER_THREAD:
+            return fn(*args)
+        if self.worker is None:
+            self.worker = cProfile.Profile()
+        self.worker.enable()
+        try:
+            return fn(*args)
+        finally:
+            self.worker.disable()
+
+    def frame(self):
+        """Count one frame of the window; ends the capture after the last one."""
+        if self.profile is not None:
+            self.left -= 1
+            if self.left <= 0:
+                self.stop()
+
+    def stop(self):
+        global _recording
+        if self.profile is None:
+            return
+        profile, self.profile = self.profile, None
+        profile.disable()
+        _recording = None
+        atexit.unregister(self.stop)
+        frames = self.frames - self.left
+        self.path = f"profile_{self.name}_{time.strftime('%Y%m%d-%H%M%S')}.pstats"
+        stats = pstats.Stats(profile)
+        if self.worker is not None:
+            stats.add(self.worker)
+            self.worker = None
+        stats.dump_stats(self.path)
+        self.summary = self.summarize(stats, frames)
+        print(f"[profile] {frames} frames written to {self.path}", file=sys.stderr)
+        print("\n".join(self.summary[1:]), file=sys.stderr)
+
+    def summarize(self, stats, frames):
+        """Overlay lines: the `top` functions by own time, in ms per frame."""
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        total = stats.total_tt or 1.0
+        per = 1000.0 / max(frames, 1)
+        lines = [f"cProfile: {frames} frames -> {self.path}",
+                 f"{'ms/frame':>8} {'%':>5} {'calls':>7}  function"]
+        for (filename, line, func), (cc, nc, tt, ct, callers) in rows[:self.top]:
+            where = f" ({os.path.basename(filename)}:{line})" if line else ""
+            lines.append(f"{tt * per:8.3f} {100 * tt / total:5.1f} {nc:7d}  {func}{where}")
+        return lines
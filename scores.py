@@ -0,0 +1,236 @@
+# scores.py
+# High scores and play sessions kept between runs, in one SQLite file.
+#
+#   python scores.py                     top 10 of every game and mode
+#   python scores.py invaders01          top 10 of one game
+#   GAME_SCORES=other.db python ...      use another file (GAME_SCORES=off: keep nothing)
+#
+# The games only call add_score() / add_session(), which put the row on a
+# queue and return. One writer thread owns the write connection and inserts
+# whatever has queued up in a single transaction, so a score saved at game
+# over never costs the frame loop a disk write; add_score() hands back a
+# Future that the writer fills in with the score's place on the board.
+# best() is asked of the writer too, so a game can call it while it sets up
+# without waiting on the file: it returns a Future, answered after every
+# score queued before it and from a per-board cache the writer keeps up to
+# date on insert. The file is in WAL mode so the tools' reads (top(),
+# rank()) don't wait for the writer; they run on an index over (game, mode,
+# score) and only see rows the writer has committed. If the file can't be
+# opened the store reports it once and then keeps nothing: reads return
+# None and writes are dropped.
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_PATH = "scores.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    game TEXT NOT NULL,
+    mode TEXT NOT NULL DEFAULT '',
+    score INTEGER NOT NULL,
+    player TEXT NOT NULL DEFAULT '',
+    time REAL NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_top ON scores (game, mode, score DESC, time);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    game TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_game ON sessions (game, started);
+"""
+
+INSERT_SCORE = "INSERT INTO scores (game, mode, score, player, time, details) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_SESSION = "INSERT INTO sessions (game, started, ended, details) VALUES (?, ?, ?, ?)"
+TOP = "SELECT score, player, time, details FROM scores WHERE game = ? AND mode = ? ORDER BY score DESC, time LIMIT ?"
+BEST = "SELECT MAX(score) FROM scores WHERE game = ? AND mode = ?"
+RANK = "SELECT COUNT(*) + 1 FROM scores WHERE game = ? AND mode = ? AND score > ?"
+MODES = "SELECT DISTINCT game, mode FROM scores ORDER BY game, mode"
+
+_STOP = object()
+_shared = None
+
+
+def shared():
+    """The process-wide ScoreStore (from GAME_SCORES), or None if it is turned off."""
+    global _shared
+    if _shared is None:
+        path = os.environ.get("GAME_SCORES", DEFAULT_PATH)
+        _shared = False if path == "off" else ScoreStore(path)
+    return _shared or None
+
+
+class ScoreStore:
+    def __init__(self, path=DEFAULT_PATH, batch=64):
+        self.path = path
+        self.batch = batch
+        self.queue = queue.Queue()
+        self.written = 0
+        self.failed = 0
+        self.error = None  # why the file couldn't be opened, if it couldn't
+        self._best = {}    # (game, mode) -> best score, writer thread only
+        self._ready = threading.Event()
+        self._reader = None
+        self._thread = threading.Thread(target=self._run, name="scores", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- writes (never block) ----
+    def add_score(self, game, score, mode="", player="", **details):
+        """Returns a Future for where the score placed among those before it (1 = best; None if not saved)."""
+        placed = Future()
+        if self.error:
+            placed.set_result(None)
+            return placed
+        self.queue.put((INSERT_SCORE, (game, mode, int(score), player, time.time(),
+                                       json.dumps(details) if details else None), placed))
+        return placed
+
+    def best(self, game, mode=""):
+        """Returns a Future for the best score on the board so far (None if there is none)."""
+        best = Future()
+        if self.error:
+            best.set_result(None)
+            return best
+        self.queue.put((BEST, (game, mode), best))
+        return best
+
+    def add_session(self, game, started, ended, **details):
+        """started / ended: time.time() values."""
+        if not self.error:
+            self.queue.put((INSERT_SESSION, (game, started, ended, json.dumps(details) if details else None), None))
+
+    # ---- reads ----
+    def _db(self):
+        if self._reader is None:
+            # the writer creates the file and schema first
+            self._ready.wait()
+            if self.error:
+                return None
+            self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        return self._reader
+
+    def top(self, game, mode="", n=10):
+        """[(score, player, time, details dict)] best first."""
+        db = self._db()
+        rows = db.execute(TOP, (game, mode, n)).fetchall() if db else []
+        return [(score, player, t, json.loads(details) if details else {}) for score, player, t, details in rows]
+
+    def rank(self, game, score, mode=""):
+        """Where `score` places on the board (1 = best)."""
+        db = self._db()
+        return db.execute(RANK, (game, mode, score)).fetchone()[0] if db else None
+
+    def modes(self):
+        db = self._db()
+        return db.execute(MODES).fetchall() if db else []
+
+    def flush(self):
+        """Wait until everything queued so far is committed (for tests and tools)."""
+        self.queue.join()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    # ---- writer thread ----
+    def _run(self):
+        db = None
+        try:
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            db.commit()
+        except sqlite3.Error as e:
+            self.error = e
+            print(f"[scores] {self.path}: can't open, scores won't be kept: {e}", file=sys.stderr)
+            if db is not None:
+                db.close()
+                db = None
+        finally:
+            self._ready.set()
+        stop = False
+        while not stop:
+            rows = [self.queue.get()]
+            while len(rows) < self.batch:
+                try:
+                    rows.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(r is _STOP for r in rows):
+                stop = True
+            todo = [r for r in rows if r is not _STOP]
+            writes = sum(sql is not BEST for sql, _, _ in todo)
+            places = []
+            if db is None:
+                self.failed += writes
+            else:
+                best = dict(self._best)
+                try:
+                    with db:
+                        for sql, params, placed in todo:
+                            if sql is BEST:
+                                if params not in best:
+                                    best[params] = db.execute(BEST, params).fetchone()[0]
+                                places.append((placed, best[params]))
+                                continue
+                            if placed is not None:
+                                game, mode, score = params[:3]
+                                places.append((placed, db.execute(RANK, (game, mode, score)).fetchone()[0]))
+                                if (game, mode) in best:
+                                    old = best[game, mode]
+                                    best[game, mode] = score if old is None else max(old, score)
+                            db.execute(sql, params)
+                    self.written += writes
+                    self._best = best
+                except sqlite3.Error as e:
+                    places = []
+                    self.failed += writes
+                    print(f"[scores] {self.path}: {writes} rows not saved: {e}", file=sys.stderr)
+            for placed, rank in places:
+                placed.set_result(rank)
+            for _, _, placed in todo:
+                if placed is not None and not placed.done():
+                    placed.set_result(None)
+            for _ in rows:
+                self.queue.task_done()
+        if db is not None:
+            db.close()
+
+
+def main(argv):
+    store = shared()
+    if store is None:
+        print("GAME_SCORES=off, nothing stored")
+        return
+    for game, mode in store.modes():
+        if argv and game not in argv:
+            continue
+        print(f"{game} {mode}".strip())
+        for n, (score, player, t, details) in enumerate(store.top(game, mode), 1):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(t))
+            print(f"  {n:2d}. {score:6d}  {player or '-':<10} {when}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
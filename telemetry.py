@@ -0,0 +1,89 @@
+# telemetry.py
+# Gameplay event log that never touches the disk on the game thread.
+#
+#   PONG_TELEMETRY=rallies.jsonl python PingPong.py    one JSON object per line
+#   PONG_TELEMETRY=rallies.db python PingPong.py       SQLite table "events"
+#
+# log() only puts the event on a bounded queue. A background thread takes
+# whatever has queued up (up to `batch` events) and writes it in one go.
+# If the writer falls behind and the queue fills, new events are dropped
+# and counted rather than making the game wait.
+
+import atexit
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+class TelemetryWriter:
+    def __init__(self, path, maxsize=1024, batch=64):
+        self.path = path
+        self.batch = batch
+        self.queue = queue.Queue(maxsize)
+        self.logged = 0
+        self.dropped = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, kind, **fields):
+        """Queue one event. Never blocks; returns False if it had to be dropped."""
+        fields["kind"] = kind
+        fields["time"] = time.time()
+        try:
+            self.queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.logged += 1
+        return True
+
+    def close(self):
+        """Write what's still queued and stop the thread."""
+        if not self._thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+        if self.dropped:
+            print(f"[telemetry] {self.path}: {self.written} events written, {self.dropped} dropped",
+                  file=sys.stderr)
+
+    def _run(self):
+        sql = self.path.endswith((".db", ".sqlite", ".sqlite3"))
+        if sql:
+            db = sqlite3.connect(self.path)
+            db.execute("CREATE TABLE IF NOT EXISTS events (time REAL, kind TEXT, data TEXT)")
+        else:
+            out = open(self.path, "a", encoding="utf-8")
+        stop = False
+        while not stop:
+            events = [self.queue.get()]
+            while len(events) < self.batch:
+                try:
+                    events.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(e is _STOP for e in events):
+                events = [e for e in events if e is not _STOP]
+                stop = True
+            if not events:
+                continue
+            if sql:
+                db.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                               [(e["time"], e["kind"], json.dumps(e)) for e in events])
+                db.commit()
+            else:
+                out.write("".join(json.dumps(e) + "\n" for e in events))
+                out.flush()
+            self.written += len(events)
+        if sql:
+            db.close()
+        else:
+            out.close()